@@ -1,21 +1,34 @@
+import os
+import sys
+
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import AutoMinorLocator
 
-# Data for melt pool measurements including standard deviations
-chess_data = {
-    'energy': [37.5, 40.0, 50.0, 62.5, 66.7, 83.3, 30.0, 80.0],  # Energy density (J/mm³)
-    'width': [92, 98, 95, 102, 100, 104, 88, 103],               # Melt pool width (μm)
-    'std_dev': [3.2, 2.3, 2.7, 3.1, 3.0, 3.3, 3.8, 3.2],        # Standard deviation (μm)
-    'regime': ['C2', 'C5', 'C1', 'C3', 'C4', 'C6', 'C7', 'C8'],
-}
-
-linear_data = {
-    'energy': [40.0, 80.0, 62.5, 78.1, 50.0],  # Energy density (J/mm³)
-    'width': [101, 110, 108, 115, 102],        # Melt pool width (μm)
-    'std_dev': [2.5, 2.2, 2.7, 2.4, 2.6],      # Standard deviation (μm)
-    'regime': ['L1', 'L2', 'L3', 'L4', 'L5'],
-}
+# The measurement store lives in plot_excel
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'plot_excel'))
+from measurement_store import open_store
+
+# Melt pool widths with standard deviations measured on the cross-sections; the automated
+# measurements of complete pools (meltpool_measure.py) are plotted next to them
+store = open_store()
+widths = store.summary('meltpool_width', 'Ti13Nb13Zr5Cu', test='metallography').set_index('regime')
+measured = store.summary('meltpool_width', 'Ti13Nb13Zr5Cu', test='image_analysis').set_index('regime')
+
+
+def strategy_data(strategy, table=widths):
+    """Energy density (J/mm³), width and std (μm) and names of the regimes of one strategy"""
+    rows = table[table['strategy'] == strategy]
+    return {
+        'energy': rows['energy'].tolist(),
+        'width': rows['mean'].tolist(),
+        'std_dev': rows['std'].tolist(),
+        'regime': rows.index.tolist(),
+    }
+
+
+chess_data = strategy_data('Chess')
+linear_data = strategy_data('Linear')
 
 # Create figure with specified size (in inches)
 plt.figure(figsize=(10, 8))
@@ -33,9 +46,19 @@ plt.errorbar(linear_data['energy'], linear_data['width'],
             capsize=6, capthick=1.5, elinewidth=1.5,
             ls='none', label='_nolegend_')
 
+# Automated widths as open markers, shifted right so the error bars do not overlap
+for strategy, color, marker in (('Chess', '#2563eb', 'o'), ('Linear', '#16a34a', 's')):
+    auto = strategy_data(strategy, measured)
+    plt.errorbar(np.add(auto['energy'], 0.8), auto['width'], yerr=auto['std_dev'],
+                 c=color, marker=marker, markersize=12, mfc='white', mew=1.5,
+                 capsize=6, capthick=1.5, elinewidth=1.5, ls='none', label='_nolegend_')
+
 # Add separate scatter plots for legend
 plt.scatter([], [], c='#2563eb', marker='o', s=144, label='Chess pattern')  # markersize^2 = s
 plt.scatter([], [], c='#16a34a', marker='s', s=144, label='Linear strategy')
+if len(measured):
+    plt.scatter([], [], facecolors='white', edgecolors='k', marker='o', s=144,
+                label='Image analysis')
 
 # Add regime labels
 for i, regime in enumerate(chess_data['regime']):
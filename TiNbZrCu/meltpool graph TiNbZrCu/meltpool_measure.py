@@ -0,0 +1,248 @@
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from scipy import ndimage, stats
+
+IMAGE_EXTENSIONS = ('.tif', '.tiff', '.png', '.jpg', '.jpeg', '.bmp')
+
+
+def read_image(file_path):
+    """Grayscale cross-section as a float32 array"""
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = None
+    with Image.open(file_path) as img:
+        return np.asarray(img.convert('L'), dtype=np.float32)
+
+
+def boundary_lines(image, sigma=2.0, k=4.0, dark=True):
+    """
+    One-pixel-wide melt-pool boundary lines of an etched cross-section.
+
+    Etched boundaries are thin dark lines: the largest eigenvalue of the
+    Gaussian Hessian (scale sigma, px) is strongly positive across them.
+    Pixels whose response exceeds the median by k robust deviations are
+    kept and thinned by non-maximum suppression across the line (the
+    eigenvector direction, rounded to 8 neighbours), all on whole-image
+    arrays. Returns (lines mask, response).
+    """
+    img = image if dark else -image
+    Ixx = ndimage.gaussian_filter(img, sigma, order=(0, 2))
+    Iyy = ndimage.gaussian_filter(img, sigma, order=(2, 0))
+    Ixy = ndimage.gaussian_filter(img, sigma, order=(1, 1))
+    half = (Ixx - Iyy) / 2
+    root = np.sqrt(half ** 2 + Ixy ** 2)
+    response = np.maximum(sigma ** 2 * ((Ixx + Iyy) / 2 + root), 0)
+    level = np.median(response) + k * 1.4826 * np.median(np.abs(response - np.median(response)))
+    ridge = response > level
+
+    # Normal of the line: eigenvector of the largest eigenvalue
+    angle = np.arctan2(root - half, Ixy)          # direction (x, y) ∝ (Ixy, λ1 - Ixx)
+    dx = np.rint(np.cos(angle)).astype(int)
+    dy = np.rint(np.sin(angle)).astype(int)
+    rows, cols = np.indices(image.shape)
+    padded = np.pad(response, 1)
+    ahead = padded[rows + 1 + dy, cols + 1 + dx]
+    behind = padded[rows + 1 - dy, cols + 1 - dx]
+    return ridge & (response >= ahead) & (response >= behind), response
+
+
+def split_arcs(lines, min_pixels=20):
+    """
+    Label the boundary arcs, cut where lines cross.
+
+    Overlapping tracks make the boundaries a network. A line pixel where
+    three or more branches meet has three or more 0→1 transitions going
+    round its 8 neighbours (the crossing number; steps of a diagonal
+    line have one or two). Junctions are removed with their neighbours
+    so that every arc between two crossings is labelled separately.
+    Returns (labels, number of arcs, mask of the removed junctions).
+    """
+    padded = np.pad(lines, 1)
+    rows, cols = lines.shape
+    ring = [padded[1 + dy:1 + dy + rows, 1 + dx:1 + dx + cols] for dy, dx in
+            ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))]
+    crossings = sum((~ring[i] & ring[(i + 1) % 8]).astype(np.uint8) for i in range(8))
+    junctions = ndimage.binary_dilation(lines & (crossings >= 3), iterations=2)
+    labels, n = ndimage.label(lines & ~junctions, structure=np.ones((3, 3), int))
+    sizes = np.bincount(labels.ravel(), minlength=n + 1)
+    small = sizes < min_pixels
+    small[0] = True
+    labels[small[labels]] = 0
+    return labels, n, junctions
+
+
+def measure_arcs(labels, min_width=20, max_width=None, min_r2=0.8, junctions=None):
+    """
+    Width and depth of every U-shaped arc, all arcs fitted at once.
+
+    A parabola y = c0 + c1·x + c2·x² is fitted to each arc from the per
+    label sums (Σxᵏ, Σxᵏy, bincount) with batched normal equations. Arcs
+    open towards the top surface (c2 < 0 with y downwards), whose vertex
+    lies within their x range and whose fit has R² ≥ min_r2 are melt-pool
+    bottoms. Depth is the sag from the higher arc end down to the
+    vertex; width is the chord of the parabola at that level.
+
+    An arc whose both ends stop at crossings with other boundaries
+    (within 3 px of the junctions mask of split_arcs) was remelted by
+    its neighbours: its chord and sag are the crossing spacing, not the
+    pool size, and it is marked complete=False. Pools with a free end
+    (the last track of a layer, isolated tracks) are complete. Without
+    a junctions mask every arc counts as complete. Returns one row per
+    accepted arc (pixel units).
+    """
+    flat = labels.ravel()
+    on = flat > 0
+    ids = flat[on]
+    y, x = np.divmod(np.flatnonzero(on), labels.shape[1])
+    size = int(labels.max()) + 1
+    n = np.bincount(ids, minlength=size).astype(float)
+    x_min = np.full(size, np.inf)
+    x_max = np.full(size, -np.inf)
+    np.minimum.at(x_min, ids, x)
+    np.maximum.at(x_max, ids, x)
+    valid = n >= 5
+    # Centre x per arc for a well-conditioned fit
+    xc = np.where(valid, np.bincount(ids, x, size) / np.maximum(n, 1), 0)
+    u = x - xc[ids]
+    S = [np.bincount(ids, u ** p, size) for p in range(5)]
+    T = [np.bincount(ids, u ** p * y, size) for p in range(3)]
+    A = np.stack([np.stack([S[i + j] for j in range(3)], -1) for i in range(3)], -2)
+    b = np.stack(T, -1)
+    good = valid & (np.abs(np.linalg.det(A[:, :, :])) > 1e-9)
+    coef = np.full((size, 3), np.nan)
+    coef[good] = np.linalg.solve(A[good], b[good][..., None])[..., 0]
+
+    fitted = coef[ids, 0] + coef[ids, 1] * u + coef[ids, 2] * u ** 2
+    ss_res = np.bincount(ids, (y - fitted) ** 2, size)
+    y_mean = np.bincount(ids, y, size) / np.maximum(n, 1)
+    ss_tot = np.bincount(ids, (y - y_mean[ids]) ** 2, size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        r2 = 1 - ss_res / ss_tot
+        c0, c1, c2 = coef.T
+        u_vertex = -c1 / (2 * c2)
+        y_vertex = c0 - c1 ** 2 / (4 * c2)
+        u_lo, u_hi = x_min - xc, x_max - xc
+        y_ends = np.minimum(c0 + c1 * u_lo + c2 * u_lo ** 2, c0 + c1 * u_hi + c2 * u_hi ** 2)
+        depth = y_vertex - y_ends
+        width = 2 * np.sqrt(depth / -c2)
+
+    accept = good & (c2 < 0) & (u_vertex >= u_lo) & (u_vertex <= u_hi) & (r2 >= min_r2)
+    accept &= width >= min_width
+    if max_width:
+        accept &= width <= max_width
+    accept[0] = False
+    keep = np.flatnonzero(accept)
+
+    # Ends that stop at a crossing: end pixels (x at the arc's x range limits) near a junction
+    cut_lo = np.zeros(size, bool)
+    cut_hi = np.zeros(size, bool)
+    if junctions is not None:
+        near = ndimage.binary_dilation(junctions, iterations=3)[y, x]
+        cut_lo = np.bincount(ids, near & (x == x_min[ids]), size) > 0
+        cut_hi = np.bincount(ids, near & (x == x_max[ids]), size) > 0
+    return pd.DataFrame({'arc': keep, 'x': xc[keep] + u_vertex[keep], 'y_bottom': y_vertex[keep],
+                         'width_px': width[keep], 'depth_px': depth[keep], 'r2': r2[keep],
+                         'pixels': n[keep].astype(int),
+                         'complete': ~(cut_lo[keep] & cut_hi[keep])})
+
+
+def regime_name(file_path):
+    """Regime from an image file name ('L3_500x_2.tif' -> 'L3')"""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return re.split(r'[ _\-]+', stem)[0]
+
+
+def measure_image(file_path, pixel_size=1.0, sigma=2.0, k=4.0, min_width_um=30.0,
+                  max_width_um=None, min_r2=0.8, dark=True):
+    """All melt pools of one image in µm (runs in a worker process)"""
+    image = read_image(file_path)
+    lines, _ = boundary_lines(image, sigma, k, dark)
+    labels, _, junctions = split_arcs(lines)
+    arcs = measure_arcs(labels, min_width_um / pixel_size,
+                        max_width_um / pixel_size if max_width_um else None, min_r2, junctions)
+    arcs['width, µm'] = arcs.pop('width_px') * pixel_size
+    arcs['depth, µm'] = arcs.pop('depth_px') * pixel_size
+    arcs.insert(0, 'regime', regime_name(file_path))
+    arcs.insert(0, 'file', os.path.basename(file_path))
+    return arcs
+
+
+def measure_images(files, processes=None, **kwargs):
+    """Melt pools of many images in a process pool; one row per track"""
+    tables = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {pool.submit(measure_image, f, **kwargs): f for f in files}
+        for future in as_completed(futures):
+            f = futures[future]
+            try:
+                arcs = future.result()
+            except Exception as e:
+                print(f"{os.path.basename(f)}: {e}")
+                continue
+            print(f"{os.path.basename(f)}: {int(arcs['complete'].sum())} complete melt pools, "
+                  f"{int((~arcs['complete']).sum())} cut by their neighbours")
+            tables.append(arcs)
+    if not tables:
+        return pd.DataFrame(columns=['file', 'regime', 'width, µm', 'depth, µm', 'complete'])
+    return pd.concat(tables, ignore_index=True).sort_values(['regime', 'file'], ignore_index=True)
+
+
+def regime_statistics(tracks, confidence=0.95):
+    """
+    Per regime: number of tracks, mean, std, confidence half-width and
+    median of width and depth of the complete pools. Pools cut by their
+    neighbours are left out of these and counted separately (cut) with
+    the mean of their chords (cut_chord), the crossing spacing.
+    """
+    complete = tracks['complete'].astype(bool)
+    cut = tracks[~complete].groupby('regime').agg(cut=('width, µm', 'size'),
+                                                  cut_chord=('width, µm', 'mean'))
+    groups = tracks[complete].groupby('regime')
+    result = groups.agg(tracks=('width, µm', 'size'), images=('file', 'nunique'),
+                        width=('width, µm', 'mean'), width_std=('width, µm', 'std'),
+                        width_median=('width, µm', 'median'),
+                        depth=('depth, µm', 'mean'), depth_std=('depth, µm', 'std'))
+    t = stats.t.ppf(0.5 + confidence / 2, np.maximum(result['tracks'] - 1, 1))
+    result['width_ci'] = t * result['width_std'] / np.sqrt(result['tracks'])
+    result['depth_ci'] = t * result['depth_std'] / np.sqrt(result['tracks'])
+    result['depth/width'] = result['depth'] / result['width']
+    result = result.join(cut, how='outer')
+    result['tracks'] = result['tracks'].fillna(0).astype(int)
+    result['cut'] = result['cut'].fillna(0).astype(int)
+    return result.rename_axis('regime').reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Melt-pool widths and depths from etched '
+                                                 'cross-section images')
+    parser.add_argument('paths', nargs='+', help='Images or folders with them')
+    parser.add_argument('--pixel-size', type=float, default=1.0, help='µm per pixel')
+    parser.add_argument('--sigma', type=float, default=2.0, help='Line scale, px')
+    parser.add_argument('--k', type=float, default=4.0, help='Line detection threshold')
+    parser.add_argument('--min-width', type=float, default=30.0, help='Smallest pool, µm')
+    parser.add_argument('--max-width', type=float, help='Largest pool, µm')
+    parser.add_argument('--min-r2', type=float, default=0.8, help='Parabola fit quality')
+    parser.add_argument('--bright', action='store_true', help='Boundaries brighter than matrix')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--output', default='meltpool_summary.csv',
+                        help='Per-regime table (tracks go to <name>_tracks.csv)')
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, f) for f in os.listdir(path)
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            files.append(path)
+    tracks = measure_images(files, args.processes, pixel_size=args.pixel_size, sigma=args.sigma,
+                            k=args.k, min_width_um=args.min_width, max_width_um=args.max_width,
+                            min_r2=args.min_r2, dark=not args.bright)
+    summary = regime_statistics(tracks)
+    print(summary.to_string(index=False, float_format='%.1f'))
+    summary.to_csv(args.output, index=False)
+    tracks.to_csv(os.path.splitext(args.output)[0] + '_tracks.csv', index=False)
@@ -1,15 +1,26 @@
-import numpy as np
+import os
+import sys
+
 import matplotlib.pyplot as plt
 from matplotlib.patches import Patch
 import matplotlib.ticker as ticker
 
+# The measurement store lives in plot_excel
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'plot_excel'))
+from measurement_store import open_store
+
+# Elastic modulus of every specimen with the energy density of its regime
+modulus = open_store().measurements('E', 'Ti13Nb13Zr5Cu', test='tensile')
+
 # Data for chess pattern strategy
-chess_energy = np.array([50.0, 50.0, 40.0])  # Energy density values
-chess_modulus = np.array([91.41, 100.96, 116.04])  # Elastic modulus values
+chess = modulus[modulus['strategy'] == 'Chess']
+chess_energy = chess['energy'].to_numpy()  # Energy density values
+chess_modulus = chess['value'].to_numpy()  # Elastic modulus values
 
 # Data for linear pattern strategy
-linear_energy = np.array([80.0, 80.0, 80.0, 62.5, 62.5, 78.1, 78.1, 78.1, 50.0])
-linear_modulus = np.array([83.95, 91.20, 87.25, 104.24, 83.76, 89.32, 97.89, 86.48, 106.50])
+linear = modulus[modulus['strategy'] == 'Linear']
+linear_energy = linear['energy'].to_numpy()
+linear_modulus = linear['value'].to_numpy()
 
 # Create the figure with specified size and DPI for publication quality
 plt.figure(figsize=(9, 7), dpi=300)
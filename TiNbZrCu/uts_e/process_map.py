@@ -0,0 +1,205 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Column titles of the regime tables (Ti13Nb13Zr5Cu_density.csv/.xlsx)
+COLUMNS = {
+    'Название режима': 'regime',
+    'Мощность (P), Вт': 'power',
+    'Скорость (V), мм/с': 'speed',
+    'Толщина слоя (t), мкм': 'layer',
+    'Расстояние между треками (h), мкм': 'hatch',
+    'Стратегия сканирования': 'strategy',
+    'Плотность энергии*, Дж/мм³': 'energy',
+    'Примечание': 'note',
+    'Плотность (взвешивание), г/см3': 'density_weighing',
+    'Плотность (металлографический метод на шлифе), %': 'density',
+}
+STRATEGIES = {'Шахматная': 'Chess', 'Линейная': 'Linear'}
+
+# Regime notes that mean every layer was scanned more than once
+SCANS = {'Двойное сканирование': 2}
+
+# Process windows: (lower bound, upper bound, colour, label) of the mapped density, %
+DENSITY_WINDOWS = [
+    (95.0, 99.0, 'orange', 'Density 95–99%'),
+    (99.0, 99.7, 'yellow', 'Density 99–99.7%'),
+    (99.7, 100.0, 'green', 'Density > 99.7%'),
+]
+
+
+def load_regimes(file_path):
+    """
+    Regime table (CSV with ';' or Excel) with English column names.
+
+    Known Russian titles are renamed (see COLUMNS), decimal commas are
+    read as points and the strategy becomes 'Chess'/'Linear'. The number
+    of scans per layer comes from the note (see SCANS), and the energy
+    becomes the delivered one: the tabulated per-scan value times the
+    scans (L2, scanned twice at 40 J/mm³, gets 80 J/mm³). Other numeric
+    columns (UTS, hardness, ...) are kept for mapping.
+    """
+    if file_path.lower().endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(file_path)
+    else:
+        df = pd.read_csv(file_path, sep=';', encoding='utf-8-sig')
+    df.columns = [str(c).strip() for c in df.columns]
+    df = df.rename(columns=COLUMNS)
+    for column in df.columns:
+        if (not pd.api.types.is_numeric_dtype(df[column])
+                and column not in ('regime', 'strategy', 'note')):
+            converted = pd.to_numeric(df[column].astype(str).str.replace(',', '.'), errors='coerce')
+            if converted.notna().sum() >= df[column].notna().sum():
+                df[column] = converted
+    if 'strategy' in df:
+        df['strategy'] = df['strategy'].map(lambda s: STRATEGIES.get(str(s).strip(), s))
+    note = df['note'].fillna('').astype(str) if 'note' in df else pd.Series('', df.index)
+    df['scans'] = note.map(lambda text: max([k for s, k in SCANS.items() if s in text],
+                                            default=1))
+    if 'energy' in df:
+        df['energy'] = df['energy'] * df['scans']
+    return df
+
+
+def _average_duplicates(x, y, z):
+    """Mean value at every distinct (x, y); repeated regimes would make the fit singular"""
+    points = pd.DataFrame({'x': x, 'y': y, 'z': z}).dropna()
+    points = points.groupby(['x', 'y'], as_index=False)['z'].mean()
+    return points[['x', 'y']].to_numpy(dtype=float), points['z'].to_numpy(dtype=float)
+
+
+def _gp(points, values, grid, length_scales=np.geomspace(0.15, 2.0, 24), noise=1e-2):
+    """
+    Gaussian process mean and standard deviation on grid (unit-scaled coordinates).
+
+    Squared-exponential kernel on a constant mean; the length scale is the
+    candidate with the largest log marginal likelihood, all candidates
+    evaluated in one batched Cholesky factorisation. noise is the nugget
+    as a fraction of the value variance.
+    """
+    mean = values.mean()
+    scale = values.std() or 1.0
+    z = (values - mean) / scale
+    d2 = ((points[:, None, :] - points[None, :, :]) ** 2).sum(-1)
+    K = np.exp(-0.5 * d2[None] / length_scales[:, None, None] ** 2)
+    K += noise * np.eye(len(points))
+    L = np.linalg.cholesky(K)                                 # (scales, n, n)
+    a = np.linalg.solve(L, np.broadcast_to(z, (len(length_scales), len(z)))[..., None])
+    lml = -0.5 * (a[..., 0] ** 2).sum(-1) - np.log(np.diagonal(L, axis1=1, axis2=2)).sum(-1)
+    best = int(np.argmax(lml))
+
+    ks = np.exp(-0.5 * ((grid[:, None, :] - points[None, :, :]) ** 2).sum(-1)
+                / length_scales[best] ** 2)                   # (grid, n)
+    alpha = np.linalg.solve(K[best], z)
+    v = np.linalg.solve(L[best], ks.T)
+    std = np.sqrt(np.clip(1 + noise - (v ** 2).sum(0), 0, None))
+    return mean + scale * ks @ alpha, scale * std
+
+
+def interpolate_map(x, y, z, x_range, y_range, method='gp', resolution=200, max_std=0.5,
+                    reach=0.15, smoothing=0.0):
+    """
+    Property map over the speed–power plane from scattered regimes.
+
+    Coordinates are scaled to the unit square of x_range × y_range so both
+    axes weigh the same. method='gp' is a Gaussian process (see _gp),
+    method='rbf' a thin-plate-spline RBFInterpolator (smoothing > 0 to
+    let it miss noisy points). The whole resolution × resolution grid is
+    evaluated in one vectorised call. Both interpolants overshoot between
+    sparse points, so the map is clipped to the measured range (a window
+    better than the best regime would be invented). Unsupported grid
+    points are masked: for the GP where its posterior standard deviation
+    exceeds max_std times the spread of the measured values, for the RBF
+    (which has no error estimate) farther than reach (unit-square
+    distance) from every measured regime. Returns (X, Y, Z) with Z a
+    masked array.
+    """
+    points, values = _average_duplicates(x, y, z)
+    if len(points) < 3:
+        raise ValueError("Need at least three distinct regimes to map a property")
+    lo = np.array([x_range[0], y_range[0]], dtype=float)
+    span = np.array([x_range[1] - x_range[0], y_range[1] - y_range[0]], dtype=float)
+    X, Y = np.meshgrid(np.linspace(*x_range, resolution), np.linspace(*y_range, resolution))
+    grid = (np.column_stack([X.ravel(), Y.ravel()]) - lo) / span
+    unit = (points - lo) / span
+
+    if method == 'gp':
+        Z, std = _gp(unit, values, grid)
+        unsupported = std > max_std * (values.std() or 1.0)
+    elif method == 'rbf':
+        from scipy.interpolate import RBFInterpolator
+        from scipy.spatial import cKDTree
+        Z = RBFInterpolator(unit, values, kernel='thin_plate_spline', smoothing=smoothing)(grid)
+        distance, _ = cKDTree(unit).query(grid)
+        unsupported = distance > reach
+    else:
+        raise ValueError(f"Unknown method '{method}', use 'gp' or 'rbf'")
+
+    Z = np.ma.masked_where(unsupported, np.clip(Z, values.min(), values.max()))
+    return X, Y, Z.reshape(X.shape)
+
+
+def plot_process_map(ax, regimes, value='density', windows=DENSITY_WINDOWS, x_range=(400, 1100),
+                     y_range=(100, 300), method='gp', contour_labels=True, **kwargs):
+    """
+    Filled process windows of one strategy on ax.
+
+    Each (low, high, colour, label) window is the region where the
+    interpolated value lies between low and high; thin contour lines mark
+    the window borders. Returns the (X, Y, Z) map.
+    """
+    X, Y, Z = interpolate_map(regimes['speed'], regimes['power'], regimes[value], x_range,
+                              y_range, method, **kwargs)
+    for low, high, color, label in windows:
+        inside = np.ma.masked_where((Z < low) | (Z >= high), Z)
+        if inside.count():
+            ax.contourf(X, Y, inside, levels=[low, high], colors=[color], alpha=0.3, zorder=1)
+            ax.fill_between([], [], color=color, alpha=0.3, label=label)
+    borders = sorted({w[0] for w in windows} | {w[1] for w in windows})
+    lines = ax.contour(X, Y, Z, levels=borders, colors='gray', linewidths=0.6, zorder=1)
+    if contour_labels and lines.allsegs and any(len(s) for s in lines.allsegs):
+        ax.clabel(lines, fmt='%g', fontsize=8)
+    return X, Y, Z
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Process windows interpolated from measured '
+                                                 'regimes over the speed–power plane')
+    parser.add_argument('table', help='Regime table (CSV or Excel)')
+    parser.add_argument('--value', default='density', help='Column to map (density, UTS, ...)')
+    parser.add_argument('--levels', nargs='+', type=float,
+                        help='Window borders for values other than density')
+    parser.add_argument('--method', choices=['gp', 'rbf'], default='gp')
+    parser.add_argument('--output', default='process_map.png')
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    regimes = load_regimes(args.table)
+    windows = DENSITY_WINDOWS
+    if args.levels:
+        colors = plt.cm.viridis(np.linspace(0.1, 0.9, len(args.levels) - 1))
+        windows = [(lo, hi, c, f'{args.value} {lo:g}–{hi:g}')
+                   for lo, hi, c in zip(args.levels[:-1], args.levels[1:], colors)]
+    groups = list(regimes.groupby('strategy')) if 'strategy' in regimes else [('', regimes)]
+    fig, axes = plt.subplots(1, len(groups), figsize=(6 * len(groups), 5), dpi=200,
+                             sharey=True, squeeze=False)
+    for ax, (strategy, group) in zip(axes[0], groups):
+        plot_process_map(ax, group, args.value, windows, method=args.method)
+        ax.scatter(group['speed'], group['power'], c='#2563eb', s=60, edgecolors='black',
+                   linewidth=0.5, zorder=2)
+        for _, row in group.iterrows():
+            ax.annotate(row.get('regime', ''), (row['speed'], row['power']), xytext=(4, 4),
+                        textcoords='offset points', fontsize=8)
+        ax.set_title(strategy)
+        ax.set_xlabel('Scanning speed, mm/s')
+        ax.grid(True, linestyle='--', alpha=0.7)
+        ax.legend(fontsize=9, loc='upper right')
+    axes[0, 0].set_ylabel('Laser power, W')
+    plt.tight_layout()
+    plt.savefig(args.output, bbox_inches='tight')
+    print(f"Saved {os.path.abspath(args.output)}")
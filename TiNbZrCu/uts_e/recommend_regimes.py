@@ -0,0 +1,189 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+
+from process_map import _gp
+
+# The measurement store lives in plot_excel
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'plot_excel'))
+from measurement_store import open_store
+
+# Scans per layer is a feature of its own: L1 and L2 share power, speed, hatch and
+# strategy, and L2 differs only by the second scan (twice the delivered energy)
+FEATURES = ['power', 'speed', 'hatch', 'linear', 'scans']
+# Property -> +1 to maximise, -1 to minimise (a low modulus is wanted for implants)
+OBJECTIVES = {'density': 1.0, 'hardness': 1.0, 'modulus': -1.0}
+# Objective names -> properties of the measurement store
+PROPERTIES = {'density': 'relative_density', 'hardness': 'HV', 'modulus': 'E'}
+
+
+def _wide(table):
+    """A per-regime table; long (regime, property, value) tables become one column per property"""
+    if {'property', 'value'} <= set(table.columns):
+        table = table.pivot_table(index='regime', columns='property', values='value',
+                                  aggfunc='mean').reset_index()
+        table.columns.name = None
+    return table
+
+
+def measurements(alloy='Ti13Nb13Zr5Cu', extra=()):
+    """
+    One row per regime with its parameters and every measured property.
+
+    Density, hardness and modulus are the per-regime means of the
+    measurement store (see PROPERTIES), next to the regime parameters
+    with the scans per layer and the delivered energy. extra CSV tables
+    with a 'regime' column, wide (regime,porosity) or long
+    (regime,property,value), are joined on the regime name. Properties a
+    regime was not measured for stay NaN.
+    """
+    regimes = open_store().table(list(PROPERTIES.values()), alloy)
+    regimes = regimes.rename(columns={p: name for name, p in PROPERTIES.items()})
+    regimes = regimes.rename(columns={f'{p}_std': f'{name}_std' for name, p in PROPERTIES.items()})
+    regimes['hatch'] = regimes['hatch'].fillna(100.0)
+    regimes['scans'] = regimes['scans'].fillna(1).astype(float)
+    regimes['linear'] = (regimes['strategy'] == 'Linear').astype(float)
+    for f in extra:
+        table = _wide(pd.read_csv(f, encoding='utf-8-sig', dtype={'regime': str}))
+        regimes = regimes.merge(table, on='regime', how='left')
+    return regimes
+
+
+def candidate_grid(power=(150, 300, 10), speed=(500, 1200, 50), hatch=(60, 80, 100, 120),
+                   strategies=('Chess', 'Linear'), scans=(1, 2), layer=50):
+    """
+    Every combination of power (W) and speed (mm/s) ranges (start, stop,
+    step), hatch (µm), strategy and scans per layer; energy is the
+    delivered energy density (per-scan value times scans).
+    """
+    P, V, H, S, N = np.meshgrid(np.arange(power[0], power[1] + power[2] / 2, power[2]),
+                                np.arange(speed[0], speed[1] + speed[2] / 2, speed[2]),
+                                np.asarray(hatch, dtype=float),
+                                np.array([s == 'Linear' for s in strategies], dtype=float),
+                                np.asarray(scans, dtype=float), indexing='ij')
+    grid = pd.DataFrame({'power': P.ravel(), 'speed': V.ravel(), 'hatch': H.ravel(),
+                         'linear': S.ravel(), 'scans': N.ravel()})
+    grid['strategy'] = np.where(grid['linear'] > 0, 'Linear', 'Chess')
+    grid['energy'] = grid['scans'] * grid['power'] / (grid['speed'] * grid['hatch'] * 1e-3
+                                                      * layer * 1e-3)
+    return grid
+
+
+def _scaled(frame, lo, span):
+    return (frame[FEATURES].to_numpy(dtype=float) - lo) / span
+
+
+def _predict(regimes, candidates, objectives, lo, span, noise, pseudo=None):
+    """Mean and std (candidates × objectives) of one GP per property; pseudo adds believed points"""
+    means, stds = [], []
+    for k, name in enumerate(objectives):
+        known = regimes.dropna(subset=[name]).groupby(FEATURES, as_index=False)[name].mean()
+        x, y = _scaled(known, lo, span), known[name].to_numpy(dtype=float)
+        if pseudo is not None and len(pseudo[0]):
+            x, y = np.vstack([x, pseudo[0]]), np.concatenate([y, pseudo[1][:, k]])
+        if len(y) < 3:
+            raise ValueError(f"'{name}' is measured for fewer than three regimes")
+        m, s = _gp(x, y, candidates, noise=noise)
+        means.append(m)
+        stds.append(s)
+    return np.column_stack(means), np.column_stack(stds)
+
+
+def recommend(regimes, candidates, objectives=OBJECTIVES, constraints=None, batch=4, noise=0.05,
+              exclude_measured=True):
+    """
+    Next batch of regimes by constrained expected improvement.
+
+    A Gaussian process per property (density, hardness, modulus, ...) is
+    fitted over power, speed, hatch, strategy (0/1) and scans per layer,
+    all scaled to the bounds of the candidates, and evaluated on every
+    candidate at once.
+    The properties are standardised and summed with the objective signs
+    into one score whose expected improvement over the best regime so
+    far is multiplied by the probability of meeting every constraint
+    ({property: minimum}, e.g. {'density': 99.5}). The batch is picked
+    greedily: each chosen regime is added to the fits at its predicted
+    values (kriging believer), which lowers the uncertainty around it so
+    the next pick goes elsewhere. Returns the candidates of the batch
+    with predicted mean and std of every property and the acquisition.
+    """
+    constraints = constraints or {}
+    names = list(dict.fromkeys(list(objectives) + list(constraints)))
+    signs = np.array([objectives.get(n, 0.0) for n in names])
+    measured = regimes.dropna(subset=names, how='all')
+    both = pd.concat([measured[FEATURES], candidates[FEATURES]])
+    lo = both.min().to_numpy(dtype=float)
+    span = np.where(both.max() > both.min(), both.max() - both.min(), 1.0).astype(float)
+    centre = measured[names].mean().to_numpy(dtype=float)
+    scale = measured[names].std().fillna(1.0).replace(0, 1.0).to_numpy(dtype=float)
+
+    pool = candidates.reset_index(drop=True)
+    if exclude_measured:
+        done = pool.merge(measured[FEATURES].drop_duplicates(), on=FEATURES, how='left',
+                          indicator=True)['_merge'] == 'both'
+        pool = pool[~done.to_numpy()].reset_index(drop=True)
+    x_pool = _scaled(pool, lo, span)
+    x_meas = _scaled(measured, lo, span)
+
+    rows, picked = [], []
+    pseudo_x, pseudo_y = np.empty((0, len(FEATURES))), np.empty((0, len(names)))
+    for _ in range(min(batch, len(pool))):
+        mean, std = _predict(measured, np.vstack([x_pool, x_meas]), names, lo, span, noise,
+                             (pseudo_x, pseudo_y))
+        z_mean = (mean - centre) / scale
+        score = z_mean @ signs
+        score_std = np.sqrt(((std / scale) ** 2) @ signs ** 2)
+        best = score[len(x_pool):].max()
+        score, score_std = score[:len(x_pool)], np.maximum(score_std[:len(x_pool)], 1e-9)
+        u = (score - best) / score_std
+        acquisition = score_std * (u * norm.cdf(u) + norm.pdf(u))
+        for name, minimum in constraints.items():
+            k = names.index(name)
+            acquisition = acquisition * norm.cdf((mean[:len(x_pool), k] - minimum) /
+                                                 np.maximum(std[:len(x_pool), k], 1e-9))
+        acquisition[picked] = -np.inf
+        i = int(np.argmax(acquisition))
+        row = pool.iloc[i].to_dict()
+        row.update({n: mean[i, k] for k, n in enumerate(names)})
+        row.update({f'{n}_std': std[i, k] for k, n in enumerate(names)})
+        row['acquisition'] = acquisition[i]
+        picked.append(i)
+        pseudo_x = np.vstack([pseudo_x, x_pool[i]])
+        pseudo_y = np.vstack([pseudo_y, mean[i]])
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Propose the next SLM regimes from the '
+                                                 'measured density, hardness and modulus')
+    parser.add_argument('--alloy', default='Ti13Nb13Zr5Cu', help='Alloy in the measurement store')
+    parser.add_argument('--table', nargs='*', default=[],
+                        help="Further CSV tables with a 'regime' column, wide "
+                             "(regime,porosity) or long (regime,property,value)")
+    parser.add_argument('--objective', nargs='+', default=['density:+1', 'hardness:+1'],
+                        help="Properties to improve as name:+1 (maximise) or name:-1 (minimise)")
+    parser.add_argument('--min', nargs='*', default=['density:99.5'],
+                        help='Constraints as name:minimum')
+    parser.add_argument('--scans', nargs='+', type=int, default=[1, 2],
+                        help='Scans per layer to consider')
+    parser.add_argument('--batch', type=int, default=4, help='Regimes per build plate')
+    parser.add_argument('--output', help='Save the proposals to CSV')
+    args = parser.parse_args()
+
+    objectives = {k: float(v) for k, v in (o.split(':') for o in args.objective)}
+    constraints = {k: float(v) for k, v in (c.split(':') for c in args.min)}
+    regimes = measurements(args.alloy, args.table)
+    hatches = sorted(set(regimes['hatch'].dropna()) | {60.0, 120.0})
+    proposals = recommend(regimes, candidate_grid(hatch=hatches, scans=args.scans), objectives,
+                          constraints, args.batch)
+    columns = ['strategy', 'power', 'speed', 'hatch', 'scans', 'energy'] + \
+              [c for c in proposals.columns if c in objectives or c in constraints or
+               c.endswith('_std')] + ['acquisition']
+    print(proposals[columns].to_string(index=False, float_format='%.4g'))
+    if args.output:
+        proposals[columns].to_csv(args.output, index=False)
@@ -3,38 +3,33 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
 import seaborn as sns
+import os
+import sys
 
-def load_and_process_data(file_path='Ti13Nb13Zr5Cu_density.csv'):
-    """Load and process density data from CSV file"""
-    # Читаем CSV файл с указанием разделителя и кодировки
-    df = pd.read_csv(file_path, sep=';', encoding='utf-8')
-    
-    # Очищаем названия столбцов от пробелов
-    df.columns = df.columns.str.strip()
-    
-    # Преобразуем названия столбцов для удобства
-    column_mapping = {
-        'Название режима': 'Режим',
-        'Мощность (P), Вт': 'Мощность',
-        'Скорость (V), мм/с': 'Скорость',
-        'Расстояние между треками (h), мкм': 'Расстояние',
-        'Плотность энергии*, Дж/мм³': 'Энергия',
-        'Плотность (металлографический метод на шлифе), %': 'Плотность',
-    }
-    df = df.rename(columns=column_mapping)
-    
-    # Преобразуем числовые значения, заменяя запятые на точки
-    numeric_columns = ['Энергия', 'Плотность']
-    for col in numeric_columns:
-        df[col] = df[col].str.replace(',', '.').astype(float)
+# Общее хранилище измерений лежит в plot_excel
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from measurement_store import open_store
+
+def load_and_process_data(alloy='Ti13Nb13Zr5Cu'):
+    """Load density data of an alloy from the measurement store"""
+    # Режимы и металлографическая плотность из общего хранилища (measurement_store.py);
+    # хранилище само перечитывает Ti13Nb13Zr5Cu_density.csv, если он изменился
+    density = open_store().summary('relative_density', alloy, test='metallography')
+    df = pd.DataFrame({
+        'Режим': density['regime'],
+        'Мощность': density['power'],
+        'Скорость': density['speed'],
+        'Расстояние': density['hatch'],
+        'Энергия': density['energy'],
+        'Плотность': density['mean'],
+    })
     
-    # Определяем стратегию сканирования
-    df['Strategy'] = df['Режим'].apply(
-        lambda x: 'Linear pattern' if any(c.isalpha() for c in str(x)) else 'Chess pattern'
-    )
+    # Стратегия сканирования из таблицы режимов
+    df['Strategy'] = density['strategy'] + ' pattern'
     
-    # Добавляем стандартные отклонения (можно настроить значения)
-    df['Отклонение'] = np.where(df['Strategy'] == 'Chess pattern', 0.15, 0.08)
+    # Разброс по полям шлифа, если плотность посчитана porosity.py, иначе стандартные значения
+    df['Отклонение'] = density['std'].fillna(
+        pd.Series(np.where(df['Strategy'] == 'Chess pattern', 0.15, 0.08), index=df.index))
     
     print("Loaded data:")
     print(df[['Режим', 'Strategy', 'Энергия', 'Плотность', 'Отклонение']])
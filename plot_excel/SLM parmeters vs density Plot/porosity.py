@@ -0,0 +1,282 @@
+import argparse
+import os
+import re
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from scipy import ndimage
+
+IMAGE_EXTENSIONS = ('.tif', '.tiff', '.png', '.jpg', '.jpeg', '.bmp', '.npy')
+DENSITY_COLUMN = 'Плотность (металлографический метод на шлифе), %'
+DENSITY_STD_COLUMN = 'Отклонение плотности, %'
+REGIME_COLUMN = 'Название режима'
+# Pores less round than this are counted as irregular (lack of fusion)
+IRREGULAR = 0.5
+
+
+def open_micrograph(file_path, cache_dir=None):
+    """
+    Grayscale micrograph as a read-only memory-mapped (rows, cols) array.
+
+    .npy files are mapped directly, uncompressed TIFFs through tifffile
+    when it is installed. Other images (stitched PNG/JPEG/compressed
+    TIFF) are decoded once and written to an .npy cache in cache_dir,
+    so worker processes read only their own tiles from disk.
+    """
+    if file_path.lower().endswith('.npy'):
+        return np.load(file_path, mmap_mode='r')
+    if file_path.lower().endswith(('.tif', '.tiff')):
+        try:
+            import tifffile
+            image = tifffile.memmap(file_path, mode='r')
+            if image.ndim == 2:
+                return image
+        except (ImportError, ValueError):
+            pass
+    from PIL import Image
+    Image.MAX_IMAGE_PIXELS = None          # stitched sections exceed the default limit
+    cache_dir = cache_dir or tempfile.gettempdir()
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    cache = os.path.join(cache_dir, f'{name}_{os.path.getmtime(file_path):.0f}.npy')
+    if not os.path.exists(cache):
+        with Image.open(file_path) as img:
+            np.save(cache, np.asarray(img.convert('L')))
+    return np.load(cache, mmap_mode='r')
+
+
+def otsu_threshold(image, sample=2000):
+    """Otsu threshold of the grey levels, from a strided subsample of at most sample² pixels"""
+    step = max(1, int(np.ceil(max(image.shape) / sample)))
+    values = np.asarray(image[::step, ::step]).ravel()
+    hist, edges = np.histogram(values, bins=256, range=(values.min(), values.max() + 1e-9))
+    centres = (edges[:-1] + edges[1:]) / 2
+    w0 = np.cumsum(hist)
+    w1 = w0[-1] - w0
+    m0 = np.cumsum(hist * centres)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        between = (m0 / w0 - (m0[-1] - m0) / w1) ** 2 * w0 * w1
+    return float(centres[np.nanargmax(between[:-1])])
+
+
+def tiles(shape, tile=2048, overlap=128):
+    """
+    (core, extended) boxes (y0, y1, x0, x1) covering an image.
+
+    Cores partition the image; the extended box adds overlap pixels on
+    every side so pores crossing a core border are seen whole.
+    """
+    rows, cols = shape[:2]
+    for y0 in range(0, rows, tile):
+        for x0 in range(0, cols, tile):
+            core = (y0, min(y0 + tile, rows), x0, min(x0 + tile, cols))
+            ext = (max(y0 - overlap, 0), min(core[1] + overlap, rows),
+                   max(x0 - overlap, 0), min(core[3] + overlap, cols))
+            yield core, ext
+
+
+def measure_tile(file_path, core, ext, threshold, dark=True, min_area=4, cache_dir=None):
+    """
+    Pores of one tile (runs in a worker process).
+
+    The extended tile is thresholded (pores darker than threshold unless
+    dark is False) and 8-connected components are labelled; each pore's
+    area, centroid, second moments and boundary length are summed per
+    label with bincount. A pore belongs to the tile whose core holds its
+    centroid, so pores in the overlap are counted once. Pores touching
+    the extended border inside the image may be cut and are flagged.
+    Returns (core pixels, pore pixels in the core, pore table).
+    """
+    image = open_micrograph(file_path, cache_dir)
+    y0, y1, x0, x1 = ext
+    pixels = np.asarray(image[y0:y1, x0:x1])
+    mask = pixels < threshold if dark else pixels > threshold
+    labels, n = ndimage.label(mask, structure=np.ones((3, 3), dtype=int))
+    flat = labels.ravel()
+    yy, xx = np.indices(labels.shape)
+    yy, xx = yy.ravel().astype(float), xx.ravel().astype(float)
+
+    size = n + 1
+    area = np.bincount(flat, minlength=size).astype(float)
+    sy, sx = np.bincount(flat, yy, size), np.bincount(flat, xx, size)
+    syy, sxx, sxy = (np.bincount(flat, yy * yy, size), np.bincount(flat, xx * xx, size),
+                     np.bincount(flat, xx * yy, size))
+    # Boundary length: pixel edges between a pore and the matrix in the 4 directions
+    edges = np.zeros(size)
+    padded = np.pad(labels, 1)
+    for shift in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+        neighbour = np.roll(padded, shift, axis=(0, 1))[1:-1, 1:-1]
+        boundary = (labels > 0) & (neighbour == 0)
+        edges += np.bincount(labels[boundary], minlength=size)
+
+    keep = np.arange(size) > 0
+    keep &= area >= min_area
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cy, cx = sy / area, sx / area
+        vy, vx, cov = syy / area - cy ** 2, sxx / area - cx ** 2, sxy / area - cx * cy
+    gy, gx = cy + y0, cx + x0
+    keep &= (gy >= core[0]) & (gy < core[1]) & (gx >= core[2]) & (gx < core[3])
+
+    # Pores cut by the extended border (not the image border) are flagged
+    rows, cols = image.shape[:2]
+    touches = np.zeros(size, dtype=bool)
+    for inside, edge in ((y0 > 0, labels[0]), (y1 < rows, labels[-1]),
+                         (x0 > 0, labels[:, 0]), (x1 < cols, labels[:, -1])):
+        if inside:
+            touches[edge] = True
+    touches[0] = False
+
+    label_ids = np.flatnonzero(keep)
+    a = area[label_ids]
+    root = np.sqrt(np.maximum(((vx - vy) / 2) ** 2 + cov ** 2, 0))[label_ids]
+    major = 4 * np.sqrt(np.maximum((vx + vy)[label_ids] / 2 + root, 0))
+    minor = 4 * np.sqrt(np.maximum((vx + vy)[label_ids] / 2 - root, 0))
+    # Edge counts overestimate the length of curved outlines by 4/π
+    perimeter = edges[label_ids] * np.pi / 4
+    pores = {
+        'y': gy[label_ids], 'x': gx[label_ids], 'area_px': a,
+        'diameter_px': 2 * np.sqrt(a / np.pi),
+        'circularity': np.clip(4 * np.pi * a / perimeter ** 2, 0, 1),
+        'aspect': np.where(major > 0, minor / np.where(major > 0, major, 1), 1.0),
+        'cut': touches[label_ids],
+    }
+
+    core_labels = labels[core[0] - y0:core[1] - y0, core[2] - x0:core[3] - x0]
+    counted = np.zeros(size, dtype=bool)
+    counted[1:] = area[1:] >= min_area
+    pore_pixels = int(counted[core_labels].sum())
+    return core_labels.size, pore_pixels, pores
+
+
+def pore_statistics(pores, pixel_size=1.0):
+    """Count, size distribution and shape of a pore table, sizes in µm (pixel_size µm/px)"""
+    if pores.empty:
+        return {'pores': 0}
+    d = pores['diameter_px'] * pixel_size
+    return {
+        'pores': len(pores),
+        'D_mean, µm': d.mean(), 'D50, µm': d.median(), 'D90, µm': d.quantile(0.9),
+        'D_max, µm': d.max(),
+        'circularity': np.average(pores['circularity'], weights=pores['area_px']),
+        'aspect': pores['aspect'].mean(),
+        'irregular, %': 100 * pores.loc[pores['circularity'] < IRREGULAR, 'area_px'].sum()
+                        / pores['area_px'].sum(),
+        'cut pores': int(pores['cut'].sum()),
+    }
+
+
+def specimen_name(file_path):
+    """Regime name from a micrograph file name ('C1_x100_stitched.tif' -> 'C1')"""
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return re.split(r'[ _\-]+', stem)[0]
+
+
+def analyze_micrographs(files, pixel_size=1.0, threshold=None, dark=True, tile=2048, overlap=128,
+                        min_area=4, processes=None, cache_dir=None):
+    """
+    Porosity and pore statistics of every specimen.
+
+    Every micrograph is memory-mapped (open_micrograph), thresholded at
+    its Otsu level unless threshold is given, and cut into tiles that
+    are measured in one process pool across all files. Per specimen
+    (several micrographs of the same regime are pooled): porosity and
+    relative density from the pore area fraction, the spread of the
+    relative density between tiles (area-weighted std, an error bar for
+    the density plots), and the pore statistics (pore_statistics).
+    Returns (summary, pores) DataFrames.
+    """
+    jobs = {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        for f in files:
+            image = open_micrograph(f, cache_dir)
+            level = otsu_threshold(image) if threshold is None else threshold
+            for core, ext in tiles(image.shape, tile, overlap):
+                future = pool.submit(measure_tile, f, core, ext, level, dark, min_area, cache_dir)
+                jobs[future] = f
+        results = []
+        for future in as_completed(jobs):
+            total, porous, pores = future.result()
+            results.append((jobs[future], total, porous, pd.DataFrame(pores)))
+
+    tile_table = pd.DataFrame({'file': [r[0] for r in results],
+                               'pixels': [r[1] for r in results],
+                               'pore_pixels': [r[2] for r in results]})
+    tile_table['specimen'] = tile_table['file'].map(specimen_name)
+    tile_table['density'] = 100 * (1 - tile_table['pore_pixels'] / tile_table['pixels'])
+    pores = pd.concat([r[3].assign(file=os.path.basename(r[0]), specimen=specimen_name(r[0]))
+                       for r in results], ignore_index=True)
+
+    rows = []
+    for specimen, group in tile_table.groupby('specimen', sort=False):
+        weights = group['pixels'] / group['pixels'].sum()
+        porosity = 100 * group['pore_pixels'].sum() / group['pixels'].sum()
+        spread = np.sqrt((weights * (group['density'] - (100 - porosity)) ** 2).sum())
+        area_mm2 = group['pixels'].sum() * (pixel_size * 1e-3) ** 2
+        row = {'specimen': specimen, 'images': group['file'].nunique(), 'tiles': len(group),
+               'area, mm²': area_mm2, 'porosity, %': porosity, 'density, %': 100 - porosity,
+               'density std, %': spread}
+        specimen_pores = pores[pores['specimen'] == specimen] if len(pores) else pores
+        row.update(pore_statistics(specimen_pores, pixel_size))
+        row['pores per mm²'] = row['pores'] / area_mm2 if area_mm2 else np.nan
+        rows.append(row)
+    return pd.DataFrame(rows), pores
+
+
+def update_density_table(table_path, summary, output_path=None):
+    """
+    Write the measured relative density (and its tile spread) into a
+    regime table like Ti13Nb13Zr5Cu_density.csv, matching specimens to
+    'Название режима'. Other rows keep their values. The table is saved
+    with ';' and decimal commas as the plotting scripts read it.
+    """
+    df = pd.read_csv(table_path, sep=';', encoding='utf-8-sig', dtype=str)
+    # Titles are matched without the stray spaces of the original file but written back as they are
+    titles = {c.strip(): c for c in df.columns}
+    regime_column = titles[REGIME_COLUMN]
+    density_column = titles.get(DENSITY_COLUMN, DENSITY_COLUMN)
+    std_column = titles.get(DENSITY_STD_COLUMN, DENSITY_STD_COLUMN)
+    measured = summary.set_index('specimen')
+    match = df[regime_column].str.strip().isin(measured.index)
+    regimes = df.loc[match, regime_column].str.strip()
+    df.loc[match, density_column] = regimes.map(lambda r: f"{measured.loc[r, 'density, %']:.2f}")
+    if std_column not in df:
+        df[std_column] = ''
+    df.loc[match, std_column] = regimes.map(lambda r: f"{measured.loc[r, 'density std, %']:.2f}")
+    for column in (density_column, std_column):
+        df[column] = df[column].fillna('').str.replace('.', ',', regex=False)
+    df.to_csv(output_path or table_path, sep=';', index=False, encoding='utf-8-sig')
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Porosity of metallographic micrographs')
+    parser.add_argument('paths', nargs='+', help='Micrographs or folders with them')
+    parser.add_argument('--pixel-size', type=float, default=1.0, help='µm per pixel')
+    parser.add_argument('--threshold', type=float, help='Grey level (default: Otsu)')
+    parser.add_argument('--bright-pores', action='store_true', help='Pores brighter than matrix')
+    parser.add_argument('--tile', type=int, default=2048)
+    parser.add_argument('--overlap', type=int, default=128, help='Larger than the biggest pore')
+    parser.add_argument('--min-area', type=int, default=4, help='Smallest pore, px')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--output', help='Save the summary (and <name>_pores.csv) to CSV')
+    parser.add_argument('--table', help='Regime table to update (Ti13Nb13Zr5Cu_density.csv)')
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        if os.path.isdir(path):
+            files += sorted(os.path.join(path, f) for f in os.listdir(path)
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            files.append(path)
+    summary, pores = analyze_micrographs(files, args.pixel_size, args.threshold,
+                                         not args.bright_pores, args.tile, args.overlap,
+                                         args.min_area, args.processes)
+    print(summary.to_string(index=False, float_format='%.3f'))
+    if args.output:
+        summary.to_csv(args.output, index=False)
+        pores.to_csv(os.path.splitext(args.output)[0] + '_pores.csv', index=False)
+    if args.table:
+        update_density_table(args.table, summary)
+        print(f"Updated {args.table}")
@@ -0,0 +1,258 @@
+import argparse
+import multiprocessing
+import os
+import queue
+import re
+import signal
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+
+import numpy as np
+import pandas as pd
+
+from dsc_loader import load_dsc
+from dsc_transitions import detect_transitions
+from dsc_enthalpy import integrate_peaks
+from dsc_derivative import derivative_curves
+
+# 'Ti15Ta 1 heat1', 'Ti15Ta SLM 8 cool 2', 'TiTaNbZr_Heating1'
+RUN_NAME = re.compile(
+    r'^(?P<sample>.+?)[ _-]+(?:(?P<regime>\d+)[ _-]+)?'
+    r'(?P<direction>heat(?:ing)?|cool(?:ing)?|нагрев\w*|охлажд\w*)[ _-]*(?P<cycle>\d+)?$',
+    re.IGNORECASE)
+EXTENSIONS = ('.xlsx',)
+
+
+def parse_run_name(file_path):
+    """sample, regime, direction and cycle from an export file name, or None"""
+    match = RUN_NAME.match(os.path.splitext(os.path.basename(file_path))[0].strip())
+    if not match:
+        return None
+    direction = match['direction'].lower()
+    return {
+        'sample': match['sample'].strip(' _-'),
+        'regime': match['regime'] or '',
+        'direction': 'heating' if direction.startswith(('heat', 'нагрев')) else 'cooling',
+        'cycle': int(match['cycle']) if match['cycle'] else 1,
+    }
+
+
+def discover_runs(root, extensions=EXTENSIONS):
+    """Every heating/cooling export below root as a table (file, sample, regime, direction, cycle)"""
+    rows = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in sorted(filenames):
+            if not name.lower().endswith(extensions) or name.startswith('~$'):
+                continue
+            info = parse_run_name(name)
+            if info is not None:
+                rows.append({'file': os.path.join(dirpath, name), **info})
+    columns = ['file', 'sample', 'regime', 'direction', 'cycle']
+    return pd.DataFrame(rows, columns=columns).sort_values(
+        ['sample', 'regime', 'cycle', 'direction'], ignore_index=True)
+
+
+def _load(file_path):
+    """Runs of one file: the export itself, or every curve of a PDF report"""
+    if file_path.lower().endswith('.pdf'):
+        from dsc_pdf import load_dsc_pdf
+        frames = load_dsc_pdf(file_path)
+        if not frames:
+            raise ValueError("no curve found in the report")
+        return frames
+    return [load_dsc(file_path)]
+
+
+def process_run(file_path, baseline='sigmoidal', smooth_k='auto'):
+    """
+    Load, smooth and analyse one file (runs in a worker process).
+
+    A PDF report may hold several curves; each is analysed as its own
+    run. Returns a list with one (direction, curves, table, error) per
+    run: the direction read from the report (None for exports, whose
+    name gives it), the smoothed per-segment curves from
+    derivative_curves, the transitions with enthalpies, and None - or
+    None/None/message in place of curves, table and error when that run
+    fails. A file that cannot be loaded gives one failed run.
+    """
+    try:
+        frames = _load(file_path)
+    except Exception as e:
+        return [(None, None, None, f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=2)}")]
+    runs = []
+    for data in frames:
+        direction = data.attrs.get('meta', {}).get('DIRECTION')
+        try:
+            start = time.perf_counter()
+            curves = derivative_curves(data, width=smooth_k)
+            table = integrate_peaks(data, detect_transitions(data, smooth_k=smooth_k),
+                                    baseline=baseline)
+            table['seconds'] = time.perf_counter() - start
+            runs.append((direction, curves[['segment', 'direction', 'Temperature', 'HF_smooth']],
+                         table, None))
+        except Exception as e:
+            runs.append((direction, None, None,
+                         f"{type(e).__name__}: {e}\n{traceback.format_exc(limit=2)}"))
+    return runs
+
+
+def plot_sample(sample, runs, results, output_file, x_range=None):
+    """Heating (solid) and cooling (dashed) curves of all regimes/cycles of one sample
+    with the detected onset, peak and end temperatures marked"""
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(10, 6), dpi=200)
+    keys = sorted({(r['regime'], r['cycle']) for _, r in runs.iterrows()})
+    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+    for _, run in runs.iterrows():
+        curves, table = results.get((run['file'], run['curve']), (None, None))
+        if curves is None:
+            continue
+        color = colors[keys.index((run['regime'], run['cycle'])) % len(colors)]
+        label = ' '.join(filter(None, [f"Mode {run['regime']}" if run['regime'] else '',
+                                       f"cycle {run['cycle']}", f"({run['direction']})"]))
+        for k, (s, seg) in enumerate(curves.groupby('segment')):
+            ax.plot(seg['Temperature'], seg['HF_smooth'], '-' if run['direction'] == 'heating'
+                    else '--', color=color, lw=1.2, label=label if k == 0 else None)
+            # Onset/end as open and the peak as filled markers (values are in the table)
+            for _, row in table[table['segment'] == s].iterrows():
+                T = row[['T_onset', 'T_peak', 'T_end']].to_numpy(dtype=float)
+                y = np.interp(T, seg['Temperature'], seg['HF_smooth'])
+                ax.plot(T[[0, 2]], y[[0, 2]], 'o', mfc='white', mec=color, ms=4)
+                ax.plot(T[1], y[1], 'o', color=color, ms=4)
+    if x_range:
+        ax.set_xlim(*x_range)
+    ax.set_xlabel('Temperature (°C)', fontsize=14)
+    ax.set_ylabel('DSC signal', fontsize=14)
+    ax.set_title(sample, fontsize=14)
+    ax.legend(fontsize=9, loc='upper right')
+    ax.text(0.01, 0.98, 'exo ↓', transform=ax.transAxes, va='top', fontsize=10)
+    plt.tight_layout()
+    plt.savefig(output_file, bbox_inches='tight')
+    plt.close(fig)
+
+
+def _register_worker(pids):
+    """Pool initializer: report the worker's PID so that it can be stopped at the deadline"""
+    pids.put(os.getpid())
+
+
+def _terminate(pool, pids):
+    """
+    Stop the workers of a process pool, including the ones still running
+    a task. The PIDs come from _register_worker; once they are killed the
+    pool is broken, and shutdown() reaps the workers and fails the
+    remaining futures.
+    """
+    while True:
+        try:
+            pid = pids.get_nowait()
+        except queue.Empty:
+            break
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except OSError:
+            pass                                    # already exited
+    pool.shutdown(wait=True, cancel_futures=True)
+
+
+def process_campaign(root, output_dir=None, processes=None, timeout=None, baseline='sigmoidal',
+                     smooth_k='auto', extensions=EXTENSIONS, x_range=None):
+    """
+    Analyse every DSC export below root and summarise it per sample.
+
+    Files are discovered and paired by sample/regime/cycle from their
+    names, then loaded and analysed in a process pool; every curve of a
+    PDF report is a run of its own ('curve' column). A failing run is
+    recorded and skipped. With timeout (seconds for the whole batch)
+    files still unfinished at the deadline are reported as timed out and
+    their workers are terminated, so the deadline also bounds the wall
+    time. Writes transitions.csv (all transitions with their run keys),
+    runs.csv (status of every run) and one figure per sample into
+    output_dir (default: <root>/dsc_campaign). Returns (transitions, runs).
+    """
+    output_dir = output_dir or os.path.join(root, 'dsc_campaign')
+    os.makedirs(output_dir, exist_ok=True)
+    files = discover_runs(root, extensions)
+    if files.empty:
+        raise FileNotFoundError(f"No heating/cooling exports in {root}")
+
+    outcome = {}
+    pids = multiprocessing.Queue()
+    pool = ProcessPoolExecutor(max_workers=processes, initializer=_register_worker,
+                               initargs=(pids,))
+    futures = {pool.submit(process_run, f, baseline, smooth_k): f for f in files['file']}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            f = futures[future]
+            outcome[f] = future.result()
+            for k, (_, _, _, error) in enumerate(outcome[f]):
+                status = 'ok' if error is None else error.splitlines()[0]
+                curve = f" [curve {k}]" if len(outcome[f]) > 1 else ''
+                print(f"{os.path.relpath(f, root)}{curve}: {status}")
+        pool.shutdown()
+    except FuturesTimeout:
+        _terminate(pool, pids)
+        for f in futures.values():
+            if f not in outcome:
+                print(f"{os.path.relpath(f, root)}: timeout")
+
+    # One row per run: the file row, repeated for every curve of a report
+    rows, results = [], {}
+    for _, file_row in files.iterrows():
+        f = file_row['file']
+        for k, (direction, curves, table, error) in enumerate(outcome.get(f, [(None,) * 4])):
+            status = ('timeout' if f not in outcome else
+                      'ok' if error is None else error.splitlines()[0])
+            rows.append({**file_row, 'direction': direction or file_row['direction'],
+                         'curve': k, 'status': status,
+                         'transitions': len(table) if table is not None else 0})
+            results[(f, k)] = (curves, table)
+    runs = pd.DataFrame(rows, columns=list(files.columns) + ['curve', 'status', 'transitions'])
+
+    tables = []
+    for _, run in runs.iterrows():
+        table = results[(run['file'], run['curve'])][1]
+        if table is None or table.empty:
+            continue
+        table = table.assign(**{k: run[k] for k in ('sample', 'regime', 'cycle', 'curve')})
+        table['file'] = os.path.relpath(run['file'], root)
+        tables.append(table)
+    keys = ['sample', 'regime', 'cycle', 'direction', 'file', 'curve']
+    transitions = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=keys)
+    transitions = transitions[keys + [c for c in transitions.columns if c not in keys]]
+    transitions.to_csv(os.path.join(output_dir, 'transitions.csv'), index=False)
+    runs.assign(file=runs['file'].map(lambda f: os.path.relpath(f, root))).to_csv(
+        os.path.join(output_dir, 'runs.csv'), index=False)
+
+    import matplotlib
+    matplotlib.use('Agg')
+    for sample, group in runs.groupby('sample'):
+        if (group['status'] == 'ok').any():
+            name = re.sub(r'[^\w.-]+', '_', sample)
+            plot_sample(sample, group, results, os.path.join(output_dir, f'{name}_dsc.png'),
+                        x_range)
+    return transitions, runs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Process a campaign of DSC runs')
+    parser.add_argument('root', nargs='?', default='.', help='Directory tree with the exports')
+    parser.add_argument('--output', help='Output folder (default: <root>/dsc_campaign)')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--timeout', type=float, help='Deadline for the whole batch, s')
+    parser.add_argument('--baseline', choices=['linear', 'sigmoidal', 'spline'], default='sigmoidal')
+    parser.add_argument('--pdf', action='store_true', help='Also read PDF reports')
+    parser.add_argument('--range', nargs=2, type=float, metavar=('MIN', 'MAX'),
+                        help='Temperature range of the plots')
+    args = parser.parse_args()
+
+    extensions = EXTENSIONS + (('.pdf',) if args.pdf else ())
+    transitions, runs = process_campaign(args.root, args.output, args.processes, args.timeout,
+                                         args.baseline, extensions=extensions, x_range=args.range)
+    print(runs.drop(columns=['file']).to_string(index=False))
+    if not transitions.empty:
+        print()
+        columns = ['sample', 'regime', 'cycle', 'direction', 'T_onset', 'T_peak', 'T_end', 'ΔH',
+                   'ΔH unit']
+        print(transitions[columns].to_string(index=False, float_format='%.1f'))
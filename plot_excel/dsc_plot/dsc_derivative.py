@@ -0,0 +1,228 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from dsc_loader import load_dsc, split_segments
+
+
+def local_derivatives(x, y, width, order=3, chunk=20000, bounds=None):
+    """
+    Smoothed signal and its first and second derivatives on uneven x.
+
+    A Savitzky–Golay filter assumes equal steps; NETZSCH exports are not
+    evenly spaced in temperature (and repeat values), so here the
+    polynomial of the given order is fitted by least squares around every
+    point with the actual x offsets. The window has a fixed number of
+    points (width divided by the median step, odd) and is shifted inwards
+    at the ends. All points are solved in one batched pass over a
+    (points × window) gather of the neighbours, chunk points at a time,
+    and the value, slope and curvature are read from the same fit.
+
+    bounds ([0, ..., len(x)]) splits x into segments that are smoothed
+    independently in the same pass; width may then be one value per
+    segment. x must be sorted within each segment. Returns
+    (smooth, dy/dx, d²y/dx²).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    bounds = np.asarray(bounds if bounds is not None else [0, n])
+    lengths = np.diff(bounds)
+    width = np.broadcast_to(np.asarray(width, dtype=float), lengths.shape)
+
+    # Window (odd number of points) and scale of every segment
+    steps = np.array([np.median(np.abs(np.diff(x[a:b]))) if b - a > 1 else 0.0
+                      for a, b in zip(bounds[:-1], bounds[1:])])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        points = np.where(steps > 0, width / steps, 0).astype(int) // 2 * 2 + 1
+    windows = np.minimum(np.maximum(points, order + 2 + (order % 2)),
+                         np.where(lengths % 2, lengths, lengths - 1))
+    if (windows <= order).any():
+        raise ValueError(f"Need more than {order} points for an order-{order} fit")
+    halves = windows // 2
+    scales = np.where(steps > 0, halves * steps, 1.0)
+
+    seg = np.repeat(np.arange(len(lengths)), lengths)
+    lo, hi = bounds[:-1][seg], bounds[1:][seg]
+    window, half, scale = windows[seg], halves[seg], scales[seg]
+    longest = int(windows.max())
+    powers = np.arange(order + 1)
+
+    out = np.empty((3, n))
+    for first in range(0, n, chunk):
+        centre = np.arange(first, min(first + chunk, n))
+        start = np.clip(centre - half[centre], lo[centre], hi[centre] - window[centre])
+        idx = start[:, None] + np.arange(longest)[None, :]
+        w = (np.arange(longest)[None, :] < window[centre][:, None]).astype(float)
+        idx = np.minimum(idx, n - 1)
+        s = scale[centre]
+        dx = (x[idx] - x[centre][:, None]) / s[:, None]
+        V = dx[:, :, None] ** powers                           # (m, window, order+1)
+        Vt = (V * w[:, :, None]).transpose(0, 2, 1)
+        M = Vt @ V
+        b = (Vt @ y[idx][:, :, None])[..., 0]
+        # A tiny ridge keeps windows with repeated x values solvable
+        M += 1e-10 * np.trace(M, axis1=1, axis2=2)[:, None, None] * np.eye(order + 1)
+        coef = np.linalg.solve(M, b[..., None])[..., 0]
+        out[0, centre] = coef[:, 0]
+        out[1, centre] = coef[:, 1] / s if order >= 1 else 0.0
+        out[2, centre] = 2 * coef[:, 2] / s ** 2 if order >= 2 else 0.0
+    return out[0], out[1], out[2]
+
+
+def noise_level(x, y, probe=5.0, block=100, quiet=None):
+    """
+    Standard deviation of the signal noise of one segment.
+
+    The residual of a local cubic over probe kelvin (which keeps the
+    shape of any real peak) is split into blocks of block points; the
+    robust spread (MAD) of the quietest quarter of the blocks is the
+    noise, so peaks and the settling at the segment ends do not inflate
+    it. quiet=(x0, x1) uses only that region instead.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    residual = y - local_derivatives(x, y, probe)[0]
+    if quiet is not None:
+        residual = residual[(x >= quiet[0]) & (x <= quiet[1])]
+    blocks = np.array_split(residual, max(len(residual) // block, 1))
+    spread = np.array([1.4826 * np.median(np.abs(b - np.median(b))) for b in blocks])
+    return float(np.percentile(spread, 25))
+
+
+def adaptive_width(x, y, rate, target=1e-4, tau=0.1, max_time=0.5, order=3, quiet=None):
+    """
+    Smoothing width (units of x, i.e. kelvin) for one segment.
+
+    Noise: a local cubic over m points leaves about 9/(4m) of the noise
+    variance at the centre, so m = 9/4·(σ/ε)² points bring the noise σ
+    (noise_level) down to ε = target × the signal span. Rate: features
+    are smeared by the instrument over about tau minutes, so nothing is
+    lost below rate·tau kelvin, and the width never exceeds the
+    temperature covered in max_time minutes, which keeps sharp peaks of
+    slow runs and fast martensitic peaks alike from being flattened.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    step = np.median(np.abs(np.diff(x)))
+    sigma = noise_level(x, y, quiet=quiet)
+    span = np.ptp(np.quantile(y, [0.01, 0.99]))
+    epsilon = target * span if span > 0 else sigma
+    points = 9 / 4 * (sigma / epsilon) ** 2 if epsilon > 0 else order + 2
+    width = max(points * step, abs(rate) * tau)
+    return float(np.clip(width, (order + 2) * step, max(abs(rate) * max_time, (order + 2) * step)))
+
+
+def derivative_curves(data, wrt='Temperature', width='auto', order=3, **kwargs):
+    """
+    DDSC curves of every heating/cooling segment of a run.
+
+    wrt='Temperature' gives dHF/dT and d²HF/dT² (width in kelvin),
+    wrt='Time' gives dHF/dt and d²HF/dt² per minute (width in minutes).
+    width='auto' picks it per segment with adaptive_width (kwargs go
+    there). All segments are smoothed in one local_derivatives call.
+    Returns a DataFrame with segment, direction, Temperature, Time,
+    Heat_Flow, HF_smooth, dHF, d2HF and width (in units of wrt); rows
+    are sorted by the chosen variable within each segment, and 'row' is
+    the position of each point in data.
+    """
+    if wrt not in ('Temperature', 'Time'):
+        raise ValueError("wrt must be 'Temperature' or 'Time'")
+    columns = ['segment', 'direction', 'Temperature', 'Time', 'Heat_Flow', 'HF_smooth',
+               'dHF', 'd2HF', 'width', 'row']
+    parts, widths = [], []
+    for s, (direction, rate, part) in enumerate(split_segments(data.assign(row=np.arange(len(data))))):
+        part = part.sort_values(wrt, kind='stable').reset_index(drop=True)
+        if width == 'auto':
+            w = adaptive_width(part['Temperature'].to_numpy(), part['Heat_Flow'].to_numpy(),
+                               rate, order=order, **kwargs)
+            w = w / rate if wrt == 'Time' else w
+        else:
+            w = float(width)
+        parts.append(part[['Temperature', 'Time', 'Heat_Flow', 'row']].assign(
+            segment=s, direction=direction, width=w))
+        widths.append(w)
+    if not parts:
+        return pd.DataFrame(columns=columns)
+    curves = pd.concat(parts, ignore_index=True)
+    bounds = np.concatenate([[0], np.cumsum([len(p) for p in parts])])
+    smooth, d1, d2 = local_derivatives(curves[wrt].to_numpy(), curves['Heat_Flow'].to_numpy(),
+                                       widths, order, bounds=bounds)
+    return curves.assign(HF_smooth=smooth, dHF=d1, d2HF=d2)[columns]
+
+
+def smooth_signal(data, width='auto', order=3, **kwargs):
+    """
+    Heat flow smoothed segment by segment, aligned with the rows of data.
+
+    Replacement for savgol_filter(signal, 51, 3): the window follows the
+    sampling, rate and noise of each segment (see derivative_curves).
+    Points outside the heating/cooling segments keep their raw values.
+    """
+    smooth = data['Heat_Flow'].to_numpy(dtype=float).copy()
+    curves = derivative_curves(data, 'Temperature', width, order, **kwargs)
+    smooth[curves['row'].to_numpy(dtype=int)] = curves['HF_smooth'].to_numpy()
+    return smooth
+
+
+def plot_derivatives(ax, curves, wrt='Temperature', second=False, colors=None, **kwargs):
+    """
+    Draw the DDSC curves on a twin axis of ax and return that axis.
+
+    curves is the output of derivative_curves; the first derivative is
+    drawn per segment (second=True adds the second derivative dotted).
+    """
+    colors = colors or {'heating': '#2166AC', 'cooling': '#B2182B'}
+    twin = ax.twinx()
+    for _, seg in curves.groupby('segment'):
+        direction = seg['direction'].iloc[0]
+        color = colors.get(direction, 'gray')
+        twin.plot(seg['Temperature'], seg['dHF'], '-', color=color, alpha=0.6, lw=0.8,
+                  label=f'd(HF)/d{"T" if wrt == "Temperature" else "t"} ({direction})', **kwargs)
+        if second:
+            twin.plot(seg['Temperature'], seg['d2HF'], ':', color=color, alpha=0.6, lw=0.8,
+                      **kwargs)
+    twin.axhline(0, color='gray', lw=0.5, alpha=0.5)
+    # Segment ends (where the furnace turns round) spike; scale to the bulk of the curve
+    values = curves[['dHF', 'd2HF']].to_numpy().ravel() if second else curves['dHF'].to_numpy()
+    lo, hi = np.nanquantile(values, [0.005, 0.995])
+    pad = 0.1 * (hi - lo)
+    twin.set_ylim(lo - pad, hi + pad)
+    unit = 'K' if wrt == 'Temperature' else 'min'
+    twin.set_ylabel(f'DDSC (mW/mg/{unit})')
+    return twin
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Derivative DSC (DDSC) curves')
+    parser.add_argument('files', nargs='+', help='NETZSCH .xlsx exports')
+    parser.add_argument('--wrt', choices=['Temperature', 'Time'], default='Temperature')
+    parser.add_argument('--width', default='auto',
+                        help="Smoothing window, K (or min with --wrt Time), or 'auto'")
+    parser.add_argument('--order', type=int, default=3)
+    parser.add_argument('--second', action='store_true', help='Also plot the second derivative')
+    parser.add_argument('--output', default='.', help='Directory for CSV and PNG files')
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    os.makedirs(args.output, exist_ok=True)
+    for f in args.files:
+        width = args.width if args.width == 'auto' else float(args.width)
+        curves = derivative_curves(load_dsc(f), args.wrt, width, args.order)
+        name = os.path.splitext(os.path.basename(f))[0]
+        curves.to_csv(os.path.join(args.output, f'{name}_ddsc.csv'), index=False)
+        fig, ax = plt.subplots(figsize=(10, 6), dpi=200)
+        ax.plot(curves['Temperature'], curves['HF_smooth'], color='#444444', lw=1.0)
+        ax.set_xlabel('Temperature (°C)')
+        ax.set_ylabel('Heat Flow (mW/mg)')
+        plot_derivatives(ax, curves, args.wrt, args.second)
+        plt.tight_layout()
+        plt.savefig(os.path.join(args.output, f'{name}_ddsc.png'), bbox_inches='tight')
+        plt.close(fig)
+        widths = ', '.join(f'{w:.2g}' for w in curves.groupby('segment')['width'].first())
+        print(f"{f}: {len(curves)} points, {curves['segment'].nunique()} segment(s), "
+              f"width {widths} {'K' if args.wrt == 'Temperature' else 'min'}")
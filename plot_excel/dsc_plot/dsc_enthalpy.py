@@ -0,0 +1,222 @@
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from dsc_loader import load_dsc, split_segments
+from dsc_transitions import detect_transitions, _window_fit
+
+BASELINES = ('linear', 'sigmoidal', 'spline')
+
+
+def _mass_mg(meta):
+    value = meta.get('SAMPLE MASS /mg')
+    return float(str(value).replace(',', '.')) if value not in (None, '') else np.nan
+
+
+def specific_heat_flow(data):
+    """
+    DSC signal in W/g (= mW/mg) and the unit actually obtained.
+
+    The unit comes from the column title of the export ('DSC/(mW/mg)',
+    'DSC/(uV/mg)', ...). µV signals are divided by the sensitivity column
+    (Sensitivity, µV/mW) and absolute signals by the sample mass from the
+    header. Runs measured without a sensitivity calibration (sensitivity
+    1) stay in µV/mg, so their areas come out in µV·s/mg, not J/g.
+    """
+    meta = data.attrs.get('meta', {})
+    title = (meta.get('columns') or ['', '', 'DSC/(mW/mg)'])[2]
+    match = re.search(r'\((.*)\)', title)
+    unit = (match.group(1) if match else 'mW/mg').replace('µ', 'u')
+    q = data['Heat_Flow'].to_numpy(dtype=float)
+    result = 'J/g'
+    if unit.startswith('uV'):
+        sensitivity = data['Sensitivity'].to_numpy(dtype=float)
+        if np.allclose(sensitivity, 1.0):
+            result = 'µV·s/mg'
+        else:
+            q = q / sensitivity
+    if not unit.endswith('/mg'):
+        q = q / _mass_mg(meta)
+    return q, result
+
+
+def _segment_arrays(data, q):
+    """Temperature, time (s) and signal of all segments concatenated as in detect_transitions"""
+    data = data.assign(q=q)
+    T, t, y, bounds = [], [], [], [0]
+    for _, _, part in split_segments(data):
+        T.append(part['Temperature'].to_numpy())
+        t.append(part['Time'].to_numpy() * 60.0)
+        y.append(part['q'].to_numpy())
+        bounds.append(bounds[-1] + len(part))
+    return np.concatenate(T), np.concatenate(t), np.concatenate(y), np.array(bounds)
+
+
+def _hermite(x, x0, x1, y0, y1, m0, m1):
+    """Cubic Hermite curve on [x0, x1] with end values y0, y1 and slopes m0, m1"""
+    h = x1 - x0
+    s = (x - x0) / h
+    return ((2 * s**3 - 3 * s**2 + 1) * y0 + (s**3 - 2 * s**2 + s) * h * m0 +
+            (-2 * s**3 + 3 * s**2) * y1 + (s**3 - s**2) * h * m1)
+
+
+def integrate_peaks(data, transitions, baseline='linear', baseline_k=15.0, exo_sign=-1,
+                    iterations=3, return_curves=False):
+    """
+    Transformation enthalpy of every detected peak.
+
+    Between the integration limits T_from and T_to of each transition the
+    baseline is either a straight line between the extrapolated pre- and
+    post-transition lines ('linear'), the sigmoidal baseline that moves
+    from the pre- to the post-line in proportion to the reacted fraction
+    ('sigmoidal', refined `iterations` times), or a cubic Hermite spline
+    joining both lines with matching slopes ('spline'). The pre/post lines
+    are least-squares fits over baseline_k kelvin outside the limits.
+
+    The area of signal minus baseline is integrated over time (trapezoids
+    with the measured Time steps, so uneven sampling is handled) for all
+    peaks at once on a padded (peaks × points) array. Endothermic effects
+    are positive. Returns the transitions table with 'ΔH' and 'ΔH unit'
+    columns, plus (T, baseline, conversion α) per peak when return_curves
+    is set.
+    """
+    if baseline not in BASELINES:
+        raise ValueError(f"Unknown baseline '{baseline}', use one of {BASELINES}")
+    table = transitions.copy()
+    if table.empty:
+        table['ΔH'] = []
+        return (table, []) if return_curves else table
+
+    q, unit = specific_heat_flow(data)
+    T, t, y, bounds = _segment_arrays(data, q)
+    seg = table['segment'].to_numpy(dtype=int)
+    lo_seg, hi_seg = bounds[seg], bounds[seg + 1]
+    i_from = np.array([lo + np.searchsorted(T[lo:hi], v) for lo, hi, v in
+                       zip(lo_seg, hi_seg, table['T_from'])])
+    i_to = np.array([lo + np.searchsorted(T[lo:hi], v, side='right') - 1 for lo, hi, v in
+                     zip(lo_seg, hi_seg, table['T_to'])])
+    i_from = np.clip(i_from, lo_seg, hi_seg - 2)
+    i_to = np.clip(i_to, i_from + 1, hi_seg - 1)
+
+    # Pre- and post-transition lines from cumulative sums
+    step = np.median(np.abs(np.diff(T)))
+    nb = max(int(baseline_k / step), 3)
+    x = T - T.mean()
+    cum = [np.concatenate([[0.0], np.cumsum(v)]) for v in (np.ones_like(x), x, y, x * x, x * y)]
+    slope_pre, icpt_pre = _window_fit(cum, np.maximum(i_from - nb, lo_seg), i_from + 1)
+    slope_post, icpt_post = _window_fit(cum, i_to, np.minimum(i_to + nb, hi_seg))
+
+    # Padded (peaks, points) view of every integration window
+    length = int((i_to - i_from).max()) + 1
+    idx = i_from[:, None] + np.arange(length)[None, :]
+    inside = idx <= i_to[:, None]
+    idx = np.minimum(idx, len(T) - 1)
+    X, Y, S = x[idx], y[idx], t[idx]
+    pre = icpt_pre[:, None] + slope_pre[:, None] * X
+    post = icpt_post[:, None] + slope_post[:, None] * X
+    x0, x1 = x[i_from][:, None], x[i_to][:, None]
+    pre0, post1 = pre[:, :1], icpt_post[:, None] + slope_post[:, None] * x1
+
+    dt = np.abs(np.diff(S, axis=1)) * (inside[:, 1:] & inside[:, :-1])
+
+    def area(base):
+        d = Y - base
+        return np.concatenate([np.zeros((len(d), 1)),
+                               np.cumsum(0.5 * (d[:, 1:] + d[:, :-1]) * dt, axis=1)], axis=1)
+
+    if baseline == 'spline':
+        base = _hermite(X, x0, x1, pre0, post1, slope_pre[:, None], slope_post[:, None])
+    else:
+        base = pre0 + (X - x0) / (x1 - x0) * (post1 - pre0)
+        if baseline == 'sigmoidal':
+            for _ in range(iterations):
+                partial = area(base)
+                total = partial[np.arange(len(partial)), i_to - i_from][:, None]
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    alpha = np.clip(partial / total, 0, 1)
+                base = (1 - alpha) * pre + alpha * post
+
+    partial = area(base)
+    total = partial[np.arange(len(base)), i_to - i_from]
+    table['baseline'] = baseline
+    table['ΔH'] = -exo_sign * total
+    table['ΔH unit'] = unit
+    if not return_curves:
+        return table
+    # Conversion grows in time order, i.e. downwards in temperature on cooling
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.clip(partial / total[:, None], 0, 1)
+    cooling = (table['direction'] == 'cooling').to_numpy()
+    fraction[cooling] = 1 - fraction[cooling]
+    curves = [(T[i_from[k]:i_to[k] + 1], base[k, :n], fraction[k, :n])
+              for k, n in enumerate(i_to - i_from + 1)]
+    return table, curves
+
+
+def enthalpy_table(files, baseline='linear', **kwargs):
+    """Transitions with enthalpies for several exports, one row per peak"""
+    tables = []
+    for f in files:
+        data = load_dsc(f)
+        table = integrate_peaks(data, detect_transitions(data, **kwargs), baseline=baseline)
+        table.insert(0, 'file', os.path.basename(f))
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+
+def plot_baselines(data, table, curves, output_file, margin=60):
+    """Signal with the constructed baselines and shaded integrated areas"""
+    import matplotlib.pyplot as plt
+    q, unit = specific_heat_flow(data)
+    fig, ax = plt.subplots(figsize=(10, 6), dpi=200)
+    ax.plot(data['Temperature'], q, color='#444444', lw=1.0)
+    for (Tb, base, _), (_, row) in zip(curves, table.iterrows()):
+        order = np.argsort(data['Temperature'].to_numpy())
+        signal = np.interp(Tb, data['Temperature'].to_numpy()[order], q[order])
+        ax.plot(Tb, base, '--', color='#d62728', lw=1.0)
+        ax.fill_between(Tb, base, signal, color='#d62728', alpha=0.2)
+        ax.text(row['T_peak'], signal[np.argmax(np.abs(signal - base))],
+                f"{row['ΔH']:.2f} {row['ΔH unit']}", ha='center',
+                va='bottom' if row['ΔH'] > 0 else 'top', fontsize=10)
+    lo = table['T_from'].min() - margin
+    hi = table['T_to'].max() + margin
+    ax.set_xlim(lo, hi)
+    visible = (data['Temperature'] > lo) & (data['Temperature'] < hi)
+    span = np.ptp(q[visible])
+    ax.set_ylim(q[visible].min() - 0.1 * span, q[visible].max() + 0.15 * span)
+    ax.set_xlabel('Temperature (°C)', fontsize=14)
+    ax.set_ylabel('Heat Flow (W/g)' if unit == 'J/g' else 'DSC (µV/mg)', fontsize=14)
+    plt.tight_layout()
+    plt.savefig(output_file, bbox_inches='tight')
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='DSC baselines and transformation enthalpies')
+    parser.add_argument('files', nargs='+', help='NETZSCH .xlsx exports')
+    parser.add_argument('--baseline', choices=BASELINES, default='sigmoidal')
+    parser.add_argument('--output', help='Save the table to CSV')
+    parser.add_argument('--plots', help='Directory for baseline plots')
+    args = parser.parse_args()
+
+    if args.plots:
+        import matplotlib
+        matplotlib.use('Agg')
+        os.makedirs(args.plots, exist_ok=True)
+    tables = []
+    for f in args.files:
+        data = load_dsc(f)
+        table, curves = integrate_peaks(data, detect_transitions(data), baseline=args.baseline,
+                                        return_curves=True)
+        table.insert(0, 'file', os.path.basename(f))
+        tables.append(table)
+        if args.plots and len(table):
+            name = os.path.splitext(os.path.basename(f))[0]
+            plot_baselines(data, table, curves, os.path.join(args.plots, f'{name}_baseline.png'))
+    table = pd.concat(tables, ignore_index=True)
+    print(table.drop(columns=['T_from', 'T_to']).to_string(index=False, float_format='%.4g'))
+    if args.output:
+        table.to_csv(args.output, index=False)
@@ -0,0 +1,158 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from dsc_loader import load_dsc
+from dsc_transitions import detect_transitions
+from dsc_enthalpy import integrate_peaks
+
+R = 8.314462618  # J/(mol·K)
+LEVELS = np.round(np.arange(0.1, 0.91, 0.1), 2)
+
+# Isoconversional methods: y = ln(β / T^exponent) against 1/T, Ea = -slope·R / factor
+ISOCONVERSIONAL = {
+    'OFW': (0, 1.052),        # Ozawa–Flynn–Wall, Doyle's approximation
+    'KAS': (2, 1.0),          # Kissinger–Akahira–Sunose
+    'Starink': (1.92, 1.0008),  # Starink's refinement of KAS
+}
+
+
+def conversion_temperatures(data, direction='heating', levels=LEVELS, baseline='sigmoidal',
+                            **kwargs):
+    """
+    Rate, peak and conversion temperatures of the strongest transition of one run.
+
+    The transition with the largest |height| in segments of the given
+    direction is integrated with the chosen baseline, and the temperatures
+    at which the reacted fraction α reaches each level are interpolated
+    from the cumulative area. Returns a dict with 'rate' (K/min, absolute),
+    'T_peak' and 'T_alpha' (array of len(levels)) in °C, or None when the
+    run has no transition in that direction.
+    """
+    table = detect_transitions(data, **kwargs)
+    table = table[table['direction'] == direction]
+    if table.empty:
+        return None
+    table = table.loc[[table['height'].abs().idxmax()]]
+    table, curves = integrate_peaks(data, table, baseline=baseline, return_curves=True)
+    T, _, alpha = curves[0]
+    if direction == 'cooling':
+        # α grows towards lower temperature; interpolate along increasing α
+        T, alpha = T[::-1], alpha[::-1]
+    alpha = np.maximum.accumulate(alpha)
+    row = table.iloc[0]
+    return {'rate': abs(row['rate, K/min']), 'T_peak': row['T_peak'],
+            'T_onset': row['T_onset'], 'T_end': row['T_end'], 'ΔH': row['ΔH'],
+            'T_alpha': np.interp(levels, alpha, T)}
+
+
+def linear_fits(x, y, confidence=0.95):
+    """
+    Straight lines y = a + b·x through every row of x and y (shape (m, n)).
+
+    All m fits are solved together from their stacked 2×2 normal
+    equations. Returns slope, intercept, the half-width of the slope
+    confidence interval (Student t with n - 2 degrees of freedom) and R².
+    Rows with NaN are fitted on their finite points only.
+    """
+    x, y = np.atleast_2d(x).astype(float), np.atleast_2d(y).astype(float)
+    w = np.isfinite(x) & np.isfinite(y)
+    x, y = np.where(w, x, 0.0), np.where(w, y, 0.0)
+    n = w.sum(axis=1)
+    sx, sy = x.sum(axis=1), y.sum(axis=1)
+    sxx, sxy = (x * x).sum(axis=1), (x * y).sum(axis=1)
+    A = np.stack([np.stack([n, sx], -1), np.stack([sx, sxx], -1)], -2)
+    b = np.stack([sy, sxy], -1)
+    det = np.linalg.det(A)
+    ok = (n >= 2) & (np.abs(det) > 1e-12 * np.maximum(sxx * n, 1e-300))
+    solution = np.full((len(x), 2), np.nan)
+    solution[ok] = np.linalg.solve(A[ok], b[ok][..., None])[..., 0]
+    intercept, slope = solution[:, 0], solution[:, 1]
+
+    residual = np.where(w, y - intercept[:, None] - slope[:, None] * x, 0.0)
+    ss_res = (residual ** 2).sum(axis=1)
+    ss_tot = (np.where(w, y - (sy / np.maximum(n, 1))[:, None], 0.0) ** 2).sum(axis=1)
+    dof = n - 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        se = np.sqrt(ss_res / dof * n / det)
+        half = stats.t.ppf(0.5 + confidence / 2, dof) * se
+        r2 = 1 - ss_res / ss_tot
+    half[dof < 1] = np.nan
+    return slope, intercept, half, r2
+
+
+def fit_kinetics(runs, levels=LEVELS, confidence=0.95):
+    """
+    Activation energies from runs at several rates (table from kinetics_runs).
+
+    Kissinger: ln(β/Tp²) against 1/Tp. Isoconversional OFW, KAS
+    (ln(β/T²)) and Starink (ln(β/T^1.92)): the same regression at every
+    conversion level α, all levels in one batched fit. Temperatures are
+    converted to kelvin. Returns one row per method and level with Ea
+    and its confidence interval in kJ/mol.
+    """
+    beta = runs['rate, K/min'].to_numpy(dtype=float)
+    if len(np.unique(beta.round())) < 2:
+        raise ValueError("Kinetic fits need runs at two or more different rates")
+    Tp = runs['T_peak'].to_numpy(dtype=float) + 273.15
+    Ta = runs[[f'T_{a:g}' for a in levels]].to_numpy(dtype=float).T + 273.15
+
+    blocks = [('Kissinger', [np.nan], 1 / Tp[None, :], np.log(beta / Tp ** 2)[None, :], 1.0)]
+    for method, (exponent, factor) in ISOCONVERSIONAL.items():
+        blocks.append((method, levels, 1 / Ta, np.log(beta[None, :] / Ta ** exponent), factor))
+
+    x = np.vstack([b[2] for b in blocks])
+    y = np.vstack([b[3] for b in blocks])
+    slope, _, half, r2 = linear_fits(x, y, confidence)
+    factor = np.concatenate([np.full(len(b[1]), b[4]) for b in blocks])
+    Ea = -slope * R / factor / 1000
+    error = half * R / factor / 1000
+    return pd.DataFrame({
+        'method': np.concatenate([[b[0]] * len(b[1]) for b in blocks]),
+        'alpha': np.concatenate([b[1] for b in blocks]),
+        'Ea, kJ/mol': Ea,
+        'CI low': Ea - error,
+        'CI high': Ea + error,
+        'R2': r2,
+        'runs': np.isfinite(x).sum(axis=1),
+    })
+
+
+def kinetics_runs(files, direction='heating', levels=LEVELS, baseline='sigmoidal', **kwargs):
+    """Rate, characteristic and conversion temperatures of every file, one row per run"""
+    rows = []
+    for f in files:
+        result = conversion_temperatures(load_dsc(f), direction, levels, baseline, **kwargs)
+        if result is None:
+            print(f"{os.path.basename(f)}: no {direction} transition, skipped")
+            continue
+        row = {'file': os.path.basename(f), 'rate, K/min': result['rate'],
+               'T_onset': result['T_onset'], 'T_peak': result['T_peak'],
+               'T_end': result['T_end'], 'ΔH': result['ΔH']}
+        row.update({f'T_{a:g}': v for a, v in zip(levels, result['T_alpha'])})
+        rows.append(row)
+    return pd.DataFrame(rows).sort_values('rate, K/min', ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Kissinger / OFW / KAS / Starink activation '
+                                                 'energies from DSC runs at several rates')
+    parser.add_argument('files', nargs='+', help='NETZSCH .xlsx exports, one per rate')
+    parser.add_argument('--direction', choices=['heating', 'cooling'], default='heating')
+    parser.add_argument('--baseline', choices=['linear', 'sigmoidal', 'spline'], default='sigmoidal')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--output', help='Save the activation energies to CSV')
+    args = parser.parse_args()
+
+    runs = kinetics_runs(args.files, args.direction, baseline=args.baseline)
+    print(runs.to_string(index=False, float_format='%.1f'))
+    if runs['rate, K/min'].round().nunique() == 2:
+        print("Warning: only two rates, the confidence intervals are undefined")
+    result = fit_kinetics(runs, confidence=args.confidence)
+    print()
+    print(result.to_string(index=False, float_format='%.3g'))
+    if args.output:
+        result.to_csv(args.output, index=False)
@@ -0,0 +1,160 @@
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+import pandas as pd
+from scipy.signal import savgol_filter
+
+# Column names of the numeric block of a NETZSCH export, in file order
+COLUMNS = ('Temperature', 'Time', 'Heat_Flow', 'Sensitivity')
+HEADER_PATTERN = re.compile(r'#Temp|Temperature')
+
+_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+_PKG = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+def _first_sheet(archive):
+    """Path inside the archive of the first worksheet"""
+    workbook = ET.fromstring(archive.read('xl/workbook.xml'))
+    rid = workbook.find(f'{_MAIN}sheets/{_MAIN}sheet').get(f'{_REL}id')
+    rels = ET.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    target = next(r.get('Target') for r in rels.iter(f'{_PKG}Relationship') if r.get('Id') == rid)
+    return target.lstrip('/') if target.startswith('/') else posixpath.join('xl', target)
+
+
+def _shared_strings(archive):
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+    root = ET.fromstring(archive.read('xl/sharedStrings.xml'))
+    return [''.join(t.text or '' for t in si.iter(f'{_MAIN}t')) for si in root.iter(f'{_MAIN}si')]
+
+
+def _column(ref):
+    """0-based column index of a cell reference like 'C34'"""
+    index = 0
+    for ch in ref:
+        if not ch.isalpha():
+            break
+        index = index * 26 + ord(ch.upper()) - 64
+    return index - 1
+
+
+def _rows(archive):
+    """Yield every row of the first sheet as a list of values (str or float)"""
+    strings = _shared_strings(archive)
+    with archive.open(_first_sheet(archive)) as f:
+        for _, row in ET.iterparse(f):
+            if row.tag != f'{_MAIN}row':
+                continue
+            values = []
+            for cell in row.iter(f'{_MAIN}c'):
+                kind = cell.get('t', 'n')
+                if kind == 'inlineStr':
+                    value = ''.join(t.text or '' for t in cell.iter(f'{_MAIN}t'))
+                else:
+                    v = cell.find(f'{_MAIN}v')
+                    if v is None or v.text is None:
+                        value = None
+                    elif kind == 'n':
+                        value = float(v.text)
+                    elif kind == 's':
+                        value = strings[int(v.text)]
+                    else:
+                        value = v.text
+                ref = cell.get('r')
+                if ref:
+                    values += [None] * (_column(ref) - len(values))
+                values.append(value)
+            row.clear()
+            yield values
+
+
+def read_dsc_arrays(file_path, chunk=32768):
+    """
+    Stream a NETZSCH DSC export (.xlsx) into float arrays in one pass.
+
+    The worksheet XML is parsed incrementally straight from the archive
+    (no cell objects, each row is freed once read). Rows before the
+    '##Temp./°C' header are collected as metadata ('#SAMPLE MASS /mg:' ->
+    '109,46'); numeric rows after it are written into a preallocated
+    (n, 4) block that grows by chunk rows when full. Non-numeric rows are
+    skipped.
+
+    Returns (data, meta): data is a float array with the COLUMNS in order,
+    meta a dict of the header entries plus 'columns' with the original
+    column titles (units differ between exports, e.g. mW/mg or uV/mg).
+    """
+    width = len(COLUMNS)
+    with zipfile.ZipFile(file_path) as archive:
+        rows = _rows(archive)
+        meta = {}
+        for row in rows:
+            if not row or row[0] is None:
+                continue
+            first = str(row[0])
+            if HEADER_PATTERN.search(first):
+                meta['columns'] = [str(v) for v in row if v is not None]
+                break
+            if first.startswith('#'):
+                meta[first.strip('#: ')] = row[1] if len(row) > 1 else None
+        else:
+            raise ValueError(f"No data header ('##Temp./°C') in {file_path}")
+
+        data = np.empty((chunk, width))
+        n = 0
+        for row in rows:
+            if len(row) < 3 or not (isinstance(row[0], float) and isinstance(row[2], float)):
+                continue
+            if n == len(data):
+                data = np.concatenate([data, np.empty((chunk, width))])
+            values = row[:width]
+            data[n, :len(values)] = [v if isinstance(v, float) else np.nan for v in values]
+            data[n, len(values):] = np.nan
+            n += 1
+    return data[:n], meta
+
+
+def load_dsc(file_path):
+    """
+    DSC export as a DataFrame with the columns Temperature, Time,
+    Heat_Flow and Sensitivity (sensor sensitivity, µV/mW); the header
+    metadata is in df.attrs['meta'].
+    """
+    data, meta = read_dsc_arrays(file_path)
+    df = pd.DataFrame(data, columns=list(COLUMNS))
+    df.attrs['meta'] = meta
+    return df
+
+
+def split_segments(data, min_rate=0.5):
+    """
+    Heating/cooling segments of a run.
+
+    Rows are put in time order (cooling exports are stored backwards),
+    the rate dT/dt is taken from a linear fit over a sliding window and
+    runs of the same sign above min_rate K/min become segments.
+    Isothermal parts are dropped. Returns a list of (direction, rate in
+    K/min, DataFrame sorted by ascending temperature).
+    """
+    data = data.sort_values('Time', kind='stable').reset_index(drop=True)
+    T, t = data['Temperature'].to_numpy(), data['Time'].to_numpy()
+    n = max(len(T) // 200, 5)
+    # Ratio of both index derivatives, so uneven time steps do not bias the rate
+    rate = (np.gradient(savgol_filter(T, 2 * n + 1, 1))
+            / np.gradient(savgol_filter(t, 2 * n + 1, 1)))
+    sign = np.where(rate > min_rate, 1, np.where(rate < -min_rate, -1, 0))
+    edges = np.flatnonzero(np.diff(sign)) + 1
+    bounds = np.concatenate([[0], edges, [len(sign)]])
+
+    segments = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        if sign[start] == 0 or stop - start < 10 * n:
+            continue
+        part = data.iloc[start:stop].sort_values('Temperature', kind='stable')
+        segments.append(('heating' if sign[start] > 0 else 'cooling',
+                         float(np.median(np.abs(rate[start:stop]))),
+                         part.reset_index(drop=True)))
+    return segments
@@ -0,0 +1,242 @@
+import argparse
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from dsc_loader import COLUMNS
+
+NUMBER = re.compile(r'^[-−–]?\d+(?:[.,]\d+)?$')
+RANGE = re.compile(r'(\d+(?:[.,]\d+)?)\s*°C\s*/\s*(\d+(?:[.,]\d+)?)\s*\(?K/(?:min|мин)\)?\s*/\s*'
+                   r'(\d+(?:[.,]\d+)?)\s*°C')
+RATE = re.compile(r'(\d+(?:[.,]\d+)?)\s*K/(?:min|мин)')
+UNITS = {'mW/mg': ('mW/mg', 'мВт/мг'), 'uV/mg': ('uV/mg', 'µV/mg', 'μV/mg', 'мкВ/мг')}
+LEGEND = {'heating': ('heating', 'нагрев'), 'cooling': ('cooling', 'охлажд')}
+
+
+def _number(text):
+    return float(text.replace(',', '.').replace('−', '-').replace('–', '-'))
+
+
+def _numeric_words(page):
+    """
+    Numbers printed on the page with their boxes.
+
+    Matplotlib draws the minus sign of tick labels as a short filled
+    rectangle instead of a glyph; such a bar just left of a number at its
+    mid-height makes the number negative.
+    """
+    words = [w for w in page.extract_words() if NUMBER.match(w['text'])]
+    bars = [r for r in page.rects + page.lines
+            if r['bottom'] - r['top'] < 2 and 2 < r['x1'] - r['x0'] < 15]
+    out = []
+    for w in words:
+        value = _number(w['text'])
+        mid = (w['top'] + w['bottom']) / 2
+        if value > 0 and any(abs(b['x1'] - w['x0']) < 3 and abs((b['top'] + b['bottom']) / 2 - mid) < 3
+                             for b in bars):
+            value = -value
+        out.append({'value': value, 'x': (w['x0'] + w['x1']) / 2, 'y': mid,
+                    'x1': w['x1'], 'top': w['top']})
+    return out
+
+
+def _axis(numbers, group_key, position):
+    """
+    Linear map page coordinate -> value from the tick labels of one axis.
+
+    Labels of an axis share a row (x axis: same top) or are right-aligned
+    in a column (y axis: same x1). Every group of three or more labels
+    whose values are a linear function of their position is a candidate;
+    the largest wins. Returns (offset, scale, labels) or None.
+    """
+    groups = {}
+    for n in numbers:
+        groups.setdefault(round(n[group_key] / 2), []).append(n)
+    best = None
+    for labels in groups.values():
+        if len(labels) < 3:
+            continue
+        pos = np.array([n[position] for n in labels])
+        val = np.array([n['value'] for n in labels])
+        if np.ptp(pos) == 0 or np.ptp(val) == 0:
+            continue
+        scale, offset = np.polyfit(pos, val, 1)
+        if np.abs(offset + scale * pos - val).max() > 1e-2 * np.ptp(val):
+            continue
+        if best is None or len(labels) > len(best[2]):
+            best = (offset, scale, labels)
+    return best
+
+
+def _frame(page, x_span, y_span):
+    """Plot frame (x0, x1, top, bottom): the rectangle around the tick span, or None"""
+    frames = [r for r in page.rects
+              if r['x1'] - r['x0'] >= 0.8 * x_span and r['bottom'] - r['top'] >= 0.8 * y_span
+              and (r['x1'] - r['x0']) * (r['bottom'] - r['top']) < 0.9 * page.width * page.height]
+    if not frames:
+        return None
+    r = min(frames, key=lambda r: (r['x1'] - r['x0']) * (r['bottom'] - r['top']))
+    return r['x0'], r['x1'], r['top'], r['bottom']
+
+
+def _legend_direction(page, color):
+    """'heating'/'cooling' from a legend entry drawn in the curve colour, if any"""
+    words = page.extract_words()
+    handles = [c for c in page.curves + page.lines
+               if c.get('stroking_color') == color and c['bottom'] - c['top'] < 1
+               and c['x1'] - c['x0'] < 60]
+    for h in handles:
+        for w in words:
+            if 0 <= w['x0'] - h['x1'] < 20 and abs((w['top'] + w['bottom']) / 2 - h['top']) < 8:
+                for direction, keys in LEGEND.items():
+                    if any(k in w['text'].lower() for k in keys):
+                        return direction
+    return None
+
+
+def _unit(text):
+    # Rotated axis titles come out reversed (')gm/Wm(')
+    for unit, spellings in UNITS.items():
+        if any(s in text or s[::-1] in text for s in spellings):
+            return unit
+    return 'mW/mg'
+
+
+def read_dsc_pdf(file_path, rate=None, min_points=50):
+    """
+    Recover DSC curves from the vector graphics of a PDF report.
+
+    Works on NETZSCH Proteus reports and on matplotlib figures saved as
+    PDF: every stroked path with at least min_points vertices is a data
+    polyline (pdfplumber decodes the path operators), and page
+    coordinates are mapped to temperature and signal by linear fits to
+    the numeric tick labels of the x and y axes. Points outside the plot
+    frame (clipped parts of the path) are dropped.
+
+    Heating or cooling comes from the legend entry in the curve colour,
+    the 'Range' line of a NETZSCH report (1000°C/20.0(K/min)/200°C) or
+    the file name. Time is not plotted, so it is rebuilt from the rate in
+    the report (or the rate argument, 10 K/min if neither is given) in
+    temperature order. The sensitivity column is 1 (not known).
+
+    Returns a list of (data, meta) pairs, one per curve, with data and
+    meta as read_dsc_arrays gives them.
+    """
+    import pdfplumber
+    results = []
+    with pdfplumber.open(file_path) as pdf:
+        for page_no, page in enumerate(pdf.pages):
+            numbers = _numeric_words(page)
+            x_axis = _axis(numbers, 'top', 'x')
+            y_axis = _axis(numbers, 'x1', 'y')
+            if x_axis is None or y_axis is None:
+                continue
+            text = page.extract_text() or ''
+            unit = _unit(text)
+            start_end = RANGE.search(text)
+            found_rate = RATE.search(text)
+            page_rate = rate or (_number(start_end.group(2)) if start_end else
+                                 _number(found_rate.group(1)) if found_rate else 10.0)
+
+            xs = [n['x'] for n in x_axis[2]]
+            ys = [n['y'] for n in y_axis[2]]
+            frame = _frame(page, np.ptp(xs), np.ptp(ys))
+            paths = [c for c in page.curves + page.lines if len(c['pts']) >= min_points]
+            for k, path in enumerate(paths):
+                pts = np.asarray(path['pts'], dtype=float)
+                if frame is not None:
+                    x0, x1, top, bottom = frame
+                    inside = ((pts[:, 0] >= x0) & (pts[:, 0] <= x1) &
+                              (pts[:, 1] >= top) & (pts[:, 1] <= bottom))
+                    pts = pts[inside]
+                if len(pts) < min_points or np.ptp(pts[:, 0]) < 1:
+                    continue
+                T = x_axis[0] + x_axis[1] * pts[:, 0]
+                signal = y_axis[0] + y_axis[1] * pts[:, 1]
+
+                direction = _legend_direction(page, path.get('stroking_color'))
+                if direction is None and start_end:
+                    direction = 'heating' if _number(start_end.group(3)) > _number(start_end.group(1)) \
+                        else 'cooling'
+                if direction is None:
+                    name = os.path.basename(file_path).lower()
+                    direction = 'cooling' if ('cool' in name or 'охлажд' in name) else 'heating'
+
+                order = np.argsort(T, kind='stable')
+                if direction == 'cooling':
+                    order = order[::-1]
+                T, signal = T[order], signal[order]
+                # Paths repeat vertices; equal temperatures would give zero time steps
+                keep = np.concatenate([[True], np.diff(T) != 0])
+                T, signal = T[keep], signal[keep]
+                time = np.concatenate([[0.0], np.cumsum(np.abs(np.diff(T)))]) / page_rate
+                data = np.column_stack([T, time, signal, np.ones_like(T)])
+                meta = {'FILE': os.path.basename(file_path), 'SOURCE': 'pdf', 'PAGE': page_no + 1,
+                        'CURVE': k, 'DIRECTION': direction, 'EXO': -1.0,
+                        'RANGE': start_end.group(0) if start_end else
+                        f'{T[0]:.0f}°C/{page_rate:.1f}(K/min)/{T[-1]:.0f}°C',
+                        'columns': ['##Temp./°C', 'Time/min', f'DSC/({unit})', 'Sensit./(uV/mW)']}
+                results.append((data, meta))
+    return results
+
+
+def load_dsc_pdf(file_path, **kwargs):
+    """Curves of a PDF report as DataFrames shaped like load_dsc output"""
+    frames = []
+    for data, meta in read_dsc_pdf(file_path, **kwargs):
+        df = pd.DataFrame(data, columns=list(COLUMNS))
+        df.attrs['meta'] = meta
+        frames.append(df)
+    return frames
+
+
+def extract_folder(directory, output_dir=None, processes=None, **kwargs):
+    """
+    Extract every PDF report of a directory in a process pool.
+
+    Each curve is written to <output_dir>/<report>_<curve>_<direction>.csv
+    (default output_dir: <directory>/pdf_curves). Returns a summary table
+    with one row per recovered curve.
+    """
+    output_dir = output_dir or os.path.join(directory, 'pdf_curves')
+    os.makedirs(output_dir, exist_ok=True)
+    files = sorted(os.path.join(directory, f) for f in os.listdir(directory)
+                   if f.lower().endswith('.pdf'))
+    rows = []
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {pool.submit(read_dsc_pdf, f, **kwargs): f for f in files}
+        for future in as_completed(futures):
+            f = futures[future]
+            try:
+                curves = future.result()
+            except Exception as e:
+                print(f"{os.path.basename(f)}: {e}")
+                continue
+            name = os.path.splitext(os.path.basename(f))[0]
+            for data, meta in curves:
+                out = os.path.join(output_dir, f"{name}_{meta['CURVE']}_{meta['DIRECTION']}.csv")
+                pd.DataFrame(data, columns=list(COLUMNS)).to_csv(out, index=False)
+                rows.append({'file': os.path.basename(f), 'curve': meta['CURVE'],
+                             'direction': meta['DIRECTION'], 'points': len(data),
+                             'T_min': data[:, 0].min(), 'T_max': data[:, 0].max(),
+                             'unit': meta['columns'][2], 'csv': os.path.basename(out)})
+            print(f"{os.path.basename(f)}: {len(curves)} curve(s)")
+    summary = pd.DataFrame(rows)
+    return summary.sort_values(['file', 'curve'], ignore_index=True) if rows else summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Recover DSC curves from vector PDF reports')
+    parser.add_argument('directory', help='Folder with PDF reports')
+    parser.add_argument('--output', help='Output folder (default: <directory>/pdf_curves)')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--rate', type=float, help='Heating/cooling rate, K/min, if the report '
+                                                   'does not state it')
+    args = parser.parse_args()
+
+    summary = extract_folder(args.directory, args.output, args.processes, rate=args.rate)
+    if not summary.empty:
+        print(summary.to_string(index=False, float_format='%.1f'))
@@ -0,0 +1,275 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy.signal import find_peaks, peak_prominences, peak_widths
+
+from dsc_loader import load_dsc, split_segments
+from dsc_derivative import local_derivatives, adaptive_width
+
+
+def _window_fit(cum, lo, hi):
+    """Least-squares lines over index ranges [lo, hi) from cumulative sums"""
+    n, sx, sy, sxx, sxy = (c[hi] - c[lo] for c in cum)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx ** 2)
+    return slope, (sy - slope * sx) / n
+
+
+def _masked_arg(values, lo, hi, largest=True):
+    """argmax/argmin of values over index ranges [lo, hi] for many ranges at once"""
+    length = int((hi - lo).max()) + 1
+    idx = lo[:, None] + np.arange(length)[None, :]
+    inside = idx <= hi[:, None]
+    idx = np.minimum(idx, len(values) - 1)
+    v = np.where(inside, values[idx], -np.inf if largest else np.inf)
+    pick = v.argmax(axis=1) if largest else v.argmin(axis=1)
+    return idx[np.arange(len(idx)), pick]
+
+
+def detect_transitions(data, smooth_k=3.0, baseline_k=15.0, edge_k=25.0,
+                       min_prominence=0.1, exo_sign=-1, polarity='auto', limit_fraction=0.02):
+    """
+    Extrapolated onset, peak and end temperatures of every DSC peak.
+
+    Each segment is smoothed by local cubic fits over smooth_k kelvin on
+    the real (uneven) temperature steps, which also give the DDSC slope
+    dHF/dT used for the tangents (smooth_k='auto' picks the width from the
+    rate and noise of each segment, see adaptive_width). Peaks are found
+    with find_peaks; a peak needs min_prominence times the signal span of
+    the segment (ignoring edge_k kelvin at both ends, where the
+    instrument settles). With polarity='auto' heating segments are
+    searched for endothermic and cooling segments for exothermic peaks;
+    'both' searches both; exo_sign is the sign of exothermic heat flow
+    (NETZSCH '#EXO: -1').
+
+    The tangent construction is then done for all peaks of all segments in
+    one vectorized pass over the concatenated segments: baselines are
+    least-squares lines over baseline_k kelvin outside the peak (from
+    cumulative sums), edge tangents touch the curve at the steepest point
+    of each flank, and onset/end are the intersections. For cooling the
+    onset is on the high-temperature side. T_from/T_to are the integration
+    limits: the last points (outwards from the peak) where the curve is
+    still within limit_fraction of the peak height of its baseline.
+
+    Returns a DataFrame with one row per transition.
+    """
+    segments = split_segments(data)
+    T_all, y_all, dy_all, seg_lo, seg_hi = [], [], [], [], []
+    peaks, signs, seg_of, bases = [], [], [], []
+    offset = 0
+    for s, (direction, rate, part) in enumerate(segments):
+        T = part['Temperature'].to_numpy()
+        hf = part['Heat_Flow'].to_numpy()
+        step = np.median(np.diff(T))
+        width = adaptive_width(T, hf, rate) if smooth_k == 'auto' else smooth_k
+        if len(T) <= max(int(width / step) // 2 * 2 + 1, 5):
+            continue
+        # Smoothed signal and dHF/dT from one local fit (raw T is uneven and repeats values)
+        y, dy, _ = local_derivatives(T, hf, width)
+        inner = (T > T[0] + edge_k) & (T < T[-1] - edge_k)
+        if inner.sum() < 10:
+            continue
+        span = np.ptp(y[inner])
+        endo = -exo_sign
+        wanted = {'auto': [endo if direction == 'heating' else -endo],
+                  'both': [endo, -endo]}[polarity]
+        for sign in wanted:
+            signed = np.where(inner, sign * y, -np.inf)
+            idx, _ = find_peaks(signed, prominence=min_prominence * span,
+                                wlen=int(4 * baseline_k / step))
+            # Peak extents are measured in a wider window than the detection
+            prom, lb, rb = peak_prominences(signed, idx, wlen=int(16 * baseline_k / step))
+            peaks += list(idx + offset)
+            bases += list(zip(prom, lb + offset, rb + offset))
+            signs += [sign] * len(idx)
+            seg_of += [s] * len(idx)
+        T_all.append(T)
+        y_all.append(y)
+        dy_all.append(dy)
+        seg_lo.append(offset)
+        seg_hi.append(offset + len(T))
+        offset += len(T)
+
+    columns = ['segment', 'direction', 'rate, K/min', 'polarity', 'T_onset', 'T_peak',
+               'T_end', 'height', 'T_from', 'T_to']
+    if not peaks:
+        return pd.DataFrame(columns=columns)
+
+    T = np.concatenate(T_all)
+    y = np.concatenate(y_all)
+    dy = np.concatenate(dy_all)
+    pk = np.array(peaks)
+    sign = np.array(signs)
+    seg = np.array(seg_of)
+    bases = np.array(bases)
+    order = np.argsort(pk, kind='stable')
+    pk, sign, seg, bases = pk[order], sign[order], seg[order], bases[order]
+    lo_seg = np.array(seg_lo)[np.searchsorted(np.array(seg_lo), pk, side='right') - 1]
+    hi_seg = np.array(seg_hi)[np.searchsorted(np.array(seg_lo), pk, side='right') - 1]
+
+    step = np.median(np.abs(np.diff(T)))
+    nb = max(int(baseline_k / step), 3)
+
+    # Peak extent at 98 % of the prominence (baselines start outside it), per polarity
+    left = np.empty(len(pk), dtype=int)
+    right = np.empty(len(pk), dtype=int)
+    for p in (1, -1):
+        sel = sign == p
+        if sel.any():
+            prominence_data = (bases[sel, 0], bases[sel, 1].astype(int), bases[sel, 2].astype(int))
+            _, _, li, ri = peak_widths(p * y, pk[sel], rel_height=0.98,
+                                       prominence_data=prominence_data)
+            left[sel], right[sel] = np.floor(li).astype(int), np.ceil(ri).astype(int)
+    left = np.maximum(left, lo_seg + 1)
+    right = np.minimum(right, hi_seg - 2)
+
+    # Baselines before and after the peak by cumulative-sum regression
+    x = T - T.mean()
+    cum = [np.concatenate([[0.0], np.cumsum(v)]) for v in
+           (np.ones_like(x), x, y, x * x, x * y)]
+    b_lo = np.maximum(left - nb, lo_seg)
+    b_hi = np.minimum(right + nb, hi_seg)
+    slope_lo, icpt_lo = _window_fit(cum, b_lo, left + 1)
+    slope_hi, icpt_hi = _window_fit(cum, right, b_hi)
+
+    # Edge tangents at the steepest point of each flank (in the signed signal)
+    k_lo = np.where(sign > 0, _masked_arg(dy, left, pk, True), _masked_arg(dy, left, pk, False))
+    k_hi = np.where(sign > 0, _masked_arg(dy, pk, right, False), _masked_arg(dy, pk, right, True))
+    t_slope_lo, t_slope_hi = dy[k_lo], dy[k_hi]
+    t_icpt_lo, t_icpt_hi = y[k_lo] - t_slope_lo * x[k_lo], y[k_hi] - t_slope_hi * x[k_hi]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        x_lo = (t_icpt_lo - icpt_lo) / (slope_lo - t_slope_lo)
+        x_hi = (t_icpt_hi - icpt_hi) / (slope_hi - t_slope_hi)
+        # Height above the straight line joining both baselines at the peak flanks
+        base_l = icpt_lo + slope_lo * x[left]
+        base_r = icpt_hi + slope_hi * x[right]
+        frac = (x[pk] - x[left]) / (x[right] - x[left])
+        height = y[pk] - (base_l + frac * (base_r - base_l))
+    T_low, T_high = x_lo + T.mean(), x_hi + T.mean()
+
+    # Integration limits: where the curve leaves each baseline
+    tol = limit_fraction * np.abs(height)
+    length = int(max((pk - b_lo).max(), (b_hi - pk).max())) + 1
+    steps = np.arange(length)[None, :]
+    idx = np.clip(pk[:, None] - steps, b_lo[:, None], None)
+    off = sign[:, None] * (y[idx] - (icpt_lo[:, None] + slope_lo[:, None] * x[idx]))
+    near = (off < tol[:, None]) & (pk[:, None] - steps >= b_lo[:, None])
+    i_from = np.where(near.any(axis=1), idx[np.arange(len(pk)), near.argmax(axis=1)], b_lo)
+    idx = np.clip(pk[:, None] + steps, None, b_hi[:, None] - 1)
+    off = sign[:, None] * (y[idx] - (icpt_hi[:, None] + slope_hi[:, None] * x[idx]))
+    near = (off < tol[:, None]) & (pk[:, None] + steps <= b_hi[:, None] - 1)
+    i_to = np.where(near.any(axis=1), idx[np.arange(len(pk)), near.argmax(axis=1)], b_hi - 1)
+
+    directions = np.array([segments[i][0] for i in seg])
+    cooling = directions == 'cooling'
+    return pd.DataFrame({
+        'segment': seg,
+        'direction': directions,
+        'rate, K/min': [segments[i][1] for i in seg],
+        'polarity': np.where(sign == -exo_sign, 'endo', 'exo'),
+        'T_onset': np.where(cooling, T_high, T_low),
+        'T_peak': T[pk],
+        'T_end': np.where(cooling, T_low, T_high),
+        'height': height,
+        'T_from': T[i_from],
+        'T_to': T[i_to],
+    }, columns=columns)
+
+
+def transitions_table(files, **kwargs):
+    """Transitions of several exports as one table with a 'file' column"""
+    tables = []
+    for f in files:
+        table = detect_transitions(load_dsc(f), **kwargs)
+        table.insert(0, 'file', os.path.basename(f))
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+
+def spread_labels(ax, texts, pad=2.0):
+    """
+    Shift vertical labels sideways so that no two share a column.
+
+    Labels are swept in order of x and pushed right until they clear the
+    previous one by pad pixels; every group pushed together is then
+    centred on the mean of its original positions. Works in display
+    coordinates, so call it after the axis limits are set.
+    """
+    if not texts:
+        return
+    renderer = ax.figure.canvas.get_renderer()
+    texts = sorted(texts, key=lambda t: t.get_position()[0])
+    x = np.array([ax.transData.transform(t.get_position())[0] for t in texts])
+    w = np.array([t.get_window_extent(renderer).width for t in texts])
+    new = x.copy()
+    group = np.zeros(len(x), dtype=int)
+    for i in range(1, len(x)):
+        least = new[i - 1] + (w[i - 1] + w[i]) / 2 + pad
+        if x[i] < least:
+            new[i], group[i] = least, group[i - 1]
+        else:
+            group[i] = group[i - 1] + 1
+    for g in np.unique(group):
+        sel = group == g
+        new[sel] += x[sel].mean() - new[sel].mean()
+    inverse = ax.transData.inverted()
+    for t, nx in zip(texts, new):
+        y = t.get_position()[1]
+        t.set_x(inverse.transform((nx, ax.transData.transform((0, y))[1]))[0])
+
+
+def annotate_transitions(ax, table, color='gray', fontsize=8, y_text=None,
+                         show_peak=True, lines=True):
+    """
+    Mark onset/end (T_s, T_f) and peak temperatures of a transitions table.
+
+    Heating labels go above the curves and cooling labels below, like the
+    hand-made figures; y_text overrides the label height (data units).
+    Labels of nearly equal temperatures (also from earlier calls on the
+    same axes, e.g. the heating and cooling T_s) are spread sideways by
+    spread_labels; set the axis limits first. Returns the created text
+    artists.
+    """
+    y0, y1 = ax.get_ylim()
+    texts = []
+    for _, row in table.iterrows():
+        heating = row['direction'] == 'heating'
+        tag = 'h' if heating else 'c'
+        y = y_text if y_text is not None else (y1 - 0.08 * (y1 - y0) if heating
+                                               else y0 + 0.08 * (y1 - y0))
+        va = 'bottom' if heating else 'top'
+        for key, sub in (('T_onset', 's'), ('T_end', 'f')):
+            T = row[key]
+            if not np.isfinite(T):
+                continue
+            if lines:
+                ax.axvline(x=T, color='gray', linestyle='--', alpha=0.5, linewidth=0.8)
+            texts.append(ax.text(T, y, f'T$_{{{sub}}}^{{{tag}}}$ = {T:.0f}°C', rotation=90,
+                                 va=va, ha='center', fontsize=fontsize, color=color,
+                                 gid='dsc_transition'))
+        if show_peak:
+            texts.append(ax.text(row['T_peak'], y, f'T$_{{p}}^{{{tag}}}$ = {row["T_peak"]:.0f}°C',
+                                 rotation=90, va=va, ha='center', fontsize=fontsize,
+                                 color=color, gid='dsc_transition'))
+    spread_labels(ax, [t for t in ax.texts if t.get_gid() == 'dsc_transition'])
+    return texts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Onset, peak and end temperatures of DSC transitions')
+    parser.add_argument('files', nargs='+', help='NETZSCH .xlsx exports')
+    parser.add_argument('--polarity', choices=['auto', 'both'], default='auto')
+    parser.add_argument('--min-prominence', type=float, default=0.1,
+                        help='Fraction of the segment signal span')
+    parser.add_argument('--output', help='Save the table to CSV')
+    args = parser.parse_args()
+
+    table = transitions_table(args.files, polarity=args.polarity,
+                              min_prominence=args.min_prominence)
+    print(table.to_string(index=False, float_format='%.4g'))
+    if args.output:
+        table.to_csv(args.output, index=False)
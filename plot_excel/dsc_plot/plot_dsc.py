@@ -5,19 +5,17 @@ import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
 from scipy.signal import savgol_filter
 
+from dsc_loader import load_dsc
+from dsc_transitions import detect_transitions
+from dsc_enthalpy import integrate_peaks
+
 def load_dsc_data(file_path):
     """
-    Загружает данные ДСК из Excel файла
+    Загружает данные ДСК из Excel файла (все столбцы: Temperature, Time,
+    Heat_Flow, Sensitivity; метаданные заголовка в data.attrs['meta'])
     """
     try:
-        df = pd.read_excel(file_path, header=None)
-        header_row = df[df[0].astype(str).str.contains('#Temp|Temperature', na=False)].index[0]
-        data = df.iloc[header_row + 1:].copy()
-        data.columns = ['Temperature', 'Time', 'Heat_Flow', 'Sample']
-        data = data.apply(pd.to_numeric, errors='coerce')
-        data = data.dropna()
-        data = data[['Temperature', 'Heat_Flow']]
-        return data
+        return load_dsc(file_path)
     except Exception as e:
         print(f"Ошибка при чтении файла {file_path}: {str(e)}")
         return None
@@ -47,15 +45,25 @@ def plot_dsc_curves(mode1_heat, mode1_cool, mode8_heat, mode8_cool, output_path=
     plt.plot(mode8_cool['Temperature'], mode8_cool['Heat_Flow'], 
              'b--', label='Mode 8 (Cooling)', linewidth=1.5)
 
-    # Добавляем известные температуры пиков с разнесенными позициями
-    peak_annotations = [
+    # Температуры пиков находятся автоматически; смещения подписей разнесены вручную
+    curves = [
         # Режим 1
-        (842, 0.14, 'Mode 1\n842°C', 'red', (-50, 20)),    # нагрев
-        (764, 0.0, 'Mode 1\n764°C', 'blue', (-20, -40)),   # охлаждение
+        (mode1_heat, 'Mode 1', 'red', (-50, 20)),    # нагрев
+        (mode1_cool, 'Mode 1', 'blue', (-20, -40)),  # охлаждение
         # Режим 8
-        (844, 0.14, 'Mode 8\n844°C', 'red', (20, 20)),     # нагрев
-        (767, -0.04, 'Mode 8\n767°C', 'blue', (15, -13)),  # охлаждение
+        (mode8_heat, 'Mode 8', 'red', (20, 20)),     # нагрев
+        (mode8_cool, 'Mode 8', 'blue', (15, -13)),   # охлаждение
     ]
+    peak_annotations = []
+    for data, mode, color, offset in curves:
+        transitions = detect_transitions(data)
+        if transitions.empty:
+            continue
+        main = transitions.loc[transitions['height'].abs().idxmax()]
+        heat_flow = np.interp(main['T_peak'], data['Temperature'].sort_values(),
+                              data.sort_values('Temperature')['Heat_Flow'])
+        peak_annotations.append((main['T_peak'], heat_flow,
+                                 f"{mode}\n{main['T_peak']:.0f}°C", color, offset))
 
     for temp, heat_flow, text, color, offset in peak_annotations:
         plt.annotate(text, 
@@ -132,6 +140,13 @@ def main():
             print(f"Error loading {key} data")
             return
     
+    # Температуры превращений и энтальпии (сигмоидальная базовая линия)
+    table = pd.concat([integrate_peaks(df, detect_transitions(df), baseline='sigmoidal')
+                       .assign(file=files[key]) for key, df in data.items()],
+                      ignore_index=True)
+    print(table.to_string(index=False, float_format='%.1f'))
+    table.to_csv('dsc_transitions.csv', index=False)
+
     plot_dsc_curves(
         data['mode1_heat'],
         data['mode1_cool'],
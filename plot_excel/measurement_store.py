@@ -0,0 +1,425 @@
+import argparse
+import glob
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+STORE = os.path.join(HERE, 'measurements.sqlite')
+
+# Readers of the existing formats live next to their plotting scripts
+for folder in (os.path.join(HERE, 'dsc_plot'), os.path.join(HERE, 'microhardness_vs_VED Plot'),
+               os.path.join(ROOT, 'TiNbZrCu', 'uts_e')):
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+
+# Alloy of a source: the first name found in its path (longest aliases first)
+ALLOYS = {
+    'Ti13Nb13Zr5Cu': 'Ti13Nb13Zr5Cu', 'TiNbZrCu': 'Ti13Nb13Zr5Cu',
+    'Ti15Ta': 'Ti15Ta', 'TiTaNbZr': 'TiTaNbZr',
+}
+
+# Sheets of the tensile workbooks: sheet -> (regime, specimen)
+TENSILE_SHEETS = {
+    'TiNbZrCu_m6_.xls': {
+        'Образец1': ('C1', '1'), 'Образец2': ('C1', '2'), 'Образец3': ('C5', '1'),
+        'Образец4': ('L2', '1'), 'Образец5': ('L2', '2'), 'Образец6': ('L2', '3'),
+        'Образец7': ('L3', '1'), 'Образец8': ('L3', '2'),
+        'Образец9': ('L4', '1'), 'Образец10': ('L4', '2'), 'Образец11': ('L4', '3'),
+        'Образец12': ('L5', '1'),
+    },
+    'Ti15Ta_SLM_m6_.xls': {
+        'Образец1': ('1', '1'), 'Образец2': ('1', '2'), 'Образец3': ('1', '3'),
+        'Образец4': ('8', '1'), 'Образец5': ('8', '2'), 'Образец6': ('8', '3'),
+    },
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY, mtime REAL, size INTEGER, reader TEXT, rows INTEGER);
+CREATE TABLE IF NOT EXISTS regimes (
+    alloy TEXT, regime TEXT, strategy TEXT, power REAL, speed REAL, layer REAL, hatch REAL,
+    energy REAL, scans INTEGER, note TEXT, source TEXT, PRIMARY KEY (alloy, regime));
+CREATE TABLE IF NOT EXISTS measurements (
+    alloy TEXT, regime TEXT, specimen TEXT, test TEXT, property TEXT, value REAL,
+    std REAL, n INTEGER, unit TEXT, outlier INTEGER, source TEXT);
+CREATE INDEX IF NOT EXISTS measurements_regime ON measurements (alloy, regime, property);
+CREATE INDEX IF NOT EXISTS measurements_property ON measurements (property, test, alloy);
+CREATE INDEX IF NOT EXISTS measurements_source ON measurements (source);
+CREATE TABLE IF NOT EXISTS curves (
+    alloy TEXT, regime TEXT, specimen TEXT, test TEXT, x REAL, y REAL, source TEXT);
+CREATE INDEX IF NOT EXISTS curves_specimen ON curves (alloy, regime, specimen, test);
+CREATE INDEX IF NOT EXISTS curves_source ON curves (source);
+"""
+MEASUREMENT_COLUMNS = ['alloy', 'regime', 'specimen', 'test', 'property', 'value', 'std', 'n',
+                       'unit', 'outlier']
+REGIME_COLUMNS = ['alloy', 'regime', 'strategy', 'power', 'speed', 'layer', 'hatch', 'energy',
+                  'scans', 'note']
+CURVE_COLUMNS = ['alloy', 'regime', 'specimen', 'test', 'x', 'y']
+
+
+def alloy_name(path):
+    """Alloy of a source file from the names in its path, or '' """
+    for alias in sorted(ALLOYS, key=len, reverse=True):
+        if alias in path:
+            return ALLOYS[alias]
+    return ''
+
+
+def _rows(alloy, **columns):
+    """Measurement rows with the missing columns filled in"""
+    df = pd.DataFrame(columns)
+    df['alloy'] = alloy
+    for column, default in (('specimen', ''), ('std', np.nan), ('n', 1), ('unit', ''),
+                            ('outlier', 0)):
+        if column not in df:
+            df[column] = default
+    return df[MEASUREMENT_COLUMNS]
+
+
+def read_regime_table(path):
+    """
+    Regimes and densities of a regime table (Ti13Nb13Zr5Cu_density.csv).
+
+    Parameters go to the regimes, with the scans per layer and the
+    delivered energy as process_map.load_regimes gives them. The
+    metallographic density, with its spread when porosity.py has written
+    one, and the hydrostatic density become measurements.
+    """
+    from process_map import load_regimes
+    alloy = alloy_name(path)
+    df = load_regimes(path)
+    regimes = df.reindex(columns=REGIME_COLUMNS).assign(alloy=alloy)
+    regimes['note'] = regimes['note'].fillna('')
+    spread = df['Отклонение плотности, %'] if 'Отклонение плотности, %' in df else np.nan
+    measurements = [_rows(alloy, regime=df['regime'], test='metallography',
+                          property='relative_density', value=df['density'], std=spread, unit='%')]
+    if 'density_weighing' in df:
+        measurements.append(_rows(alloy, regime=df['regime'], test='hydrostatic',
+                                  property='density', value=df['density_weighing'],
+                                  unit='g/cm3'))
+    return {'regimes': regimes, 'measurements': pd.concat(measurements, ignore_index=True)}
+
+
+def read_hardness(path):
+    """Every indentation of a hardness workbook; Grubbs outliers are flagged, not dropped"""
+    from hardness_stats import read_indentations, reject_outliers
+    table = reject_outliers(read_indentations(path), 'grubbs')
+    specimen = table.groupby('regime').cumcount() + 1
+    return {'measurements': _rows(alloy_name(path), regime=table['regime'].astype(str),
+                                  specimen=specimen.astype(str), test='microhardness',
+                                  property='HV', value=table['HV'], unit='HV0.5',
+                                  outlier=table['outlier'].astype(int))}
+
+
+def read_tensile(path):
+    """Stress-strain curves and UTS of the specimens of a tensile workbook (see TENSILE_SHEETS)"""
+    alloy = alloy_name(path)
+    sheets = TENSILE_SHEETS[os.path.basename(path)]
+    wb = pd.ExcelFile(path)
+    curves, uts = [], []
+    for sheet in wb.sheet_names:
+        if sheet not in sheets:
+            continue
+        regime, specimen = sheets[sheet]
+        df = pd.read_excel(wb, sheet, header=8).iloc[:, [0, 1]].dropna()
+        df.columns = ['x', 'y']
+        curves.append(df.assign(alloy=alloy, regime=regime, specimen=specimen, test='tensile'))
+        uts.append({'regime': regime, 'specimen': specimen, 'value': df['y'].max()})
+    uts = pd.DataFrame(uts)
+    return {'measurements': _rows(alloy, regime=uts['regime'], specimen=uts['specimen'],
+                                  test='tensile', property='UTS', value=uts['value'], unit='MPa'),
+            'curves': pd.concat(curves, ignore_index=True)[CURVE_COLUMNS]}
+
+
+def read_dsc(path):
+    """
+    Smoothed heat-flow curves and transitions of a DSC export.
+
+    The specimen is the run ('heating1', 'cooling2', with the curve
+    number appended when a file holds several); every detected
+    transition gives T_onset, T_peak, T_end and ΔH rows.
+    """
+    from dsc_campaign import parse_run_name, process_run
+    info = parse_run_name(path)
+    if info is None:
+        raise ValueError("not a heating/cooling run name")
+    alloy = alloy_name(info['sample']) or alloy_name(path)
+    runs = process_run(path)
+    measurements, curves = [], []
+    for k, (direction, smoothed, table, error) in enumerate(runs):
+        if error:
+            raise ValueError(error.splitlines()[0])
+        specimen = f"{direction or info['direction']}{info['cycle']}"
+        if len(runs) > 1:
+            specimen += f"-{k + 1}"
+        curves.append(pd.DataFrame({'alloy': alloy, 'regime': info['regime'], 'specimen': specimen,
+                                    'test': 'dsc', 'x': smoothed['Temperature'],
+                                    'y': smoothed['HF_smooth']}))
+        unit = table['ΔH unit'].iloc[0] if len(table) else ''
+        long = table.melt(value_vars=['T_onset', 'T_peak', 'T_end', 'ΔH'], var_name='property')
+        long['unit'] = np.where(long['property'] == 'ΔH', unit, '°C')
+        measurements.append(_rows(alloy, regime=info['regime'], specimen=specimen, test='dsc',
+                                  property=long['property'], value=long['value'],
+                                  unit=long['unit']))
+    return {'measurements': pd.concat(measurements, ignore_index=True),
+            'curves': pd.concat(curves, ignore_index=True)[CURVE_COLUMNS]}
+
+
+def read_measurement_table(path):
+    """
+    Hand-entered values in long form: CSV with regime, test, property,
+    value and optionally specimen, std, n and unit columns.
+    """
+    df = pd.read_csv(path, encoding='utf-8-sig', dtype={'regime': str, 'specimen': str})
+    return {'measurements': _rows(alloy_name(path), **{c: df[c] for c in df.columns
+                                                       if c in MEASUREMENT_COLUMNS})}
+
+
+def read_meltpool_summary(path):
+    """Per-regime melt-pool width and depth written by meltpool_measure.py (complete pools only)"""
+    df = pd.read_csv(path, dtype={'regime': str})
+    # Regimes where every pool was cut by its neighbours have no width
+    df = df.dropna(subset=['width'])
+    alloy = alloy_name(path)
+    return {'measurements': pd.concat(
+        [_rows(alloy, regime=df['regime'], test='image_analysis', property=f'meltpool_{name}',
+               value=df[name], std=df[f'{name}_std'], n=df['tracks'], unit='µm')
+         for name in ('width', 'depth')], ignore_index=True)}
+
+
+# Source files below ROOT and their readers
+SOURCES = [
+    ('plot_excel/SLM parmeters vs density Plot/*_density.csv', read_regime_table),
+    ('plot_excel/microhardness_vs_VED Plot/*.xlsx', read_hardness),
+    ('plot_excel/tensile*/*_m6_.xls', read_tensile),
+    ('plot_excel/dsc_plot/*.xlsx', read_dsc),
+    ('titanbzr_lpots/dsc/*.xlsx', read_dsc),
+    ('TiNbZrCu/plot_YoungsModulus_vs_VED/elastic_modulus.csv', read_measurement_table),
+    ('TiNbZrCu/meltpool graph TiNbZrCu/meltpool_width.csv', read_measurement_table),
+    ('TiNbZrCu/meltpool graph TiNbZrCu/meltpool_summary.csv', read_meltpool_summary),
+]
+
+
+def discover_sources(root=ROOT, sources=SOURCES):
+    """{relative path: reader} of every existing source file"""
+    found = {}
+    for pattern, reader in sources:
+        for path in sorted(glob.glob(os.path.join(glob.escape(root), pattern))):
+            if not os.path.basename(path).startswith('~$'):
+                found[os.path.relpath(path, root).replace(os.sep, '/')] = reader
+    return found
+
+
+def _read(reader, path):
+    """Run a reader in a worker process; (tables, None) or (None, message)"""
+    try:
+        return reader(path), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+class MeasurementStore:
+    """
+    All measurements of the project in one indexed SQLite database.
+
+    Three tables keyed by alloy and regime: regimes (process
+    parameters), measurements (one row per specimen, indentation or
+    aggregated value with its test, property, unit and optional std/n)
+    and curves (tensile and DSC x-y data). refresh() re-reads only the
+    source files whose size or modification time changed since they were
+    ingested, in a process pool, and replaces their rows. Queries return
+    DataFrames; summary() and table() aggregate in SQL on the indexes.
+    """
+
+    def __init__(self, path=STORE, root=ROOT):
+        self.path = path
+        self.root = root
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _delete(self, source):
+        for table in ('regimes', 'measurements', 'curves', 'sources'):
+            column = 'path' if table == 'sources' else 'source'
+            self.connection.execute(f"DELETE FROM {table} WHERE {column} = ?", (source,))
+
+    def refresh(self, processes=None, force=False, verbose=True):
+        """Ingest new and changed sources, drop vanished ones; returns the paths re-read"""
+        found = discover_sources(self.root)
+        known = {path: (mtime, size) for path, mtime, size in
+                 self.connection.execute("SELECT path, mtime, size FROM sources")}
+        with self.connection:
+            for source in set(known) - set(found):
+                self._delete(source)
+        stale = {}
+        for source, reader in found.items():
+            stat = os.stat(os.path.join(self.root, source))
+            if force or known.get(source) != (stat.st_mtime, stat.st_size):
+                stale[source] = (reader, stat)
+        if not stale:
+            return []
+
+        updated = []
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = {pool.submit(_read, reader, os.path.join(self.root, source)): source
+                       for source, (reader, _) in stale.items()}
+            for future in as_completed(futures):
+                source = futures[future]
+                reader, stat = stale[source]
+                tables, error = future.result()
+                if error:
+                    if verbose:
+                        print(f"{source}: skipped ({error})")
+                    continue
+                rows = 0
+                with self.connection:
+                    self._delete(source)
+                    for name, df in tables.items():
+                        df = df.assign(source=source)
+                        if name == 'regimes':
+                            # A regime is defined by one table only; later sources override
+                            self.connection.executemany(
+                                "DELETE FROM regimes WHERE alloy = ? AND regime = ?",
+                                df[['alloy', 'regime']].itertuples(index=False))
+                        df.to_sql(name, self.connection, if_exists='append', index=False)
+                        rows += len(df)
+                    self.connection.execute("INSERT INTO sources VALUES (?, ?, ?, ?, ?)",
+                                            (source, stat.st_mtime, stat.st_size,
+                                             reader.__name__, rows))
+                updated.append(source)
+                if verbose:
+                    print(f"{source}: {rows} rows")
+        return updated
+
+    @staticmethod
+    def _where(**filters):
+        """SQL condition and parameters; a filter is a value or a list of values"""
+        clauses, params = [], []
+        for column, value in filters.items():
+            if value is None:
+                continue
+            values = [value] if isinstance(value, (str, int, float)) else list(value)
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            # Regimes and specimens are text ('C1', but also '8' for Ti15Ta)
+            params += [str(v) if column.endswith(('regime', 'specimen')) else v for v in values]
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query(self, sql, params=()):
+        """Any SQL on the store as a DataFrame"""
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def regimes(self, alloy=None, strategy=None):
+        """Process parameters of the regimes"""
+        where, params = self._where(alloy=alloy, strategy=strategy)
+        return self.query(f"SELECT {', '.join(REGIME_COLUMNS)} FROM regimes{where} "
+                          f"ORDER BY alloy, regime", params)
+
+    def measurements(self, property=None, alloy=None, regime=None, test=None, specimen=None,
+                     outliers=False):
+        """Individual rows with the parameters of their regime; flagged outliers only on request"""
+        where, params = self._where(**{'m.property': property, 'm.alloy': alloy,
+                                       'm.regime': regime, 'm.test': test,
+                                       'm.specimen': specimen})
+        if not outliers:
+            where += (' AND' if where else ' WHERE') + ' m.outlier = 0'
+        return self.query(
+            f"SELECT m.*, r.strategy, r.power, r.speed, r.layer, r.hatch, r.energy "
+            f"FROM measurements m LEFT JOIN regimes r ON r.alloy = m.alloy AND r.regime = m.regime"
+            f"{where} ORDER BY m.alloy, m.regime, m.specimen", params)
+
+    def summary(self, property, alloy=None, test=None, regime=None):
+        """
+        Per alloy, regime and test: n, mean and standard deviation of a
+        property, with the regime parameters.
+
+        Rows that are already means (n > 1 with their std) are pooled
+        exactly: the variance comes from Σn·x, Σ(n·x² + (n−1)·s²) and Σn,
+        all summed by SQLite. A single row keeps its own std.
+        """
+        where, params = self._where(**{'m.property': property, 'm.alloy': alloy,
+                                       'm.test': test, 'm.regime': regime})
+        where += (' AND' if where else ' WHERE') + ' m.outlier = 0'
+        df = self.query(
+            f"""SELECT m.alloy, m.regime, m.test, m.property, MIN(m.unit) AS unit,
+                       COUNT(*) AS rows, SUM(COALESCE(m.n, 1)) AS n,
+                       SUM(COALESCE(m.n, 1) * m.value) / SUM(COALESCE(m.n, 1)) AS mean,
+                       SUM(COALESCE(m.n, 1) * m.value * m.value
+                           + (COALESCE(m.n, 1) - 1) * COALESCE(m.std * m.std, 0)) AS s2,
+                       MAX(m.std) AS row_std,
+                       r.strategy, r.power, r.speed, r.layer, r.hatch, r.energy
+                FROM measurements m
+                LEFT JOIN regimes r ON r.alloy = m.alloy AND r.regime = m.regime
+                {where}
+                GROUP BY m.alloy, m.regime, m.test, m.property
+                ORDER BY m.alloy, m.regime""", params)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            pooled = np.sqrt(np.maximum(df['s2'] - df['n'] * df['mean'] ** 2, 0) / (df['n'] - 1))
+        df['std'] = np.where(df['rows'] == 1, df['row_std'], pooled)
+        columns = ['alloy', 'regime', 'test', 'property', 'n', 'mean', 'std', 'unit',
+                   'strategy', 'power', 'speed', 'layer', 'hatch', 'energy']
+        return df[columns]
+
+    def table(self, properties, alloy=None, test=None):
+        """
+        One row per regime with the mean and std of several properties
+        ('<property>' and '<property>_std' columns) next to the regime
+        parameters - the input of cross-property figures.
+        """
+        parts = self.summary(properties, alloy, test)
+        wide = parts.pivot_table(index=['alloy', 'regime'], columns='property',
+                                 values=['mean', 'std'], aggfunc='first')
+        wide.columns = [p if stat == 'mean' else f'{p}_std' for stat, p in wide.columns]
+        return self.regimes(alloy).merge(wide.reset_index(), on=['alloy', 'regime'], how='right')
+
+    def curves(self, alloy=None, regime=None, specimen=None, test=None):
+        """x-y data (strain-stress, temperature-heat flow) of the selected specimens"""
+        where, params = self._where(alloy=alloy, regime=regime, specimen=specimen, test=test)
+        return self.query(f"SELECT alloy, regime, specimen, test, x, y FROM curves{where} "
+                          f"ORDER BY alloy, regime, specimen, test, rowid", params)
+
+
+def open_store(path=STORE, refresh=True, verbose=False):
+    """The measurement store, brought up to date with the source files"""
+    store = MeasurementStore(path)
+    if refresh:
+        store.refresh(verbose=verbose)
+    return store
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Ingest all measurements into one store and '
+                                                 'query it')
+    parser.add_argument('properties', nargs='*', help='Properties to summarise per regime')
+    parser.add_argument('--alloy')
+    parser.add_argument('--test')
+    parser.add_argument('--store', default=STORE, help='SQLite file')
+    parser.add_argument('--rebuild', action='store_true', help='Re-read every source')
+    parser.add_argument('--processes', type=int, help='Worker processes (default: all cores)')
+    parser.add_argument('--output', help='Save the table to CSV')
+    args = parser.parse_args()
+
+    with MeasurementStore(args.store) as store:
+        store.refresh(args.processes, force=args.rebuild)
+        if args.properties:
+            result = store.table(args.properties, args.alloy, args.test)
+        else:
+            result = store.query("SELECT alloy, test, property, unit, COUNT(*) AS rows, "
+                                 "COUNT(DISTINCT regime) AS regimes FROM measurements "
+                                 "GROUP BY alloy, test, property, unit ORDER BY alloy, test")
+        print(result.to_string(index=False, float_format='%.2f'))
+        if args.output:
+            result.to_csv(args.output, index=False)
@@ -0,0 +1,204 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from hardness_stats import reject_outliers
+
+# Accepted column titles (case-insensitive, units in brackets or after a comma are ignored)
+X_TITLES = ('x', 'х', 'x coordinate')
+Y_TITLES = ('y', 'у', 'y coordinate', 'z', 'height', 'высота')
+HV_TITLES = ('hv', 'hardness', 'твердость', 'микротвердость', 'value')
+
+
+def _base(title):
+    return str(title).split('(')[0].split(',')[0].strip().lower()
+
+
+def read_indent_grid(file_path):
+    """
+    Indent positions and hardness as a table with x, y and HV columns.
+
+    CSV (',' or ';') or Excel with one row per indent; the coordinate and
+    value columns are found by their titles ('X, мкм', 'y (mm)',
+    'HV0.5', 'Твердость, 0,5 HV', ...). Other columns are kept.
+    """
+    if file_path.lower().endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(file_path)
+    else:
+        with open(file_path, encoding='utf-8-sig') as fh:
+            sep = ';' if ';' in fh.readline() else ','
+        df = pd.read_csv(file_path, sep=sep, encoding='utf-8-sig')
+    names = {}
+    for column in df.columns:
+        base = _base(column)
+        if 'x' not in names.values() and base in X_TITLES:
+            names[column] = 'x'
+        elif 'y' not in names.values() and base in Y_TITLES:
+            names[column] = 'y'
+        elif 'HV' not in names.values() and base.startswith(HV_TITLES):
+            names[column] = 'HV'
+    missing = {'x', 'y', 'HV'} - set(names.values())
+    if missing:
+        raise ValueError(f"{os.path.basename(file_path)}: no column for {sorted(missing)}")
+    df = df.rename(columns=names)
+    for column in ('x', 'y', 'HV'):
+        if not pd.api.types.is_numeric_dtype(df[column]):
+            df[column] = pd.to_numeric(df[column].astype(str).str.replace(',', '.'), errors='coerce')
+    return df.dropna(subset=['x', 'y', 'HV']).reset_index(drop=True)
+
+
+def traverse_position(x, y, tolerance=0.25):
+    """
+    Position along the line of a straight traverse, or None for a 2-D grid.
+
+    Indents count as one traverse when their spread across the principal
+    direction stays within tolerance of the median indent spacing (a
+    row at one y, a column at one x or an inclined line). The position is
+    the distance from the first indent along that direction.
+    """
+    points = np.column_stack([np.asarray(x, dtype=float), np.asarray(y, dtype=float)])
+    if len(points) < 2:
+        return None
+    centred = points - points.mean(axis=0)
+    _, _, axes = np.linalg.svd(centred, full_matrices=False)
+    along, across = centred @ axes[0], centred @ axes[-1]
+    spacing = np.median(np.diff(np.sort(along)))
+    if not spacing > 0 or np.ptp(across) > tolerance * spacing:
+        return None
+    # Keep the direction of increasing x (or y for a vertical traverse)
+    if axes[0][0] < 0 or (axes[0][0] == 0 and axes[0][1] < 0):
+        along = -along
+    return along - along.min()
+
+
+def interpolate_grid(x, y, values, resolution=None, method='idw', neighbours=12, power=2.0,
+                     bandwidth=None, max_gap=2.0):
+    """
+    Hardness on a regular raster from scattered indents.
+
+    All raster nodes are processed at once: a k-d tree gives the
+    neighbours nearest indents of every node and the weights are applied
+    as one (nodes × neighbours) array.
+    method='idw': inverse-distance weights 1/d**power (a node on an indent
+    takes its value); method='gaussian': Gaussian kernel of the given
+    bandwidth (default: the median indent spacing), a smoothed map.
+    resolution is the raster step (default: a quarter of the indent
+    spacing). Nodes farther than max_gap indent spacings from every
+    indent are masked. Returns (X, Y, Z) with Z a masked array.
+    """
+    x, y, values = (np.asarray(v, dtype=float) for v in (x, y, values))
+    points = np.column_stack([x, y])
+    tree = cKDTree(points)
+    neighbours = min(neighbours, len(points))
+    spacing = np.median(tree.query(points, k=2)[0][:, 1])
+    if not spacing > 0:
+        raise ValueError("Indent positions coincide")
+    step = resolution or spacing / 4
+    gx = np.arange(x.min(), x.max() + step / 2, step)
+    gy = np.arange(y.min(), y.max() + step / 2, step)
+    X, Y = np.meshgrid(gx, gy)
+    nodes = np.column_stack([X.ravel(), Y.ravel()])
+
+    distance, index = tree.query(nodes, k=neighbours)
+    distance, index = distance.reshape(len(nodes), -1), index.reshape(len(nodes), -1)
+    if method == 'idw':
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / distance ** power
+        exact = distance[:, 0] == 0
+        weights[exact] = 0.0
+        weights[exact, 0] = 1.0
+    elif method == 'gaussian':
+        h = bandwidth or spacing
+        weights = np.exp(-0.5 * (distance / h) ** 2)
+    else:
+        raise ValueError(f"Unknown method '{method}', use 'idw' or 'gaussian'")
+    Z = (weights * values[index]).sum(axis=1) / weights.sum(axis=1)
+    Z = np.ma.masked_where(~np.isfinite(Z) | (distance[:, 0] > max_gap * spacing), Z)
+    return X, Y, Z.reshape(X.shape)
+
+
+def plot_hardness_map(ax, indents, X, Y, Z, kind='both', levels=10, cmap='viridis',
+                      show_indents=True):
+    """
+    Heat map ('heat'), labelled contours ('contour') or both of an
+    interpolated map on ax, with the indent positions as dots. Returns
+    the mappable for a colorbar.
+    """
+    mappable = None
+    if kind in ('heat', 'both'):
+        mappable = ax.pcolormesh(X, Y, Z, cmap=cmap, shading='auto')
+    if kind in ('contour', 'both'):
+        lines = ax.contour(X, Y, Z, levels=levels, colors='k' if kind == 'both' else None,
+                           cmap=None if kind == 'both' else cmap, linewidths=0.6)
+        ax.clabel(lines, fmt='%.0f', fontsize=7)
+        mappable = mappable or lines
+    if show_indents:
+        ax.plot(indents['x'], indents['y'], '.', color='white' if kind != 'contour' else 'k',
+                ms=2, mec='k', mew=0.3)
+    ax.set_aspect('equal')
+    return mappable
+
+
+def plot_hardness_profile(ax, indents, position, color='#2563eb'):
+    """Hardness against the position along a straight traverse, with the mean as a dashed line"""
+    order = np.argsort(position)
+    ax.plot(np.asarray(position)[order], indents['HV'].to_numpy()[order], 'o-', color=color,
+            ms=4, lw=1)
+    ax.axhline(indents['HV'].mean(), color='k', ls='--', lw=0.8,
+               label=f"Mean {indents['HV'].mean():.0f} HV")
+    ax.grid(True, linestyle='--', alpha=0.3)
+    ax.legend(fontsize=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Microhardness maps from indentation grids')
+    parser.add_argument('files', nargs='+', help='Indent tables (CSV or Excel) with x, y and HV')
+    parser.add_argument('--method', choices=['idw', 'gaussian'], default='idw')
+    parser.add_argument('--step', type=float, help='Raster step in coordinate units')
+    parser.add_argument('--kind', choices=['heat', 'contour', 'both'], default='both')
+    parser.add_argument('--levels', type=int, default=10)
+    parser.add_argument('--outliers', choices=['iqr', 'none'], default='none',
+                        help='Drop outlying indents of the whole map before interpolation')
+    parser.add_argument('--unit', default='µm', help='Coordinate unit for the axis labels')
+    parser.add_argument('--output', default='.', help='Directory for the PNG maps')
+    args = parser.parse_args()
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    os.makedirs(args.output, exist_ok=True)
+    for f in args.files:
+        indents = read_indent_grid(f).assign(map=0)
+        indents = reject_outliers(indents, args.outliers, by='map')
+        indents = indents[~indents['outlier']]
+        name = os.path.splitext(os.path.basename(f))[0]
+        position = traverse_position(indents['x'], indents['y'])
+        if position is not None:
+            # A straight traverse has no area to map: plot the profile along it
+            fig, ax = plt.subplots(figsize=(8, 5), dpi=300)
+            plot_hardness_profile(ax, indents, position)
+            ax.set_xlabel(f'Distance along the traverse, {args.unit}', fontsize=12)
+            ax.set_ylabel('Microhardness, HV$_{0.5}$', fontsize=12)
+            plt.tight_layout()
+            plt.savefig(os.path.join(args.output, f'{name}_profile.png'), dpi=300,
+                        bbox_inches='tight')
+            plt.close(fig)
+            print(f"{f}: {len(indents)} indents on a straight traverse, profile plotted")
+            continue
+        start = time.perf_counter()
+        X, Y, Z = interpolate_grid(indents['x'], indents['y'], indents['HV'], args.step,
+                                   args.method)
+        elapsed = time.perf_counter() - start
+        fig, ax = plt.subplots(figsize=(8, 6), dpi=300)
+        mappable = plot_hardness_map(ax, indents, X, Y, Z, args.kind, args.levels)
+        fig.colorbar(mappable, ax=ax, label='Microhardness, HV$_{0.5}$')
+        ax.set_xlabel(f'x, {args.unit}', fontsize=12)
+        ax.set_ylabel(f'y, {args.unit}', fontsize=12)
+        plt.tight_layout()
+        plt.savefig(os.path.join(args.output, f'{name}_map.png'), dpi=300, bbox_inches='tight')
+        plt.close(fig)
+        print(f"{f}: {len(indents)} indents, {Z.size} nodes interpolated in {elapsed:.3f} s")
@@ -0,0 +1,138 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+REGIME_TITLES = ('Режим', 'Regime', 'Mode')
+VALUE_PREFIXES = ('Твердость', 'Hardness', 'HV')
+
+
+def read_indentations(file_path):
+    """
+    Individual indentation values of a hardness workbook as (regime, HV) rows.
+
+    Two layouts are read: a table with a header row naming the regime
+    ('Режим') and value ('Твердость, 0,5 HV') columns, as in
+    harndess_Ti13Nb13Zr5Cu.xlsx, and a headerless sheet with the regime
+    number in the first and the values in the second column, as in
+    'hardness Ti15Ta.xlsx'. The regime is written on the first of its
+    rows only and is carried down; precomputed means and deviations next
+    to the values are ignored.
+    """
+    raw = pd.read_excel(file_path, header=None)
+    text = raw.astype(str).apply(lambda c: c.str.strip())
+    header = [i for i in raw.index if text.loc[i].isin(REGIME_TITLES).any()]
+    if header:
+        row = text.loc[header[0]]
+        regime_col = row.index[row.isin(REGIME_TITLES)][0]
+        value_col = row.index[row.str.startswith(VALUE_PREFIXES)][0]
+        body = raw.loc[header[0] + 1:]
+    else:
+        regime_col, value_col = raw.columns[0], raw.columns[1]
+        body = raw
+    regime = body[regime_col].ffill()
+    values = pd.to_numeric(body[value_col].astype(str).str.replace(',', '.'), errors='coerce')
+    table = pd.DataFrame({'regime': regime, 'HV': values}).dropna()
+    numeric = pd.to_numeric(table['regime'], errors='coerce')
+    table['regime'] = numeric.astype(int) if numeric.notna().all() else table['regime'].astype(str).str.strip()
+    return table.reset_index(drop=True)
+
+
+def _grubbs_critical(n, alpha):
+    """Two-sided Grubbs critical value for samples of size n (array)"""
+    n = np.asarray(n, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        t = stats.t.ppf(1 - alpha / (2 * n), n - 2)
+        return (n - 1) / np.sqrt(n) * np.sqrt(t ** 2 / (n - 2 + t ** 2))
+
+
+def reject_outliers(table, method='grubbs', alpha=0.05, k=1.5, column='HV', by='regime'):
+    """
+    Mark outlying indentations in an 'outlier' column.
+
+    'iqr': values beyond k interquartile ranges outside the quartiles of
+    their regime. 'grubbs': the iterated two-sided Grubbs test at level
+    alpha - in each pass every regime whose most extreme value exceeds
+    the critical G loses that value, all regimes tested together, until
+    no regime changes (at least three values are always kept). None
+    marks nothing.
+    """
+    table = table.copy()
+    table['outlier'] = False
+    if method is None or method == 'none':
+        return table
+    if method == 'iqr':
+        groups = table.groupby(by)[column]
+        q1, q3 = groups.transform('quantile', 0.25), groups.transform('quantile', 0.75)
+        table['outlier'] = (table[column] < q1 - k * (q3 - q1)) | (table[column] > q3 + k * (q3 - q1))
+        return table
+    if method != 'grubbs':
+        raise ValueError(f"Unknown method '{method}', use 'grubbs', 'iqr' or None")
+    while True:
+        kept = table[~table['outlier']]
+        groups = kept.groupby(by)[column]
+        deviation = (kept[column] - groups.transform('mean')).abs()
+        G = deviation / groups.transform('std')
+        n = groups.transform('size')
+        # Most extreme kept value of each regime (first one on ties)
+        extreme = deviation.eq(deviation.groupby(kept[by]).transform('max'))
+        extreme &= ~extreme.groupby(kept[by]).cumsum().gt(1)
+        drop = extreme & (n > 3) & (G > _grubbs_critical(n, alpha))
+        if not drop.any():
+            return table
+        table.loc[drop[drop].index, 'outlier'] = True
+
+
+def hardness_stats(table, confidence=0.95, column='HV', by='regime'):
+    """
+    Per-regime statistics of the indentations not marked as outliers.
+
+    n, mean, sample standard deviation, the half-width of the Student-t
+    confidence interval of the mean, median and the MAD scaled to a
+    normal standard deviation (1.4826·MAD), plus the number of rejected
+    indentations - all from one groupby aggregation.
+    """
+    if 'outlier' in table:
+        rejected = table.groupby(by)['outlier'].sum()
+        table = table[~table['outlier']]
+    else:
+        rejected = None
+    table = table.assign(abs_dev=(table[column] - table.groupby(by)[column].transform('median')).abs())
+    result = table.groupby(by).agg(n=(column, 'size'), mean=(column, 'mean'), std=(column, 'std'),
+                                   median=(column, 'median'), mad=('abs_dev', 'median'),
+                                   min=(column, 'min'), max=(column, 'max'))
+    result['mad'] *= 1.4826
+    with np.errstate(invalid='ignore'):
+        result['ci'] = stats.t.ppf(0.5 + confidence / 2, result['n'] - 1) * result['std'] / np.sqrt(result['n'])
+    result['rejected'] = rejected.reindex(result.index).astype(int) if rejected is not None else 0
+    return result[['n', 'mean', 'std', 'ci', 'median', 'mad', 'min', 'max', 'rejected']].reset_index()
+
+
+def regime_statistics(file_path, outliers='grubbs', confidence=0.95, **kwargs):
+    """Statistics of every regime of a hardness workbook (read_indentations + reject_outliers + hardness_stats)"""
+    table = reject_outliers(read_indentations(file_path), outliers, **kwargs)
+    return hardness_stats(table, confidence)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Microhardness statistics from individual '
+                                                 'indentations')
+    parser.add_argument('files', nargs='+', help='Hardness workbooks (.xlsx)')
+    parser.add_argument('--outliers', choices=['grubbs', 'iqr', 'none'], default='grubbs')
+    parser.add_argument('--alpha', type=float, default=0.05, help='Grubbs significance level')
+    parser.add_argument('--k', type=float, default=1.5, help='IQR fence factor')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--output', help='Directory for <workbook>_stats.csv files')
+    args = parser.parse_args()
+
+    for f in args.files:
+        result = regime_statistics(f, args.outliers, args.confidence, alpha=args.alpha, k=args.k)
+        print(f"{os.path.basename(f)}:")
+        print(result.to_string(index=False, float_format='%.1f'))
+        print()
+        if args.output:
+            os.makedirs(args.output, exist_ok=True)
+            name = os.path.splitext(os.path.basename(f))[0]
+            result.to_csv(os.path.join(args.output, f'{name}_stats.csv'), index=False)
@@ -1,18 +1,13 @@
 import os
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
 import seaborn as sns
 
+from hardness_stats import regime_statistics
+
 def load_and_process_data(file_path):
     try:
-        # Загружаем данные микротвердости без заголовков
-        df_hardness = pd.read_excel(file_path, header=None)
-        print("Shape of data:", df_hardness.shape)
-        print("\nFirst few rows of data:")
-        print(df_hardness.head())
-        
         # Создаем словарь с параметрами режимов
         modes_params = {
             1: {'energy_density': 62.5, 'hatch': 100},
@@ -26,30 +21,20 @@ def load_and_process_data(file_path):
             9: {'energy_density': 87.5, 'hatch': 80}
         }
         
-        # Структура для сбора данных по каждому режиму
-        hardness_data = {}
-        
-        # Собираем данные по режимам
-        current_mode = None
-        for _, row in df_hardness.iterrows():
-            if not pd.isna(row[0]):  # Если есть номер режима
-                current_mode = int(row[0])
-                if current_mode not in hardness_data:
-                    hardness_data[current_mode] = []
-            if current_mode is not None and not pd.isna(row[1]):  # Если есть значение твердости
-                hardness_data[current_mode].append(row[1])
+        # Статистика по отдельным отпечаткам каждого режима (выбросы по Граббсу отброшены)
+        stats = regime_statistics(file_path, outliers='grubbs')
         
         # Формируем результаты
         results = []
-        for mode in sorted(hardness_data.keys()):
+        for _, row in stats.iterrows():
+            mode = int(row['regime'])
             if mode in modes_params:
-                values = hardness_data[mode]
                 results.append({
                     'mode': mode,
                     'energy_density': modes_params[mode]['energy_density'],
                     'hatch': modes_params[mode]['hatch'],
-                    'hardness_mean': np.mean(values),
-                    'hardness_std': np.std(values)
+                    'hardness_mean': row['mean'],
+                    'hardness_std': row['std']
                 })
         
         result_df = pd.DataFrame(results)
@@ -1,41 +1,28 @@
+import os
+import sys
+
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
 from matplotlib.ticker import AutoMinorLocator
 
-# Read data from Excel file
-df = pd.read_excel('harndess_Ti13Nb13Zr5Cu.xlsx', skiprows=2)
+# The measurement store lives in plot_excel
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from measurement_store import open_store
 
-# Define process parameters for each regime
-regimes = {
-    'C1': {'energy': 50.0, 'strategy': 'Chess'},
-    'C2': {'energy': 37.5, 'strategy': 'Chess'},
-    'C3': {'energy': 62.5, 'strategy': 'Chess'},
-    'C4': {'energy': 66.7, 'strategy': 'Chess'},
-    'C5': {'energy': 40.0, 'strategy': 'Chess'},
-    'C6': {'energy': 83.3, 'strategy': 'Chess'},
-    'C7': {'energy': 30.0, 'strategy': 'Chess'},
-    'C8': {'energy': 80.0, 'strategy': 'Chess'},
-    'L1': {'energy': 40.0, 'strategy': 'Linear'},
-    'L2': {'energy': 80.0, 'strategy': 'Linear'},
-    'L3': {'energy': 62.5, 'strategy': 'Linear'},
-    'L4': {'energy': 78.1, 'strategy': 'Linear'},
-    'L5': {'energy': 50.0, 'strategy': 'Linear'}
-}
+# Per-regime statistics of the individual indentations (Grubbs outliers rejected) with the
+# energy density and strategy of every regime, from the measurement store
+stats = open_store().summary('HV', 'Ti13Nb13Zr5Cu', test='microhardness')
 
-# Process data using mean values and deviations from the file
+# Process data using mean values and deviations
 processed_data = {}
 
-# Get unique regimes and their statistics
-unique_regimes = df.dropna(subset=['Режим', 'Среднее значение', 'Отклонение']).drop_duplicates(subset=['Режим'])
-
-for _, row in unique_regimes.iterrows():
-    regime = row['Режим']
-    if regime in regimes:
-        mean_hardness = row['Среднее значение']
-        std_hardness = row['Отклонение']
-        strategy = regimes[regime]['strategy']
-        energy = regimes[regime]['energy']
+for _, row in stats.iterrows():
+    if pd.notna(row['strategy']):
+        mean_hardness = row['mean']
+        std_hardness = row['std']
+        strategy = row['strategy']
+        energy = row['energy']
         
         if strategy not in processed_data:
             processed_data[strategy] = {'energies': [], 'means': [], 'stds': []}
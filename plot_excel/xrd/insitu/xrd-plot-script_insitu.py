@@ -1,23 +1,14 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.signal import savgol_filter
 from matplotlib.ticker import AutoMinorLocator
 from adjustText import adjust_text
 
-def read_xrd_data(filename):
-    """Read XRD data from .xy file"""
-    angles = []
-    intensities = []
-    with open(filename, 'r') as f:
-        for line in f:
-            if not line.startswith("'"):
-                try:
-                    angle, intensity = map(float, line.strip().split())
-                    angles.append(angle)
-                    intensities.append(intensity)
-                except ValueError:
-                    continue
-    return np.array(angles), np.array(intensities)
+# Pattern reader (text exports and native Bruker files) lives in the parent folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from xrd_io import read_xrd_data
 
 def normalize_data(intensities):
     """Normalize intensities to maximum value"""
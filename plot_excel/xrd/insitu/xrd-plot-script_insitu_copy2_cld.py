@@ -1,24 +1,14 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.signal import savgol_filter, find_peaks
 from matplotlib.ticker import AutoMinorLocator
 
-def read_xrd_data(filename):
-    """Read XRD data from .xy file"""
-    angles = []
-    intensities = []
-    
-    with open(filename, 'r') as f:
-        for line in f:
-            if not line.startswith("'"):
-                try:
-                    angle, intensity = map(float, line.strip().split())
-                    angles.append(angle)
-                    intensities.append(intensity)
-                except ValueError:
-                    continue
-    
-    return np.array(angles), np.array(intensities)
+# Pattern reader (text exports and native Bruker files) lives in the parent folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from xrd_io import read_xrd_data
+from xrd_labels import place_labels
 
 def normalize_data(intensities):
     """Normalize intensities to maximum value"""
@@ -56,18 +46,15 @@ plot_params = {
 phases_before = {
     'α-Ti': {
         'peaks': [35.2, 38.5, 40.3, 53.1, 63.0, 70.7, 76.3, 78.0, 82.4],
-        'color': '#1f77b4',
-        'offsets': [(0, 20), (-10, 15), (10, 10), (-15, 10), (10, 15), (-10, 10), (10, 15), (-10, 10), (10, 15)]
+        'color': '#1f77b4'
     },
     'β-Ti': {
         'peaks': [39.3, 56.3, 69.8, 83.6],
-        'color': '#2ca02c',
-        'offsets': [(15, 20), (-10, 20), (15, 15), (-10, 15)]
+        'color': '#2ca02c'
     },
     'Ta': {
         'peaks': [38.0, 43.5, 46.5, 55.8, 69.0, 82.0],
-        'color': '#9467bd',
-        'offsets': [(-15, -15), (10, -15), (-10, -15), (10, -15), (-10, -15), (10, -15)]
+        'color': '#9467bd'
     }
 }
 
@@ -75,19 +62,19 @@ phases_before = {
 phases_after = {
     'α-Ti': {
         'peaks': [35.2, 38.5, 40.3, 53.1, 63.0, 70.7, 76.3, 78.0, 82.4],
-        'color': '#1f77b4',
-        'offsets': [(0, 20), (-10, 15), (10, 10), (-15, 10), (10, 15), (-10, 10), (10, 15), (-10, 10), (10, 15)]
+        'color': '#1f77b4'
     },
     'β-Ti': {
         'peaks': [39.3, 56.3, 69.8, 83.6],
-        'color': '#2ca02c',
-        'offsets': [(15, 20), (-10, 20), (15, 15), (-10, 15)]
+        'color': '#2ca02c'
     }
 }
 
 def add_phase_annotations(ax, angles, intensities, phases_dict):
+    """Mark the phase peaks; labels are placed without overlaps by place_labels"""
+    anchors, labels, colors = [], [], []
     for phase, params in phases_dict.items():
-        for peak_angle, offset in zip(params['peaks'], params['offsets']):
+        for peak_angle in params['peaks']:
             # Find actual peak within a window around theoretical position
             window = 1.0  # ±1 градус вокруг теоретического положения
             mask = (angles >= peak_angle - window) & (angles <= peak_angle + window)
@@ -101,36 +88,25 @@ def add_phase_annotations(ax, angles, intensities, phases_dict):
                 actual_angle = peak_angle
                 idx = np.abs(angles - peak_angle).argmin()
                 peak_intensity = intensities[idx] + 0.05
-            
-            ax.annotate(
-                phase,
-                xy=(actual_angle, peak_intensity),
-                xytext=offset,
-                textcoords='offset points',
-                fontsize=9,
-                color=params['color'],
-                arrowprops=dict(
-                    arrowstyle="->",
-                    color=params['color'],
-                    lw=0.8,
-                    connectionstyle="arc3,rad=-0.2"
-                ),
-                bbox=dict(
-                    boxstyle="round,pad=0.2",
-                    fc="white",
-                    ec=params['color'],
-                    lw=0.5
-                ),
-                zorder=3
-            )
+
+            anchors.append((actual_angle, peak_intensity))
+            labels.append(phase)
+            colors.append(params['color'])
             ax.axvline(actual_angle, color=params['color'], 
                       lw=0.8, ls=':', alpha=0.6, zorder=2)
 
+    box = dict(boxstyle="round,pad=0.2", fc="white", lw=0.5)
+    for annotation, color in zip(place_labels(ax, anchors, labels, curves=[(angles, intensities)],
+                                              fontsize=9, color=colors,
+                                              text_kw=dict(bbox=box, zorder=3)), colors):
+        annotation.get_bbox_patch().set_edgecolor(color)
+
 # Plot before HT (using 'HT' file)
 ax1.plot(angles_before_ht, intensities_before_ht_smooth, 'b-', label='Before HT', **plot_params)
 ax1.set_title('Before Heat Treatment', fontsize=12, pad=10)
 ax1.set_ylabel('Intensity (a.u.)', fontsize=12, labelpad=10)
 ax1.set_ylim(ylim)
+ax1.set_xlim(xlim)
 add_phase_annotations(ax1, angles_before_ht, intensities_before_ht_smooth, phases_before)  # включая Ta
 
 # Plot after HT (using 'non HT' file)
@@ -139,6 +115,7 @@ ax2.set_title('After Heat Treatment', fontsize=12, pad=10)
 ax2.set_xlabel('2θ (degrees)', fontsize=12, labelpad=10)
 ax2.set_ylabel('Intensity (a.u.)', fontsize=12, labelpad=10)
 ax2.set_ylim(ylim)
+ax2.set_xlim(xlim)
 add_phase_annotations(ax2, angles_after_ht, intensities_after_ht_smooth, phases_after)  # без Ta
 
 # Configure axes
@@ -1,24 +1,14 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from scipy.signal import savgol_filter, find_peaks
 from matplotlib.ticker import AutoMinorLocator
 
-def read_xrd_data(filename):
-    """Read XRD data from .xy file"""
-    angles = []
-    intensities = []
-    
-    with open(filename, 'r') as f:
-        for line in f:
-            if not line.startswith("'"):
-                try:
-                    angle, intensity = map(float, line.strip().split())
-                    angles.append(angle)
-                    intensities.append(intensity)
-                except ValueError:
-                    continue
-    
-    return np.array(angles), np.array(intensities)
+# Pattern reader (text exports and native Bruker files) lives in the parent folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from xrd_io import read_xrd_data
+from xrd_labels import place_labels
 
 def normalize_data(intensities):
     """Normalize intensities to maximum value"""
@@ -53,54 +43,36 @@ plot_params = {
 
 # Phase markers parameters
 phases = {
-    'α-Ti': {'peaks': [35.0, 38.4, 40.2, 53.0, 62.0, 70.6], 'color': '#1f77b4', 'offset': (0, 5)},
-    'β-Ti': {'peaks': [39.5, 43.0, 56.8, 71.3], 'color': '#2ca02c', 'offset': (0, 5)},
-    'Ta': {'peaks': [37.8, 43.2, 46.5], 'color': '#9467bd', 'offset': (0, -15)}
+    'α-Ti': {'peaks': [35.0, 38.4, 40.2, 53.0, 62.0, 70.6], 'color': '#1f77b4'},
+    'β-Ti': {'peaks': [39.5, 43.0, 56.8, 71.3], 'color': '#2ca02c'},
+    'Ta': {'peaks': [37.8, 43.2, 46.5], 'color': '#9467bd'}
 }
 
-# Function to add phase annotations
-def add_phase_annotations(ax, angles, intensities, y_offset=0):
+# Function to add phase annotations; label positions come from place_labels
+def add_phase_annotations(ax, angles, intensities):
+    anchors, labels, colors = [], [], []
     for phase, params in phases.items():
         for peak_angle in params['peaks']:
             # Find nearest data point
             idx = np.abs(angles - peak_angle).argmin()
-            peak_intensity = intensities[idx] + 0.05
-            
-            # Adjust y_offset for peaks in the range 37-40 degrees
-            if 37 <= peak_angle <= 40:
-                y_offset_adjusted = y_offset + 10  # Increase y_offset for this range
-            else:
-                y_offset_adjusted = y_offset
-            
-            ax.annotate(
-                phase,
-                xy=(peak_angle, peak_intensity),
-                xytext=(params['offset'][0], params['offset'][1] + y_offset_adjusted),
-                textcoords='offset points',
-                fontsize=9,
-                color=params['color'],
-                arrowprops=dict(
-                    arrowstyle="->",
-                    color=params['color'],
-                    lw=0.8,
-                    connectionstyle="arc3,rad=-0.2"
-                ),
-                bbox=dict(
-                    boxstyle="round,pad=0.2",
-                    fc="white",
-                    ec=params['color'],
-                    lw=0.5
-                ),
-                zorder=3
-            )
+            anchors.append((peak_angle, intensities[idx] + 0.05))
+            labels.append(phase)
+            colors.append(params['color'])
             ax.axvline(peak_angle, color=params['color'], 
                       lw=0.8, ls=':', alpha=0.6, zorder=2)
 
+    box = dict(boxstyle="round,pad=0.2", fc="white", lw=0.5)
+    for annotation, color in zip(place_labels(ax, anchors, labels, curves=[(angles, intensities)],
+                                              fontsize=9, color=colors,
+                                              text_kw=dict(bbox=box, zorder=3)), colors):
+        annotation.get_bbox_patch().set_edgecolor(color)
+
 # Plot before HT
 ax1.plot(angles_before, intensities_before_smooth, 'b-', label='Before HT', **plot_params)
 ax1.set_title('Before Heat Treatment', fontsize=12, pad=10)
 ax1.set_ylabel('Intensity (a.u.)', fontsize=12, labelpad=10)
 ax1.set_ylim(ylim)
+ax1.set_xlim(xlim)
 add_phase_annotations(ax1, angles_before, intensities_before_smooth)
 
 # Plot after HT
@@ -109,6 +81,7 @@ ax2.set_title('After Heat Treatment', fontsize=12, pad=10)
 ax2.set_xlabel('2θ (degrees)', fontsize=12, labelpad=10)
 ax2.set_ylabel('Intensity (a.u.)', fontsize=12, labelpad=10)
 ax2.set_ylim(ylim)
+ax2.set_xlim(xlim)
 add_phase_annotations(ax2, angles_after, intensities_after_smooth)
 
 # Configure axes
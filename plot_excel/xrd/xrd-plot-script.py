@@ -2,12 +2,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
 
-def load_xrd_data(filename):
-    """
-    Загружает данные XRD из текстового файла
-    """
-    data = np.loadtxt(filename, skiprows=2)
-    return data[:, 0], data[:, 1]  # 2theta, intensity
+from xrd_io import read_xrd_data
 
 def annotate_peak(ax, x, y, label, offset_x=0, offset_y=5):
     """
@@ -32,8 +27,8 @@ def plot_xrd_patterns(regime1_file, regime8_file, output_file='xrd_patterns.png'
     fig.suptitle('XRD Patterns of Ti-15Ta Alloy', fontsize=16, fontweight='bold', y=0.95)
 
     # Загружаем данные
-    theta1, intensity1 = load_xrd_data(regime1_file)
-    theta8, intensity8 = load_xrd_data(regime8_file)
+    theta1, intensity1 = read_xrd_data(regime1_file)
+    theta8, intensity8 = read_xrd_data(regime8_file)
 
     # Нормализуем интенсивности
     intensity1 = intensity1 / np.max(intensity1) * 100
@@ -2,10 +2,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
 
-def load_xrd_data(filename):
-    """Загрузка данных XRD из файла"""
-    data = np.loadtxt(filename, skiprows=2)
-    return data[:, 0], data[:, 1]
+from xrd_io import read_xrd_data
 
 def annotate_peak(ax, x, y, label, offset_x=0, offset_y=5):
     """Аннотация пиков с ограничением по границам"""
@@ -34,8 +31,8 @@ def plot_xrd_patterns(regime1_file, regime8_file, output_file='xrd_final.png'):
     fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(13, 15), dpi=120)
     
     # Загрузка данных
-    theta1, i1 = load_xrd_data(regime1_file)
-    theta8, i8 = load_xrd_data(regime8_file)
+    theta1, i1 = read_xrd_data(regime1_file)
+    theta8, i8 = read_xrd_data(regime8_file)
     
     # Нормализация
     i1 = i1/np.max(i1)*100
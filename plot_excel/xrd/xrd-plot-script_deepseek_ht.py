@@ -1,67 +1,54 @@
+import argparse
+import os
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
 
-def load_xrd_data(filename):
-    """Load XRD data from file"""
-    data = np.loadtxt(filename, skiprows=1)
-    return data[:, 0], data[:, 1]
+from xrd_annotation_editor import AnnotationEditor, apply_positions
 
-def annotate_peak(ax, x, y, label, offset_y=15, color='k', side='center'):
-    """Create draggable peak annotation"""
-    ha = {'left': 'right', 'right': 'left', 'center': 'center'}[side]
-    x_offset = {'left': -1, 'right': 1, 'center': 0}[side] * 2
-    
-    ann = ax.annotate(
-        label,
-        xy=(x, y),
-        xytext=(x + x_offset, y + offset_y),
-        fontsize=15,
-        ha=ha,
-        va='bottom',
-        color=color,
-        bbox=dict(facecolor='white', edgecolor='none', alpha=0.95, pad=1),
-        arrowprops=dict(arrowstyle='-', color=color, alpha=0.7, linewidth=1.2)
-    )
-    ann.draggable()
-    return ann
+from xrd_io import read_xrd_data
+from xrd_labels import place_labels
+
+def plot_xrd_patterns(sample1_file, sample8_file, interactive=True,
+                      output_file='xrd_heat_treated.png'):
+    """
+    Create XRD pattern plot with draggable labels.
 
-def plot_xrd_patterns(sample1_file, sample8_file):
-    """Create interactive XRD pattern plot with draggable labels"""
+    Label positions are kept in a <output>.labels.json sidecar: the
+    interactive editor writes it, headless rendering reuses it.
+    """
     fig, ax = plt.subplots(figsize=(12, 8), dpi=120)
     
     # Load data
-    theta1, i1 = load_xrd_data(sample1_file)
-    theta8, i8 = load_xrd_data(sample8_file)
+    theta1, i1 = read_xrd_data(sample1_file)
+    theta8, i8 = read_xrd_data(sample8_file)
     
     # Normalize and add vertical offset
     i1 = i1/np.max(i1)*100
     i8 = i8/np.max(i8)*100 + 120
 
-    # Define peaks with their positions and annotation parameters
+    # Peak positions and labels; label positions come from place_labels
     peaks = [
-        {'pos': 35.4, 'label': 'α(100)', 'offset': 25, 'side': 'center'},
-        {'pos': 38.4, 'label': 'α(002)', 'offset': 35, 'side': 'left'},
-        {'pos': 39.0, 'label': 'β(110)', 'offset': 45, 'side': 'right'},
-        {'pos': 40.4, 'label': 'α(101)', 'offset': 25, 'side': 'center'},
-        {'pos': 53.2, 'label': 'α(102)', 'offset': 25, 'side': 'center'},
-        {'pos': 55.6, 'label': 'β(200)', 'offset': 35, 'side': 'center'},
-        {'pos': 63.2, 'label': 'α(110)', 'offset': 25, 'side': 'center'},
-        {'pos': 70.2, 'label': 'β(211)', 'offset': 25, 'side': 'center'}
+        (35.4, 'α(100)'),
+        (38.4, 'α(002)'),
+        (39.0, 'β(110)'),
+        (40.4, 'α(101)'),
+        (53.2, 'α(102)'),
+        (55.6, 'β(200)'),
+        (63.2, 'α(110)'),
+        (70.2, 'β(211)'),
     ]
 
     # Plot patterns
     ax.plot(theta1, i1, 'b-', lw=1.2, label='Sample 1')
     ax.plot(theta8, i8, 'r-', lw=1.2, label='Sample 8')
 
-    # Store annotations for both patterns
-    annotations = []
-    
-    # Annotate peaks for both patterns
+    # Peak tops of both patterns
+    anchors, labels, colors = [], [], []
     for theta, intensity, color, base_y in [(theta1, i1, 'blue', 0), (theta8, i8, 'red', 120)]:
-        for peak in peaks:
+        for pos, label in peaks:
             # Find nearest point to peak position
-            idx = np.abs(theta - peak['pos']).argmin()
+            idx = np.abs(theta - pos).argmin()
             # Check if there's a significant peak
             if intensity[idx] - base_y > 3:
                 # Find local maximum in ±0.5° window
@@ -69,11 +56,9 @@ def plot_xrd_patterns(sample1_file, sample8_file):
                 start = max(0, idx - window)
                 end = min(len(intensity), idx + window)
                 local_max_idx = start + np.argmax(intensity[start:end])
-                
-                # Create draggable annotation
-                ann = annotate_peak(ax, theta[local_max_idx], intensity[local_max_idx],
-                                  peak['label'], peak['offset'], color, peak['side'])
-                annotations.append(ann)
+                anchors.append((theta[local_max_idx], intensity[local_max_idx]))
+                labels.append(label)
+                colors.append(color)
 
     # Configure axes
     ax.set_xlim(30, 75)
@@ -101,17 +86,34 @@ def plot_xrd_patterns(sample1_file, sample8_file):
     ax.tick_params(axis='both', which='major', labelsize=15)
     
     plt.tight_layout()
-    
-    # Add instruction text
-    plt.figtext(0.02, 0.02, "Click and drag annotations to move them\nClose window to save", 
-                fontsize=10, color='gray')
-    
-    # Show the plot and wait for user to close it
-    plt.show()
-    
-    # After window is closed, save the final version
-    plt.savefig('xrd_heat_treated.png', bbox_inches='tight', dpi=300)
+
+    # Labels above both curves without overlaps (dragged by AnnotationEditor)
+    annotations = place_labels(ax, anchors, labels, curves=[(theta1, i1), (theta8, i8)],
+                               fontsize=15, color=colors,
+                               text_kw=dict(bbox=dict(facecolor='white', edgecolor='none',
+                                                      alpha=0.95, pad=1)))
+
+    sidecar = os.path.splitext(output_file)[0] + '.labels.json'
+    if interactive:
+        # Add instruction text
+        hint = plt.figtext(0.02, 0.02, "Click and drag annotations to move them\nClose window to save",
+                           fontsize=10, color='gray')
+        editor = AnnotationEditor(fig, annotations, sidecar)
+
+        # Show the plot and wait for user to close it
+        plt.show()
+        editor.save()
+        hint.remove()
+    else:
+        apply_positions(annotations, sidecar)
+
+    # Save the final version with the edited label positions
+    plt.savefig(output_file, bbox_inches='tight', dpi=300)
     plt.close()
 
 if __name__ == "__main__":
-    plot_xrd_patterns("Ti15Ta_1.xy", "Ti15Ta_8.xy")
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', action='store_true',
+                        help='Render with saved label positions, no window')
+    args = parser.parse_args()
+    plot_xrd_patterns("Ti15Ta_1.xy", "Ti15Ta_8.xy", interactive=not args.headless)
\ No newline at end of file
@@ -1,20 +1,14 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
 from matplotlib.patches import ConnectionPatch
 
-def read_xrd_data(filename):
-    angles = []
-    intensities = []
-    with open(filename, 'r') as f:
-        next(f)
-        next(f)
-        for line in f:
-            if line.strip():
-                angle, intensity = line.strip().split('\t')
-                angles.append(float(angle))
-                intensities.append(float(intensity))
-    return np.array(angles), np.array(intensities)
+# Pattern reader (text exports and native Bruker files) lives in the parent folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from xrd_io import read_xrd_data
+from xrd_labels import place_labels
 
 angles_9, intensities_9 = read_xrd_data('TiNbZrCu_9.txt')
 angles_11, intensities_11 = read_xrd_data('TiNbZrCu_11.txt')
@@ -39,47 +33,36 @@ plt.grid(True, linestyle='--', alpha=0.3)
 ax = plt.gca()
 ax.yaxis.set_major_formatter(plt.NullFormatter())
 
-# Определение пиков и их подписей с настройками позиционирования
+# Определение пиков и их подписей (положение подписей подбирает place_labels)
 peaks = {
-    38.7: ('β-Ti(ss)', '(110)', 0, 1.4),  # (угол, фаза, индекс, x_offset, y_scale)
-    55.8: ('β-Ti(ss)', '(200)', 0, 1.3),
-    70.0: ('β-Ti(ss)', '(211)', -2.5, 1.6),  # Смещение влево
-    70.4: ('α″-Ti', '(201)', 2.5, 1.3),     # Смещение вправо
-    78.6: ('β-Ti(ss)', '(220)', -2, 3.0),   # Смещение влево
-    82.8: ('β-Ti(ss)', '(310)', 2, 1.2),    # Смещение вправо
-    95.8: ('β-Ti(ss)', '(321)', 0, 1.2)
+    38.7: ('β-Ti(ss)', '(110)'),
+    55.8: ('β-Ti(ss)', '(200)'),
+    70.0: ('β-Ti(ss)', '(211)'),
+    70.4: ('α″-Ti', '(201)'),
+    78.6: ('β-Ti(ss)', '(220)'),
+    82.8: ('β-Ti(ss)', '(310)'),
+    95.8: ('β-Ti(ss)', '(321)')
 }
 
 def find_y_at_x(x_target, x_data, y_data):
     idx = np.abs(x_data - x_target).argmin()
     return y_data[idx]
 
-# Добавляем вертикальные линии и подписи
-for angle, (phase, index, x_offset, y_scale) in peaks.items():
-    # Добавляем вертикальную линию
+# Добавляем вертикальные линии и находим максимальную высоту для подписи
+anchors = []
+for angle in peaks:
     plt.axvline(x=angle, color='#404040', linestyle=':', alpha=0.3)
-    
-    # Находим максимальную высоту для подписи
     y1 = find_y_at_x(angle, angles_9, intensities_9)
     y2 = find_y_at_x(angle, angles_11, intensities_11) + offset1
     y3 = find_y_at_x(angle, angles_12, intensities_12) + offset2
-    y_max = max(y1, y2, y3)
-    
-    # Настраиваем положение текста
-    text_offset = 8000
-    text_y = y_max + text_offset * y_scale
-    text_x = angle + x_offset
-    
-    # Добавляем подпись с белым фоном
-    plt.text(text_x, text_y, f'{phase} {index}',
-            ha='center', va='bottom',
-            fontsize=18,
-            bbox=dict(facecolor='white', alpha=0.9, edgecolor='none', pad=1))
-    
-    # Добавляем тонкую линию от подписи к пику
-    if abs(x_offset) > 0:  # Только для смещенных подписей
-        plt.plot([angle, text_x], [y_max, text_y], 
-                color='#404040', linewidth=0.8, linestyle='-', alpha=0.5)
+    anchors.append((angle, max(y1, y2, y3)))
+
+# Подписи с белым фоном над всеми тремя кривыми, без наложений
+curves = [(angles_9, intensities_9), (angles_11, intensities_11 + offset1),
+          (angles_12, intensities_12 + offset2)]
+place_labels(ax, anchors, [f'{phase} {index}' for phase, index in peaks.values()],
+             curves=curves, fontsize=18, color='#404040',
+             text_kw=dict(bbox=dict(facecolor='white', alpha=0.9, edgecolor='none', pad=1)))
 
 plt.tick_params(axis='both', which='major', labelsize=18)
 ax.xaxis.set_minor_locator(MultipleLocator(2))
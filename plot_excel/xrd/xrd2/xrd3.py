@@ -1,19 +1,13 @@
+import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.ticker import MultipleLocator
 
-def read_xrd_data(filename):
-    angles = []
-    intensities = []
-    with open(filename, 'r') as f:
-        next(f)
-        next(f)
-        for line in f:
-            if line.strip():
-                angle, intensity = line.strip().split('\t')
-                angles.append(float(angle))
-                intensities.append(float(intensity))
-    return np.array(angles), np.array(intensities)
+# Pattern reader (text exports and native Bruker files) lives in the parent folder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from xrd_io import read_xrd_data
+from xrd_labels import place_labels
 
 # Read data for all three samples
 angles_9, intensities_9 = read_xrd_data('TiNbZrCu_9.txt')    # L1
@@ -60,40 +54,20 @@ def find_y_at_x(x_target, x_data, y_data):
     idx = np.abs(x_data - x_target).argmin()
     return y_data[idx]
 
-# Add vertical lines and annotations for each peak
-for angle, (phase, index) in peaks.items():
-    # Add vertical dashed line
+# Vertical lines at the peaks; labels above the highest pattern, placed
+# without overlaps by the label engine
+anchors = []
+for angle in peaks:
     plt.axvline(x=angle, color='gray', linestyle=':', alpha=0.3)
-    
-    # Find peak heights for each pattern
     y1 = find_y_at_x(angle, angles_9, intensities_9)
     y2 = find_y_at_x(angle, angles_11, intensities_11) + offset1
     y3 = find_y_at_x(angle, angles_12, intensities_12) + offset2
-    
-    # Use maximum height for annotation
-    y_max = max(y1, y2, y3)
-    
-    # Calculate text position to avoid overlap
-    text_offset = 7000  # Increased offset for text
-    if angle == 38.5:  # Special case for the highest peak
-        text_y = y_max + text_offset * 2
-        ha = 'right'
-        x_shift = -1
-    elif angle == 82.5:  # Special case for overlapping peaks
-        text_y = y_max + text_offset * 1.5
-        ha = 'right'
-        x_shift = -1
-    else:
-        text_y = y_max + text_offset
-        ha = 'center'
-        x_shift = 0
-    
-    plt.annotate(f'{phase} {index}', 
-                xy=(angle, y_max), 
-                xytext=(angle + x_shift, text_y),
-                ha=ha, va='bottom', 
-                fontsize=12,
-                arrowprops=dict(arrowstyle='->', color='gray', lw=1.2, ls='-'))
+    anchors.append((angle, max(y1, y2, y3)))
+
+curves = [(angles_9, intensities_9), (angles_11, intensities_11 + offset1),
+          (angles_12, intensities_12 + offset2)]
+place_labels(ax, anchors, [f'{phase} {index}' for phase, index in peaks.values()],
+             curves=curves, fontsize=12)
 
 # Customize ticks
 plt.tick_params(axis='both', which='major', labelsize=12)
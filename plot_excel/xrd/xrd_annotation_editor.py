@@ -0,0 +1,126 @@
+import json
+import os
+
+from matplotlib.text import Text
+
+
+def annotation_key(ann):
+    """Stable identifier of an annotation: its text and anchor point"""
+    x, y = ann.xy
+    return f'{ann.get_text()}@{x:.3f},{y:.3f}'
+
+
+def load_positions(sidecar):
+    """Saved label positions {key: [x, y]} or an empty dict"""
+    if not os.path.exists(sidecar):
+        return {}
+    with open(sidecar, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_positions(annotations, sidecar):
+    """Write the current text positions of annotations to a JSON sidecar"""
+    positions = {annotation_key(a): [float(v) for v in a.xyann] for a in annotations}
+    with open(sidecar, 'w', encoding='utf-8') as f:
+        json.dump(positions, f, ensure_ascii=False, indent=1)
+
+
+def apply_positions(annotations, sidecar):
+    """
+    Move annotations to the positions stored in a sidecar file.
+
+    Used both before an interactive session and for headless rendering.
+    Annotations without a saved position keep their computed one.
+    Returns the number of annotations that were moved.
+    """
+    positions = load_positions(sidecar)
+    moved = 0
+    for ann in annotations:
+        pos = positions.get(annotation_key(ann))
+        if pos is not None:
+            ann.xyann = tuple(pos)
+            moved += 1
+    return moved
+
+
+class AnnotationEditor:
+    """
+    Drag annotations with the mouse, redrawing only the dragged artist.
+
+    On button press the picked annotation is made animated, the figure is
+    drawn once without it and that background is cached. Every motion event
+    then restores the cached background, draws the single annotation and
+    blits, so dragging costs the same regardless of how dense the plot is.
+    Positions are written to the sidecar file after each drag and when the
+    window is closed.
+    """
+
+    def __init__(self, fig, annotations, sidecar=None):
+        self.fig = fig
+        self.canvas = fig.canvas
+        self.annotations = list(annotations)
+        self.sidecar = sidecar
+        self.active = None
+        self.grab = (0.0, 0.0)
+        self.background = None
+        if sidecar:
+            apply_positions(self.annotations, sidecar)
+        self.cids = [
+            self.canvas.mpl_connect('button_press_event', self.on_press),
+            self.canvas.mpl_connect('motion_notify_event', self.on_motion),
+            self.canvas.mpl_connect('button_release_event', self.on_release),
+            self.canvas.mpl_connect('close_event', self.on_close),
+        ]
+
+    def _pick(self, event):
+        # Hit-test the text box only (not the leader line), topmost first
+        renderer = self.canvas.get_renderer()
+        for ann in reversed(self.annotations):
+            if ann.axes is not event.inaxes or not ann.get_visible():
+                continue
+            if Text.get_window_extent(ann, renderer).contains(event.x, event.y):
+                return ann
+        return None
+
+    def on_press(self, event):
+        if event.button != 1 or event.inaxes is None:
+            return
+        ann = self._pick(event)
+        if ann is None:
+            return
+        self.active = ann
+        x, y = ann.xyann
+        self.grab = (x - event.xdata, y - event.ydata)
+        ann.set_animated(True)
+        self.canvas.draw()
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        ann.axes.draw_artist(ann)
+        self.canvas.blit(self.fig.bbox)
+
+    def on_motion(self, event):
+        if self.active is None or event.inaxes is not self.active.axes:
+            return
+        self.active.xyann = (event.xdata + self.grab[0], event.ydata + self.grab[1])
+        self.canvas.restore_region(self.background)
+        self.active.axes.draw_artist(self.active)
+        self.canvas.blit(self.fig.bbox)
+
+    def on_release(self, event):
+        if self.active is None:
+            return
+        self.active.set_animated(False)
+        self.active = None
+        self.background = None
+        self.canvas.draw_idle()
+        self.save()
+
+    def on_close(self, event):
+        self.save()
+
+    def save(self):
+        if self.sidecar:
+            save_positions(self.annotations, self.sidecar)
+
+    def disconnect(self):
+        for cid in self.cids:
+            self.canvas.mpl_disconnect(cid)
@@ -0,0 +1,177 @@
+import mmap
+import os
+import re
+import struct
+import zipfile
+import xml.etree.ElementTree as ET
+
+import numpy as np
+
+# RAW1.01 ("version 3") layout, byte offsets
+RAW3_RANGE_COUNT = 12
+RAW3_ALPHA1 = 616
+RAW3_FIRST_RANGE = 712
+RAW3_RANGE_STEPS = 4
+RAW3_RANGE_START_2THETA = 16
+RAW3_RANGE_STEP_SIZE = 176
+RAW3_RANGE_SUPPLEMENT = 256
+
+# RAW4.00 layout: a fixed file header, then records starting with
+# (uint32 type, uint32 length); a range is a type-160 record followed by
+# its additional records and the counts
+RAW4_FILE_HEADER = 61
+RAW4_RANGE = 160
+RAW4_END = 0
+RAW4_RANGE_STEPS = 8
+RAW4_RANGE_SUPPLEMENT = 12
+RAW4_RANGE_START_2THETA = 16
+RAW4_RANGE_STEP_SIZE = 24
+RAW4_ALPHA1 = 32
+
+
+def _map(filename):
+    with open(filename, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _raw3_ranges(buf):
+    """(start 2θ, step, counts) of every range; counts are views into buf"""
+    n_ranges = struct.unpack_from('<I', buf, RAW3_RANGE_COUNT)[0]
+    pos = RAW3_FIRST_RANGE
+    ranges = []
+    for _ in range(n_ranges):
+        header_len, steps = struct.unpack_from('<II', buf, pos)
+        start = struct.unpack_from('<d', buf, pos + RAW3_RANGE_START_2THETA)[0]
+        step = struct.unpack_from('<d', buf, pos + RAW3_RANGE_STEP_SIZE)[0]
+        supplement = struct.unpack_from('<I', buf, pos + RAW3_RANGE_SUPPLEMENT)[0]
+        data = pos + header_len + supplement
+        ranges.append((start, step, np.frombuffer(buf, '<f4', steps, data)))
+        pos = data + 4 * steps
+    return ranges
+
+
+def _raw3_header(buf):
+    header = {'Format': 'RAW1.01'}
+    alpha1 = struct.unpack_from('<d', buf, RAW3_ALPHA1)[0]
+    if 0.5 < alpha1 < 3.0:
+        header['Wavelength'] = f'{alpha1:.5f}'
+    return header
+
+
+def _raw4_ranges(buf):
+    """(start 2θ, step, counts) of every RAW4.00 range; counts are views into buf"""
+    pos = RAW4_FILE_HEADER
+    ranges = []
+    while pos + 8 <= len(buf):
+        kind, length = struct.unpack_from('<II', buf, pos)
+        if kind == RAW4_END or length < 8:
+            break
+        if kind != RAW4_RANGE:
+            # File-level records (sample, instrument, comments) are skipped
+            pos += length
+            continue
+        steps, supplement = struct.unpack_from('<II', buf, pos + RAW4_RANGE_STEPS)
+        start, step = struct.unpack_from('<dd', buf, pos + RAW4_RANGE_START_2THETA)
+        data = pos + length + supplement
+        ranges.append((start, step, np.frombuffer(buf, '<f4', steps, data)))
+        pos = data + 4 * steps
+    return ranges
+
+
+def _raw4_header(buf):
+    header = {'Format': 'RAW4.00'}
+    pos = RAW4_FILE_HEADER
+    while pos + 8 <= len(buf):
+        kind, length = struct.unpack_from('<II', buf, pos)
+        if kind == RAW4_RANGE:
+            alpha1 = struct.unpack_from('<d', buf, pos + RAW4_ALPHA1)[0]
+            if 0.5 < alpha1 < 3.0:
+                header['Wavelength'] = f'{alpha1:.5f}'
+            break
+        if kind == RAW4_END or length < 8:
+            break
+        pos += length
+    return header
+
+
+def read_raw(filename, range_index=0):
+    """
+    Read one range of a Bruker .raw file (RAW1.01 or RAW4.00) without a
+    text round trip.
+
+    The file is memory-mapped and the counts are a read-only float32 view
+    of it (np.frombuffer), so nothing is copied or parsed. Returns
+    (angles, intensities, header) where header is a dict like the one
+    read_xrd_header gives for .xy exports.
+    """
+    buf = _map(filename)
+    magic = bytes(buf[:7])
+    if magic == b'RAW1.01':
+        start, step, counts = _raw3_ranges(buf)[range_index]
+        header = _raw3_header(buf)
+    elif magic == b'RAW4.00':
+        start, step, counts = _raw4_ranges(buf)[range_index]
+        header = _raw4_header(buf)
+    else:
+        raise ValueError(f"{filename}: not a Bruker RAW1.01/RAW4.00 file ({magic!r})")
+    angles = start + step * np.arange(len(counts))
+    return angles, counts, header
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _brml_members(archive):
+    names = [n for n in archive.namelist() if re.search(r'RawData\d+\.xml$', n)]
+    return sorted(names, key=lambda n: [int(d) for d in re.findall(r'\d+', n)])
+
+
+def read_brml(filename, range_index=0):
+    """
+    Read one range (RawDataN.xml) of a Bruker .brml archive.
+
+    Each <Datum> holds comma-separated values ending with the counts; all
+    of them are joined and converted by one np.fromstring call. 2θ comes
+    from the TwoTheta scan axis (start/increment) when present, otherwise
+    from the Datum column of the axis. Returns (angles, intensities, header).
+    """
+    with zipfile.ZipFile(filename) as archive:
+        members = _brml_members(archive)
+        if not members:
+            raise ValueError(f"{filename}: no RawData*.xml in the archive")
+        root = ET.fromstring(archive.read(members[range_index]))
+
+    data = [d.text for d in root.iter() if _local(d.tag) == 'Datum' and d.text]
+    values = np.fromstring(','.join(data), sep=',').reshape(len(data), -1)
+    counts = values[:, -1]
+
+    header = {'Format': 'BRML'}
+    axis_start = axis_step = None
+    for el in root.iter():
+        tag = _local(el.tag)
+        if tag == 'ScanAxisInfo' and el.get('AxisId') == 'TwoTheta':
+            fields = {_local(c.tag): c.text for c in el}
+            axis_start = float(fields.get('Start'))
+            axis_step = float(fields.get('Increment'))
+        elif tag == 'WaveLengthAlpha1' and el.get('Value'):
+            header['Wavelength'] = el.get('Value')
+        elif tag == 'TubeMaterial' and el.text:
+            header['Anode'] = el.text.strip()
+        elif tag == 'ScanInformation' and el.get('ScanName'):
+            header['Scantype'] = el.get('ScanName')
+
+    if axis_start is not None and axis_step:
+        angles = axis_start + axis_step * np.arange(len(counts))
+    else:
+        # Datum: time per step, enabled flag, 2θ, θ, ..., counts
+        angles = values[:, 2]
+    return angles, counts, header
+
+
+def read_bruker(filename, range_index=0):
+    """Dispatch on the extension: .raw or .brml"""
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == '.brml':
+        return read_brml(filename, range_index)
+    return read_raw(filename, range_index)
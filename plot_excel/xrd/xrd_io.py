@@ -0,0 +1,123 @@
+import re
+import numpy as np
+
+from xrd_bruker import read_bruker
+
+BINARY_EXTENSIONS = ('.raw', '.brml')
+
+# Kα1 wavelengths of common anodes, Å
+WAVELENGTHS = {
+    'Cu': 1.54056,
+    'Co': 1.78897,
+    'Cr': 2.28970,
+    'Fe': 1.93604,
+    'Mo': 0.70930,
+}
+
+# Kα2 wavelength for each Kα1 line (Å); Kα2/Kα1 intensity ratio is 0.5
+KALPHA2 = {1.54056: 1.54439, 1.78897: 1.79285}
+KALPHA2_RATIO = 0.5
+
+
+def kalpha2_wavelength(wavelength, atol=5e-4):
+    """
+    Kα2 wavelength (Å) of a Kα1 line, or None for an unknown line.
+
+    Matched within atol: headers round the wavelengths (1.5406 for Cu Kα1).
+    """
+    for ka1, ka2 in KALPHA2.items():
+        if np.isclose(wavelength, ka1, rtol=0, atol=atol):
+            return ka2
+    return None
+
+
+def convert_wavelength(angles, wavelength, reference=1.54056):
+    """2θ measured at one wavelength expressed at another (same d-spacings)"""
+    s = np.sin(np.radians(angles) / 2) * reference / wavelength
+    out = np.full_like(angles, np.nan, dtype=float)
+    ok = np.abs(s) <= 1
+    out[ok] = 2 * np.degrees(np.arcsin(s[ok]))
+    return out
+
+
+def strip_kalpha2(angles, intensities, wavelength, ratio=KALPHA2_RATIO):
+    """
+    Kα1-only pattern by the Rachinger correction.
+
+    The intensity at 2θ holds the Kα2 line of the Kα1 reflection at
+    2θ' = 2·asin(λ1/λ2·sin θ) < 2θ, so I1(2θ) = I(2θ) − ratio·I1(2θ').
+    The recursion runs forward in blocks: every point whose 2θ' lies
+    among the already corrected points is corrected in one vector step. Use a
+    background-corrected pattern; unknown anodes are returned unchanged.
+    """
+    ka2 = kalpha2_wavelength(wavelength)
+    stripped = np.array(intensities, dtype=float)
+    if ka2 is None:
+        return stripped
+    source = convert_wavelength(angles, ka2, wavelength)
+    n = len(angles)
+    i = max(np.searchsorted(source, angles[0], side='right'), 1)
+    while i < n:
+        j = max(np.searchsorted(source, angles[i - 1], side='right'), i + 1)
+        stripped[i:j] -= ratio * np.interp(source[i:j], angles[:i], stripped[:i])
+        i = j
+    return stripped
+
+
+def _first_data_line(lines):
+    """Index of the first line holding a numeric 2θ/intensity pair"""
+    for i, line in enumerate(lines):
+        parts = line.split()
+        if len(parts) < 2:
+            continue
+        try:
+            float(parts[0])
+            float(parts[1])
+        except ValueError:
+            continue
+        return i
+    raise ValueError("No numeric data found")
+
+
+def read_xrd_data(filename):
+    """
+    Read an XRD pattern exported from the diffractometer.
+
+    Handles both the Bruker .xy export (one quoted 'Id: ...' header line)
+    and the tab-separated .txt files with a sample name and column titles
+    on the first two lines, and the native Bruker .raw/.brml files (see
+    xrd_bruker). Returns (angles, intensities) as float arrays.
+    """
+    if filename.lower().endswith(BINARY_EXTENSIONS):
+        angles, intensities, _ = read_bruker(filename)
+        return angles, intensities
+    with open(filename, 'r', encoding='utf-8-sig') as f:
+        lines = f.readlines()
+    start = _first_data_line(lines)
+    data = np.loadtxt(lines[start:], usecols=(0, 1), ndmin=2)
+    return data[:, 0], data[:, 1]
+
+
+def read_xrd_header(filename):
+    """
+    Parse the key: "value" pairs of a Bruker .xy header line.
+
+    Returns an empty dict for files without such a header (.txt exports).
+    For .raw/.brml files the metadata of the binary file is returned.
+    """
+    if filename.lower().endswith(BINARY_EXTENSIONS):
+        return read_bruker(filename)[2]
+    with open(filename, 'r', encoding='utf-8-sig') as f:
+        first = f.readline()
+    if not first.startswith("'"):
+        return {}
+    return dict(re.findall(r'(\w+): "([^"]*)"', first))
+
+
+def pattern_wavelength(filename, default='Cu'):
+    """Kα1 wavelength (Å) from the file header or the anode named in it"""
+    header = read_xrd_header(filename)
+    if header.get('Wavelength'):
+        return float(header['Wavelength'])
+    anode = header.get('Anode') or default
+    return WAVELENGTHS[anode]
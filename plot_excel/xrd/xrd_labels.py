@@ -0,0 +1,164 @@
+from collections import defaultdict
+
+import numpy as np
+from matplotlib.transforms import Bbox
+
+
+class SpatialHash:
+    """
+    Uniform-grid index of axis-aligned boxes in display coordinates.
+
+    Each box is registered in every cell it touches, so an overlap query
+    only compares against the few boxes stored in neighbouring cells.
+    """
+
+    def __init__(self, cell_size):
+        self.cell_size = float(cell_size)
+        self.cells = defaultdict(list)
+        self.boxes = []
+
+    def _cells(self, box):
+        x0, y0, x1, y1 = box
+        c = self.cell_size
+        for i in range(int(np.floor(x0 / c)), int(np.floor(x1 / c)) + 1):
+            for j in range(int(np.floor(y0 / c)), int(np.floor(y1 / c)) + 1):
+                yield i, j
+
+    def insert(self, box):
+        index = len(self.boxes)
+        self.boxes.append(box)
+        for cell in self._cells(box):
+            self.cells[cell].append(index)
+
+    def overlaps(self, box, pad=0.0):
+        x0, y0, x1, y1 = box
+        for cell in self._cells(box):
+            for index in self.cells.get(cell, ()):
+                bx0, by0, bx1, by1 = self.boxes[index]
+                if x0 < bx1 + pad and bx0 < x1 + pad and y0 < by1 + pad and by0 < y1 + pad:
+                    return True
+        return False
+
+
+def text_extents(ax, labels, fontsize=12, **text_kw):
+    """Rendered (width, height) in pixels of each label, including its bbox patch"""
+    renderer = ax.figure.canvas.get_renderer()
+    sizes = []
+    for label in labels:
+        t = ax.text(0, 0, label, fontsize=fontsize, **text_kw)
+        bbox = t.get_window_extent(renderer)
+        patch = t.get_bbox_patch()
+        if patch is not None:
+            t.update_bbox_position_size(renderer)
+            bbox = Bbox.union([bbox, patch.get_window_extent(renderer)])
+        sizes.append((bbox.width, bbox.height))
+        t.remove()
+    return np.array(sizes)
+
+
+def curve_envelope(ax, curves):
+    """
+    Highest curve point in every pixel column of the axes (display coords).
+
+    Curves are interpolated onto the pixel columns, so the envelope has no
+    gaps regardless of the data step. Columns without data are -inf.
+    """
+    bbox = ax.get_window_extent()
+    columns = np.arange(int(np.floor(bbox.x0)), int(np.ceil(bbox.x1)) + 1)
+    envelope = np.full(len(columns), -np.inf)
+    for x, y in curves:
+        ok = np.isfinite(y)
+        display = ax.transData.transform(np.column_stack([x[ok], y[ok]]))
+        order = np.argsort(display[:, 0])
+        dx, dy = display[order, 0], display[order, 1]
+        inside = (columns >= dx[0]) & (columns <= dx[-1])
+        envelope[inside] = np.maximum(envelope[inside], np.interp(columns[inside], dx, dy))
+    return columns[0], envelope
+
+
+def _place(ax, anchors, sizes, curves, pad, max_levels):
+    """Greedy placement of all label boxes; returns boxes in display coords"""
+    display = ax.transData.transform(anchors)
+    col0, envelope = curve_envelope(ax, curves) if curves else (0, None)
+    index = SpatialHash(cell_size=max(np.median(sizes[:, 0]), 1.0))
+    gap = 1.5 * np.median(sizes[:, 1])
+
+    boxes = [None] * len(anchors)
+    # Tallest anchors first: they compete for the least free space
+    for i in np.argsort(-display[:, 1]):
+        ax_, ay = display[i]
+        w, h = sizes[i]
+        best, best_cost = None, np.inf
+        for shift in (0.0, -0.6, 0.6, -1.2, 1.2):
+            cx = ax_ + shift * w
+            x0, x1 = cx - w / 2, cx + w / 2
+            bottom = ay + gap
+            if envelope is not None:
+                lo = max(int(x0 - col0), 0)
+                hi = min(int(np.ceil(x1 - col0)) + 1, len(envelope))
+                if hi > lo:
+                    bottom = max(bottom, envelope[lo:hi].max() + pad)
+            for level in range(max_levels):
+                box = (x0, bottom + level * 0.5 * h, x1, bottom + level * 0.5 * h + h)
+                if not index.overlaps(box, pad):
+                    break
+            else:
+                continue
+            cost = (box[1] - ay) + 2 * abs(shift) * w
+            if cost < best_cost:
+                best, best_cost = box, cost
+        if best is None:
+            # Nothing free within max_levels: stack above the anchor anyway
+            best = (ax_ - w / 2, ay + gap + max_levels * h, ax_ + w / 2, ay + gap + (max_levels + 1) * h)
+        index.insert(best)
+        boxes[i] = best
+    return np.array(boxes)
+
+
+def place_labels(ax, anchors, labels, curves=None, fontsize=12, pad=3.0,
+                 max_levels=12, color='gray', text_kw=None, expand_axes=True):
+    """
+    Annotate anchor points with non-overlapping labels and leader lines.
+
+    anchors are (x, y) data points (e.g. peak tops), curves an optional list
+    of (x, y) arrays that labels must stay above. Label sizes are measured
+    from the renderer and placed greedily against a spatial hash of already
+    placed boxes, so the cost grows roughly linearly with the number of
+    labels. If labels end up above the axes, the y-limit is raised and the
+    placement repeated. color is the leader-line colour, or one colour per
+    label, which then also colours the text (e.g. one colour per phase).
+    Anchors that are not finite (a peak outside a pattern's range) are
+    skipped. Returns the created annotations.
+    """
+    text_kw = dict(text_kw or {})
+    anchors = np.asarray(anchors, dtype=float).reshape(-1, 2)
+    per_label = not isinstance(color, str)
+    finite = np.isfinite(anchors).all(axis=1)
+    labels = [label for label, ok in zip(labels, finite) if ok]
+    color = [c for c, ok in zip(color, finite) if ok] if per_label else color
+    anchors = anchors[finite]
+    if len(anchors) == 0:
+        return []
+    sizes = text_extents(ax, labels, fontsize=fontsize, **text_kw)
+
+    for _ in range(3):
+        boxes = _place(ax, anchors, sizes, curves, pad, max_levels)
+        top = ax.transData.inverted().transform((0, boxes[:, 3].max()))[1]
+        y0, y1 = ax.get_ylim()
+        if not expand_axes or top <= y1:
+            break
+        ax.set_ylim(y0, top + 0.03 * (top - y0))
+
+    inverse = ax.transData.inverted()
+    text_pos = inverse.transform(np.column_stack([(boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 1]]))
+    colors = list(color) if per_label else [color] * len(anchors)
+    annotations = []
+    for (x, y), (tx, ty), label, c in zip(anchors, text_pos, labels, colors):
+        kw = dict(text_kw, color=c) if per_label and 'color' not in text_kw else text_kw
+        annotations.append(ax.annotate(
+            label, xy=(x, y), xytext=(tx, ty), ha='center', va='bottom',
+            fontsize=fontsize,
+            arrowprops=dict(arrowstyle='-', color=c, lw=0.8, alpha=0.7,
+                            shrinkA=1, shrinkB=2),
+            **kw))
+    return annotations
@@ -0,0 +1,240 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+from xrd_io import read_xrd_data, pattern_wavelength
+
+# Indexed reflections used for refinement: (hkl, nominal 2θ for Cu Kα).
+# For bcc β-Ti with a ≈ 3.3 Å the 82.5° and 95.6° reflections are (220) and
+# (310); the weak 78.5° peak labelled in xrd3.py is not a β reflection.
+BETA_TI_PEAKS = [
+    ((1, 1, 0), 38.5),
+    ((2, 0, 0), 55.6),
+    ((2, 1, 1), 69.8),
+    ((2, 2, 0), 82.5),
+    ((3, 1, 0), 95.6),
+]
+
+ALPHA_TI_PEAKS = [
+    ((1, 0, 0), 35.4),
+    ((0, 0, 2), 38.4),
+    ((1, 0, 1), 40.4),
+    ((1, 0, 2), 53.2),
+    ((1, 1, 0), 63.2),
+]
+
+ALPHA2_TI_PEAKS = [
+    ((1, 1, 0), 34.92),
+    ((0, 2, 0), 36.2),
+    ((0, 0, 2), 38.6),
+    ((0, 2, 1), 40.0),
+    ((1, 1, 2), 52.6),
+]
+
+# Reciprocal-metric parameters refined for each crystal system
+SYSTEM_PARAMS = {
+    'cubic': ('a',),
+    'hexagonal': ('a', 'c'),
+    'orthorhombic': ('a', 'b', 'c'),
+}
+
+
+def hkl_terms(system, hkl):
+    """
+    Coefficients of 1/a², (1/b²,) 1/c² in 1/d² for each reflection.
+
+    Returns an array of shape (n_peaks, n_params).
+    """
+    h, k, l = np.asarray(hkl, dtype=float).T
+    if system == 'cubic':
+        return (h**2 + k**2 + l**2)[:, None]
+    if system == 'hexagonal':
+        return np.column_stack([4.0 / 3.0 * (h**2 + h * k + k**2), l**2])
+    if system == 'orthorhombic':
+        return np.column_stack([h**2, k**2, l**2])
+    raise ValueError(f"Unknown crystal system: {system}")
+
+
+def d_spacing(system, hkl, cell):
+    """Interplanar spacing (Å) of reflections hkl for cell = (a[, b], c)"""
+    inv = 1.0 / np.asarray(cell, dtype=float) ** 2
+    return 1.0 / np.sqrt(hkl_terms(system, hkl) @ inv)
+
+
+def two_theta(system, hkl, cell, wavelength=1.54056):
+    """Bragg angle 2θ (degrees) of reflections hkl for a given cell"""
+    d = d_spacing(system, hkl, cell)
+    return 2.0 * np.degrees(np.arcsin(np.clip(wavelength / (2.0 * d), -1, 1)))
+
+
+def locate_peaks(angles, intensities, positions, window=0.6):
+    """
+    Refine peak positions near nominal 2θ values.
+
+    The maximum inside ±window around each nominal position is refined by
+    a parabola through the three points around it, for all peaks at once.
+    Positions outside the measured range come back as NaN.
+    """
+    positions = np.asarray(positions, dtype=float)
+    step = np.median(np.diff(angles))
+    half = max(int(round(window / step)), 1)
+    centre = np.searchsorted(angles, positions)
+    idx = centre[:, None] + np.arange(-half, half + 1)[None, :]
+    inside = (idx >= 0) & (idx < len(angles))
+    idx = np.clip(idx, 0, len(angles) - 1)
+    windows = np.where(inside, intensities[idx], -np.inf)
+
+    top = np.argmax(windows, axis=1)
+    top = np.clip(top, 1, windows.shape[1] - 2)
+    rows = np.arange(len(positions))
+    y0, y1, y2 = (windows[rows, top - 1], windows[rows, top],
+                  windows[rows, top + 1])
+    curvature = y0 - 2 * y1 + y2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shift = np.where(np.isfinite(curvature) & (curvature < 0),
+                         0.5 * (y0 - y2) / curvature, 0.0)
+    found = angles[idx[rows, top]] + shift * step
+
+    in_range = (positions > angles[0]) & (positions < angles[-1])
+    return np.where(in_range, found, np.nan)
+
+
+def batched_lstsq(X, y, w):
+    """
+    Weighted linear least squares for many small problems at once.
+
+    X has shape (n_problems, n_obs, n_params), y and w shape
+    (n_problems, n_obs); rows with w = 0 are padding. The masked normal
+    equations of all problems are solved in one batched call. Returns
+    (beta, standard errors, number of observations, solvable mask);
+    errors are NaN without redundant observations. Problems with too few
+    observations or a singular design (e.g. two peaks of the same hkl
+    family) are marked unsolvable and get NaN, the others are unaffected.
+    """
+    n_par = X.shape[2]
+    XtW = X.transpose(0, 2, 1) * w[:, None, :]
+    N = XtW @ X
+    rhs = np.einsum('pkn,pn->pk', XtW, y)
+    n_obs = w.sum(axis=1)
+    dof = n_obs - n_par
+    # Full rank: smallest singular value not negligible against the largest
+    sv = np.linalg.svd(N, compute_uv=False)
+    full_rank = sv[:, -1] > 1e-10 * sv[:, 0]
+    solvable = (dof >= 0) & full_rank
+    N[~solvable] = np.eye(n_par)
+    rhs[~solvable] = 0.0
+    beta = np.linalg.solve(N, rhs[..., None])[..., 0]
+    N_inv = np.linalg.inv(N)
+
+    resid = (y - np.einsum('pnk,pk->pn', X, beta)) * np.sqrt(w)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sigma2 = np.where(dof > 0, (resid**2).sum(axis=1) / dof, np.nan)
+    err = np.sqrt(N_inv.diagonal(axis1=1, axis2=2) * sigma2[:, None])
+    beta[~solvable] = np.nan
+    err[~solvable] = np.nan
+    return beta, err, n_obs, solvable
+
+
+def refine_lattice(peak_sets, system='cubic', wavelength=1.54056,
+                   displacement=True, goniometer_radius=217.5):
+    """
+    Least-squares lattice parameters for many patterns in one batched solve.
+
+    peak_sets is a list (one entry per pattern) of (hkl, two_theta) pairs,
+    where hkl has shape (n, 3) and two_theta shape (n,) in degrees. NaN
+    angles are ignored. The model is linear in the reciprocal metric:
+
+        sin²θ = λ²/4 · Σ terms(hkl)·(1/a², ...) + D · sin2θ·cosθ,
+
+    where the last column is the sample-displacement shift
+    Δ2θ = -2·(s/R)·cosθ, so s = -D·R. All patterns are padded to a common
+    number of peaks and solved together with masked normal equations.
+
+    Returns a DataFrame with a, b, c, displacement (mm) and their standard
+    uncertainties per pattern; parameters absent in the system are NaN.
+    """
+    names = SYSTEM_PARAMS[system]
+    n_par = len(names) + int(displacement)
+    n_pat = len(peak_sets)
+    n_max = max(len(tt) for _, tt in peak_sets)
+
+    X = np.zeros((n_pat, n_max, n_par))
+    y = np.zeros((n_pat, n_max))
+    w = np.zeros((n_pat, n_max))
+    for i, (hkl, tt) in enumerate(peak_sets):
+        tt = np.asarray(tt, dtype=float)
+        n = len(tt)
+        theta = np.radians(np.nan_to_num(tt) / 2.0)
+        X[i, :n, :len(names)] = wavelength**2 / 4.0 * hkl_terms(system, hkl)
+        if displacement:
+            X[i, :n, -1] = np.sin(2 * theta) * np.cos(theta)
+        y[i, :n] = np.sin(theta) ** 2
+        w[i, :n] = np.isfinite(tt)
+
+    beta, err, n_obs, solvable = batched_lstsq(X, y, w)
+
+    table = pd.DataFrame({'n_peaks': n_obs.astype(int)})
+    # a = A^(-1/2)  =>  σ_a = ½·A^(-3/2)·σ_A
+    for j, name in enumerate(names):
+        with np.errstate(invalid='ignore'):
+            table[name] = np.where(solvable, beta[:, j] ** -0.5, np.nan)
+            table[f'{name}_err'] = 0.5 * beta[:, j] ** -1.5 * err[:, j]
+    for name in ('a', 'b', 'c'):
+        if name not in names:
+            table[name] = np.nan
+            table[f'{name}_err'] = np.nan
+    if displacement:
+        table['displacement_mm'] = np.where(
+            solvable, -beta[:, -1] * goniometer_radius, np.nan)
+        table['displacement_mm_err'] = err[:, -1] * goniometer_radius
+    return table[['n_peaks', 'a', 'a_err', 'b', 'b_err', 'c', 'c_err']
+                 + [c for c in table.columns if c.startswith('displacement')]]
+
+
+def refine_patterns(files, reference=BETA_TI_PEAKS, system='cubic',
+                    window=0.6, **kwargs):
+    """Locate indexed peaks in each pattern file and refine all of them"""
+    hkl = np.array([r[0] for r in reference])
+    nominal = np.array([r[1] for r in reference])
+    peak_sets = []
+    wavelengths = set()
+    for filename in files:
+        angles, intensities = read_xrd_data(filename)
+        wavelength = pattern_wavelength(filename)
+        wavelengths.add(wavelength)
+        # Nominal positions are given for Cu Kα; rescale via the d-spacing
+        positions = 2 * np.degrees(np.arcsin(np.clip(
+            wavelength / 1.54056 * np.sin(np.radians(nominal / 2)), -1, 1)))
+        peak_sets.append((hkl, locate_peaks(angles, intensities,
+                                            positions, window)))
+    if len(wavelengths) > 1:
+        raise ValueError("Patterns measured with different anodes; "
+                         "refine them separately")
+    table = refine_lattice(peak_sets, system=system,
+                           wavelength=wavelengths.pop(), **kwargs)
+    table.insert(0, 'pattern', list(files))
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Refine lattice parameters from indexed XRD peaks')
+    parser.add_argument('files', nargs='*', default=[
+        'xrd2/TiNbZrCu_9.txt', 'xrd2/TiNbZrCu_11.txt', 'xrd2/TiNbZrCu_12.txt'])
+    parser.add_argument('--phase', choices=['beta', 'alpha', 'alpha2'],
+                        default='beta')
+    parser.add_argument('--no-displacement', action='store_true',
+                        help='Do not refine the sample-displacement term')
+    parser.add_argument('--output', help='Save the table to CSV')
+    args = parser.parse_args()
+
+    reference, system = {
+        'beta': (BETA_TI_PEAKS, 'cubic'),
+        'alpha': (ALPHA_TI_PEAKS, 'hexagonal'),
+        'alpha2': (ALPHA2_TI_PEAKS, 'orthorhombic'),
+    }[args.phase]
+    table = refine_patterns(args.files, reference, system,
+                            displacement=not args.no_displacement)
+    print(table.to_string(index=False, float_format='%.5f'))
+    if args.output:
+        table.to_csv(args.output, index=False)
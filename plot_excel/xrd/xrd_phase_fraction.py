@@ -0,0 +1,294 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from numpy.polynomial import chebyshev
+from scipy.optimize import least_squares, lsq_linear
+
+from xrd_io import read_xrd_data, pattern_wavelength, kalpha2_wavelength, KALPHA2_RATIO
+from xrd_lattice import SYSTEM_PARAMS, hkl_terms
+from xrd_phases import PHASES, reflections, cell_volume, mean_atomic_mass
+
+LN2 = np.log(2)
+
+
+def pseudo_voigt(x, centres, fwhm, eta):
+    """
+    Area-normalised pseudo-Voigt profiles of all reflections on the grid x.
+
+    Returns the (n_points, n_peaks) profile matrix together with its
+    derivatives with respect to the peak centre and FWHM and the
+    Lorentzian-minus-Gaussian term used for the mixing parameter.
+    """
+    dx = x[:, None] - centres[None, :]
+    w = fwhm[None, :]
+    u = 4 * dx**2 / w**2
+    gauss = 2 / w * np.sqrt(LN2 / np.pi) * np.exp(-LN2 * u)
+    lorentz = 2 / (np.pi * w) / (1 + u)
+
+    g_dc = gauss * 8 * LN2 * dx / w**2
+    l_dc = lorentz * 8 * dx / w**2 / (1 + u)
+    g_dw = gauss * (-1 / w + 8 * LN2 * dx**2 / w**3)
+    l_dw = lorentz * (-1 / w + 8 * dx**2 / w**3 / (1 + u))
+
+    profile = eta * lorentz + (1 - eta) * gauss
+    d_centre = eta * l_dc + (1 - eta) * g_dc
+    d_fwhm = eta * l_dw + (1 - eta) * g_dw
+    return profile, d_centre, d_fwhm, lorentz - gauss
+
+
+def _build_model(angles, wavelength, phases, composition, n_background, kalpha2):
+    """Precompute reflection lists and the parameter layout of a fit"""
+    lo, hi = angles[0], angles[-1]
+    names = ['zero'] + [f'bg{i}' for i in range(n_background)]
+    x0 = [0.0] + [0.0] * n_background
+    lower = [-0.5] + [-np.inf] * n_background
+    upper = [0.5] + [np.inf] * n_background
+
+    lambdas = [(wavelength, 1.0)]
+    ka2 = kalpha2_wavelength(wavelength) if kalpha2 else None
+    if ka2:
+        lambdas.append((ka2, KALPHA2_RATIO))
+
+    model = {'phases': [], 'names': names}
+    for phase in phases:
+        ref = PHASES[phase]
+        hkl, _, intensity = reflections(phase, wavelength=wavelength,
+                                        two_theta_range=(lo - 2, hi + 2),
+                                        composition=composition)
+        terms = hkl_terms(ref['system'], hkl)
+        model['phases'].append({
+            'phase': phase,
+            'system': ref['system'],
+            'start': len(names),
+            'n_cell': len(SYSTEM_PARAMS[ref['system']]),
+            'terms': np.vstack([terms] * len(lambdas)),
+            'lam': np.concatenate([np.full(len(hkl), lam) for lam, _ in lambdas]),
+            'intensity': np.concatenate([intensity * r for _, r in lambdas]),
+            'n_atoms': len(ref['sites']),
+        })
+        cell = list(ref['cell'])
+        names += [f'{phase}:scale'] + [f'{phase}:{c}' for c in SYSTEM_PARAMS[ref['system']]]
+        names += [f'{phase}:U', f'{phase}:W', f'{phase}:eta']
+        x0 += [0.0] + cell + [0.01, 0.04, 0.5]
+        lower += [0.0] + [c * 0.97 for c in cell] + [0.0, 1e-4, 0.0]
+        upper += [np.inf] + [c * 1.03 for c in cell] + [1.0, 1.0, 1.0]
+
+    scaled = (angles - lo) / (hi - lo) * 2 - 1
+    model['background'] = chebyshev.chebvander(scaled, n_background - 1)
+    model['x0'] = np.array(x0)
+    model['bounds'] = (np.array(lower), np.array(upper))
+    return model
+
+
+def evaluate_model(params, angles, model, jacobian=True):
+    """
+    Calculated pattern and its analytic Jacobian for a parameter vector.
+
+    All reflections of a phase are evaluated as one profile matrix, so the
+    model and every Jacobian column are a handful of matrix products.
+    The dependence of reflection intensities on the cell is neglected.
+    """
+    n_bg = model['background'].shape[1]
+    y = model['background'] @ params[1:1 + n_bg]
+    J = np.zeros((len(angles), len(params))) if jacobian else None
+    if jacobian:
+        J[:, 1:1 + n_bg] = model['background']
+    contributions = {}
+
+    for ph in model['phases']:
+        s = ph['start']
+        n_cell = ph['n_cell']
+        scale = params[s]
+        cell = params[s + 1:s + 1 + n_cell]
+        U, W, eta = params[s + 1 + n_cell:s + 4 + n_cell]
+
+        Q = ph['terms'] @ (1 / cell**2)
+        sin_theta = np.clip(ph['lam'] / 2 * np.sqrt(Q), 0, 0.999999)
+        theta = np.arcsin(sin_theta)
+        centres = np.degrees(2 * theta) + params[0]
+        tan2 = np.tan(theta) ** 2
+        fwhm = np.sqrt(U * tan2 + W)
+
+        profile, d_centre, d_fwhm, l_minus_g = pseudo_voigt(angles, centres, fwhm, eta)
+        weights = scale * ph['intensity']
+        contribution = profile @ weights
+        contributions[ph['phase']] = contribution
+        y = y + contribution
+
+        if jacobian:
+            J[:, s] = profile @ ph['intensity']
+            J[:, 0] += d_centre @ weights
+            # d(2θ)/dQ in degrees, dQ/da_j = -2·t_j/a_j³
+            dtt_dQ = np.degrees(ph['lam'] / (2 * np.sqrt(Q) * np.cos(theta)))
+            dQ_dcell = ph['terms'] * (-2 / cell**3)[None, :]
+            J[:, s + 1:s + 1 + n_cell] = d_centre @ (weights[:, None] * dtt_dQ[:, None] * dQ_dcell)
+            J[:, s + 1 + n_cell] = d_fwhm @ (weights * tan2 / (2 * fwhm))
+            J[:, s + 2 + n_cell] = d_fwhm @ (weights / (2 * fwhm))
+            J[:, s + 3 + n_cell] = l_minus_g @ weights
+
+    return y, J, contributions
+
+
+def _initial_scales(angles, intensities, model):
+    """Background and phase scales of the starting model by bounded linear LS"""
+    x0 = model['x0'].copy()
+    n_bg = model['background'].shape[1]
+    _, J, _ = evaluate_model(x0, angles, model)
+    scale_idx = [ph['start'] for ph in model['phases']]
+    A = np.hstack([model['background'], J[:, scale_idx]])
+    lb = np.r_[np.full(n_bg, -np.inf), np.zeros(len(scale_idx))]
+    sol = lsq_linear(A, intensities, bounds=(lb, np.inf))
+    x0[1:1 + n_bg] = sol.x[:n_bg]
+    x0[scale_idx] = sol.x[n_bg:]
+    return x0
+
+
+def fit_phase_fractions(angles, intensities, wavelength=1.54056,
+                        phases=('α', "α''", 'β'), composition=None,
+                        n_background=6, kalpha2=True, two_theta_range=None):
+    """
+    Whole-pattern fit of library phases plus a Chebyshev background.
+
+    Each phase contributes its reflection list scaled by one factor, with a
+    refined cell, Caglioti-type width (U·tan²θ + W) and pseudo-Voigt mixing;
+    a common zero shift is refined as well. Weight fractions follow from the
+    scale factors by the Hill–Howard relation W_p ∝ S_p·Z_p·M_p·V_p.
+    Returns a dict with the fractions, their uncertainties, the fitted
+    parameters, calculated curves and Rwp.
+    """
+    if two_theta_range is not None:
+        mask = (angles >= two_theta_range[0]) & (angles <= two_theta_range[1])
+        angles, intensities = angles[mask], intensities[mask]
+    composition = composition or {'Ti': 1.0}
+    model = _build_model(angles, wavelength, phases, composition,
+                         n_background, kalpha2)
+    sigma = np.sqrt(np.maximum(intensities, 1.0))
+
+    def residuals(p):
+        return (evaluate_model(p, angles, model, jacobian=False)[0] - intensities) / sigma
+
+    def jac(p):
+        return evaluate_model(p, angles, model)[1] / sigma[:, None]
+
+    x0 = np.clip(_initial_scales(angles, intensities, model), *model['bounds'])
+    sol = least_squares(residuals, x0, jac=jac, bounds=model['bounds'],
+                        x_scale='jac', method='trf', max_nfev=200)
+
+    y_calc, J, contributions = evaluate_model(sol.x, angles, model)
+    dof = max(len(angles) - len(sol.x), 1)
+    chi2 = np.sum(sol.fun**2) / dof
+    cov = np.linalg.pinv((J / sigma[:, None]).T @ (J / sigma[:, None])) * chi2
+    rwp = np.sqrt(np.sum(sol.fun**2) / np.sum((intensities / sigma) ** 2))
+
+    # Hill–Howard weight fractions and their propagated uncertainties
+    idx = [ph['start'] for ph in model['phases']]
+    zmv = np.array([
+        ph['n_atoms'] * mean_atomic_mass(composition)
+        * cell_volume(ph['system'], sol.x[ph['start'] + 1:ph['start'] + 1 + ph['n_cell']])
+        for ph in model['phases']
+    ])
+    mass = sol.x[idx] * zmv
+    total = mass.sum()
+    fractions = mass / total if total > 0 else np.full(len(idx), np.nan)
+    grad = (np.diag(zmv) * total - np.outer(mass, zmv)) / total**2 if total > 0 else np.zeros((len(idx),) * 2)
+    frac_cov = grad @ cov[np.ix_(idx, idx)] @ grad.T
+
+    return {
+        'phases': list(phases),
+        'fractions': dict(zip(phases, fractions)),
+        'fraction_errors': dict(zip(phases, np.sqrt(np.clip(np.diag(frac_cov), 0, None)))),
+        'params': dict(zip(model['names'], sol.x)),
+        'angles': angles,
+        'observed': intensities,
+        'calculated': y_calc,
+        'contributions': contributions,
+        'rwp': rwp,
+        'success': sol.success,
+    }
+
+
+def fit_file(filename, **kwargs):
+    """Load a pattern file and fit its phase fractions"""
+    angles, intensities = read_xrd_data(filename)
+    kwargs.setdefault('wavelength', pattern_wavelength(filename))
+    result = fit_phase_fractions(angles, intensities, **kwargs)
+    result['pattern'] = filename
+    return result
+
+
+def _summary_row(result):
+    row = {'pattern': result['pattern']}
+    for phase in result['phases']:
+        row[f'w({phase}), %'] = 100 * result['fractions'][phase]
+        row[f'σw({phase}), %'] = 100 * result['fraction_errors'][phase]
+    row['Rwp, %'] = 100 * result['rwp']
+    return row
+
+
+def fit_series(files, processes=None, **kwargs):
+    """
+    Fit phase fractions of a regime series, one pattern per process.
+
+    Returns (summary table, list of full fit results) in the order of files.
+    """
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(fit_file, f, **kwargs) for f in files]
+        results = [f.result() for f in futures]
+    return pd.DataFrame([_summary_row(r) for r in results]), results
+
+
+def plot_fit(result, output_file=None):
+    """Observed, calculated and difference curves with per-phase contributions"""
+    fig, (ax, ax_diff) = plt.subplots(2, 1, figsize=(12, 8), sharex=True,
+                                      gridspec_kw={'height_ratios': [4, 1], 'hspace': 0.05})
+    x = result['angles']
+    ax.plot(x, result['observed'], 'k.', markersize=2, label='Observed')
+    ax.plot(x, result['calculated'], 'r-', lw=1.0, label=f"Calculated (Rwp = {100 * result['rwp']:.1f}%)")
+    for phase, curve in result['contributions'].items():
+        ax.plot(x, curve, lw=0.9, color=PHASES[phase]['color'],
+                label=f"{PHASES[phase]['label']}: {100 * result['fractions'][phase]:.1f} wt.%")
+    ax_diff.plot(x, result['observed'] - result['calculated'], color='gray', lw=0.8)
+
+    ax.set_ylabel('Intensity (a.u.)', fontsize=14)
+    ax.legend(fontsize=11, frameon=False)
+    ax.set_title(os.path.basename(result['pattern']), fontsize=14)
+    ax_diff.set_xlabel('2θ (degrees)', fontsize=14)
+    ax_diff.set_ylabel('Obs − Calc', fontsize=11)
+    for a in (ax, ax_diff):
+        a.spines['top'].set_visible(False)
+        a.spines['right'].set_visible(False)
+
+    if output_file:
+        plt.savefig(output_file, dpi=300, bbox_inches='tight')
+        plt.close(fig)
+    return fig
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Estimate α/α″/β weight fractions by whole-pattern fitting')
+    parser.add_argument('files', nargs='*', default=[
+        'xrd2/TiNbZrCu_9.txt', 'xrd2/TiNbZrCu_11.txt', 'xrd2/TiNbZrCu_12.txt'])
+    parser.add_argument('--phases', nargs='+', default=['α', "α''", 'β'],
+                        choices=list(PHASES))
+    parser.add_argument('--range', nargs=2, type=float, default=None,
+                        metavar=('MIN', 'MAX'), help='2θ range to fit')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--plots', action='store_true',
+                        help='Save a fit plot next to each pattern')
+    parser.add_argument('--output', help='Save the summary table to CSV')
+    args = parser.parse_args()
+
+    table, results = fit_series(args.files, processes=args.processes,
+                                phases=tuple(args.phases),
+                                two_theta_range=args.range)
+    print(table.to_string(index=False, float_format='%.2f'))
+    if args.output:
+        table.to_csv(args.output, index=False)
+    if args.plots:
+        for result in results:
+            plot_fit(result, os.path.splitext(result['pattern'])[0] + '_phase_fit.png')
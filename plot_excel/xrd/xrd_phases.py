@@ -0,0 +1,146 @@
+import itertools
+import numpy as np
+
+from xrd_lattice import d_spacing
+
+# Cromer–Mann coefficients (a1..a4, b1..b4, c) of the atomic form factor
+FORM_FACTORS = {
+    'Ti': ((9.7595, 7.3558, 1.6991, 1.9021), (7.8508, 0.5000, 35.6338, 116.105), 1.2807),
+    'Nb': ((17.6142, 12.0144, 4.04183, 3.53346), (1.18865, 11.7660, 0.204785, 69.7957), 3.75591),
+    'Zr': ((17.8765, 10.9480, 5.41732, 3.65721), (1.27618, 11.9160, 0.117622, 87.6627), 2.06929),
+    'Ta': ((29.2024, 15.2293, 14.5135, 4.76492), (1.77333, 9.37046, 0.295977, 63.3644), 9.24354),
+    'Cu': ((13.3380, 7.16760, 5.61580, 1.67350), (3.58280, 0.24700, 11.3966, 64.8126), 1.19100),
+}
+
+ATOMIC_MASS = {'Ti': 47.867, 'Nb': 92.906, 'Zr': 91.224, 'Ta': 180.948, 'Cu': 63.546}
+
+# Reference structures of the titanium phases found in our SLM alloys.
+# Sites are fractional coordinates of the (statistically mixed) metal atoms.
+PHASES = {
+    'β': {
+        'label': 'β-Ti',
+        'system': 'cubic',
+        'cell': (3.29,),
+        'sites': [(0, 0, 0), (0.5, 0.5, 0.5)],
+        'color': '#ff7f0e',
+    },
+    'α': {
+        'label': 'α-Ti',
+        'system': 'hexagonal',
+        'cell': (2.95, 4.68),
+        'sites': [(1 / 3, 2 / 3, 0.25), (2 / 3, 1 / 3, 0.75)],
+        'color': '#1f77b4',
+    },
+    "α''": {
+        'label': 'α″-Ti',
+        'system': 'orthorhombic',
+        'cell': (3.10, 4.90, 4.65),
+        # Cmcm, 4c (0, y, 1/4) with y ≈ 0.2
+        'sites': [(0, 0.2, 0.25), (0, 0.8, 0.75), (0.5, 0.7, 0.25), (0.5, 0.3, 0.75)],
+        'color': '#2ca02c',
+    },
+}
+
+
+def form_factor(composition, s):
+    """Composition-averaged atomic scattering factor at s = sinθ/λ"""
+    f = np.zeros_like(s, dtype=float)
+    for element, fraction in composition.items():
+        a, b, c = FORM_FACTORS[element]
+        f += fraction * (sum(ai * np.exp(-bi * s**2) for ai, bi in zip(a, b)) + c)
+    return f
+
+
+def mean_atomic_mass(composition):
+    """Average atomic mass of a solid solution given atomic fractions"""
+    return sum(fraction * ATOMIC_MASS[el] for el, fraction in composition.items())
+
+
+def cell_volume(system, cell):
+    """Unit cell volume (Å³)"""
+    if system == 'cubic':
+        return cell[0] ** 3
+    if system == 'hexagonal':
+        return np.sqrt(3) / 2 * cell[0] ** 2 * cell[1]
+    return cell[0] * cell[1] * cell[2]
+
+
+def _hkl_grid(max_index):
+    rng = range(max_index, -max_index - 1, -1)
+    hkl = np.array([h for h in itertools.product(rng, rng, rng) if any(h)])
+    # Put indices with fewest negative entries first so that merged groups
+    # are represented by e.g. (110) rather than (-1-10)
+    order = np.argsort((hkl < 0).sum(axis=1), kind='stable')
+    return hkl[order]
+
+
+def reflections(phase, cell=None, wavelength=1.54056, two_theta_range=(20, 120),
+                composition=None, max_index=6):
+    """
+    Reflection list of a library phase.
+
+    Every hkl of a box is evaluated at once; reflections at the same d are
+    merged, which accounts for multiplicity. Intensities are m·|F|²·LP with
+    the composition-averaged form factor. Returns (hkl, two_theta, intensity)
+    sorted by angle, hkl being a representative index of each merged group.
+    """
+    ref = PHASES[phase]
+    cell = ref['cell'] if cell is None else cell
+    composition = composition or {'Ti': 1.0}
+    hkl = _hkl_grid(max_index)
+
+    d = d_spacing(ref['system'], hkl, cell)
+    sin_theta = wavelength / (2 * d)
+    keep = sin_theta < 1
+    hkl, d, sin_theta = hkl[keep], d[keep], sin_theta[keep]
+    tt = 2 * np.degrees(np.arcsin(sin_theta))
+    keep = (tt >= two_theta_range[0]) & (tt <= two_theta_range[1])
+    hkl, d, sin_theta, tt = hkl[keep], d[keep], sin_theta[keep], tt[keep]
+
+    sites = np.asarray(ref['sites'], dtype=float)
+    geometric = np.exp(2j * np.pi * hkl @ sites.T).sum(axis=1)
+    f = form_factor(composition, sin_theta / wavelength)
+    F2 = np.abs(geometric) ** 2 * f**2
+    theta = np.radians(tt / 2)
+    lp = (1 + np.cos(2 * theta) ** 2) / (np.sin(theta) ** 2 * np.cos(theta))
+    intensity = F2 * lp
+
+    allowed = np.abs(geometric) ** 2 > 1e-6
+    hkl, d, tt, intensity = hkl[allowed], d[allowed], tt[allowed], intensity[allowed]
+
+    _, first, inverse = np.unique(np.round(d, 5), return_index=True,
+                                  return_inverse=True)
+    merged = np.bincount(inverse, weights=intensity)
+    order = np.argsort(tt[first])
+    return hkl[first][order], tt[first][order], merged[order]
+
+
+def match_peaks(positions, wavelength=1.54056, phases=None, tolerance=0.3,
+                composition=None):
+    """
+    Assign detected peak positions to the nearest library reflection.
+
+    Reflections of all phases are pooled and compared with every peak in
+    one distance matrix; reflections weaker than 1% of their phase maximum
+    are ignored. Returns a list of (phase, hkl, reference 2θ) tuples, with
+    None for peaks without a reflection within ±tolerance degrees.
+    """
+    positions = np.asarray(positions, dtype=float)
+    phases = list(phases or PHASES)
+    names, hkls, refs = [], [], []
+    for phase in phases:
+        hkl, tt, intensity = reflections(phase, wavelength=wavelength,
+                                         composition=composition)
+        strong = intensity >= 0.01 * intensity.max()
+        names += [phase] * int(strong.sum())
+        hkls += [tuple(int(i) for i in h) for h in hkl[strong]]
+        refs.append(tt[strong])
+    refs = np.concatenate(refs)
+    if len(positions) == 0 or len(refs) == 0:
+        return [None] * len(positions)
+
+    distance = np.abs(positions[:, None] - refs[None, :])
+    nearest = np.argmin(distance, axis=1)
+    ok = distance[np.arange(len(positions)), nearest] <= tolerance
+    return [(names[j], hkls[j], refs[j]) if hit else None
+            for j, hit in zip(nearest, ok)]
@@ -0,0 +1,239 @@
+import argparse
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')  # batch mode: figures are only written to disk
+import matplotlib.pyplot as plt
+from matplotlib.ticker import MultipleLocator
+from scipy.signal import find_peaks, peak_widths
+
+from xrd_io import read_xrd_data, pattern_wavelength, strip_kalpha2, convert_wavelength
+from xrd_labels import place_labels
+from xrd_phases import PHASES, match_peaks
+from xrd_stack import plot_stacked
+
+PATTERN_EXTENSIONS = ('.xy', '.txt', '.raw', '.brml')
+
+
+def find_patterns(directory, recursive=False):
+    """All pattern files (.xy/.txt/.raw/.brml) of a directory, sorted by name"""
+    found = []
+    for root, _, names in os.walk(directory):
+        found += [os.path.join(root, n) for n in names
+                  if n.lower().endswith(PATTERN_EXTENSIONS)]
+        if not recursive:
+            break
+    return sorted(found)
+
+
+def snip_background(intensities, window_points=60):
+    """
+    SNIP background estimate (LLS-transformed, decreasing clipping window).
+
+    Each iteration clips the whole array against the mean of its
+    neighbours at distance p, so the cost is window_points vector passes.
+    """
+    v = np.log(np.log(np.sqrt(np.maximum(intensities, 0) + 1) + 1) + 1)
+    for p in range(window_points, 0, -1):
+        mean = np.empty_like(v)
+        mean[p:-p] = 0.5 * (v[:-2 * p] + v[2 * p:])
+        mean[:p] = v[:p]
+        mean[-p:] = v[-p:]
+        v = np.minimum(v, mean)
+    return (np.exp(np.exp(v) - 1) - 1) ** 2 - 1
+
+
+def detect_peaks(angles, corrected, min_snr=5.0, min_distance=0.15, min_width=0.06):
+    """
+    Peaks of a background-corrected pattern as a DataFrame.
+
+    The noise level is the MAD of point-to-point differences; peaks need a
+    prominence of min_snr times that and a FWHM of at least min_width
+    degrees, which rejects single-point spikes. Positions are refined by a
+    parabola through the top three points, widths are FWHM from peak_widths.
+    """
+    step = np.median(np.diff(angles))
+    noise = 1.4826 * np.median(np.abs(np.diff(corrected))) / np.sqrt(2)
+    idx, _ = find_peaks(corrected, prominence=min_snr * max(noise, 1e-12),
+                            distance=max(int(min_distance / step), 1),
+                            width=min_width / step)
+    idx = idx[(idx > 0) & (idx < len(angles) - 1)]
+    y0, y1, y2 = corrected[idx - 1], corrected[idx], corrected[idx + 1]
+    curvature = y0 - 2 * y1 + y2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shift = np.where(curvature < 0, 0.5 * (y0 - y2) / curvature, 0.0)
+    widths = peak_widths(corrected, idx, rel_height=0.5)[0] * step
+    height = corrected[idx]
+    return pd.DataFrame({
+        'two_theta': angles[idx] + shift * step,
+        'height': height,
+        'rel_intensity': 100 * height / height.max() if len(idx) else height,
+        'fwhm': widths,
+        'area': height * widths * 1.064,  # Gaussian approximation
+    })
+
+
+def analyse_pattern(filename, output_dir, phases=None, tolerance=0.3, min_snr=5.0, kalpha2=True):
+    """
+    Full per-pattern stage: parse, background, peaks, phase matching, outputs.
+
+    Runs in a worker process. Writes <name>_peaks.csv and <name>.png into
+    output_dir and returns a summary row plus the data needed for the
+    stacked figure. With kalpha2=True the Kα2 doublet is stripped from the
+    background-corrected pattern before the peak search, so its shoulder
+    is neither reported as a peak nor widens the Kα1 FWHM. Errors are
+    returned instead of raised, so one bad file does not stop the batch.
+    """
+    name = os.path.splitext(os.path.basename(filename))[0]
+    try:
+        angles, intensities = read_xrd_data(filename)
+        wavelength = pattern_wavelength(filename)
+        background = snip_background(intensities,
+                                     window_points=int(1.5 / np.median(np.diff(angles))))
+        corrected = intensities - background
+        if kalpha2:
+            corrected = strip_kalpha2(angles, corrected, wavelength)
+        peaks = detect_peaks(angles, corrected, min_snr=min_snr)
+
+        matches = match_peaks(peaks['two_theta'], wavelength, phases, tolerance)
+        peaks['phase'] = [m[0] if m else '' for m in matches]
+        peaks['hkl'] = [''.join(map(str, m[1])) if m else '' for m in matches]
+        peaks['ref_two_theta'] = [m[2] if m else np.nan for m in matches]
+        peaks['wavelength'] = wavelength
+        peaks['kalpha2_stripped'] = kalpha2
+        peaks.to_csv(os.path.join(output_dir, f'{name}_peaks.csv'), index=False)
+
+        _plot_pattern(name, angles, intensities, background, peaks,
+                      os.path.join(output_dir, f'{name}.png'))
+
+        row = {'pattern': name, 'file': filename, 'status': 'ok',
+               'wavelength': wavelength, 'n_peaks': len(peaks),
+               'n_matched': int((peaks['phase'] != '').sum())}
+        for phase in phases or PHASES:
+            sel = peaks['phase'] == phase
+            row[f'{phase} peaks'] = int(sel.sum())
+            row[f'{phase} I_sum, %'] = peaks.loc[sel, 'area'].sum() / max(peaks['area'].sum(), 1e-12) * 100
+        if len(peaks):
+            strongest = peaks.loc[peaks['height'].idxmax()]
+            row['strongest 2θ'] = strongest['two_theta']
+            row['strongest phase'] = f"{strongest['phase']}({strongest['hkl']})" if strongest['phase'] else ''
+        return row, (angles, intensities), peaks
+    except Exception as e:
+        return {'pattern': name, 'file': filename,
+                'status': f'error: {e}'}, None, traceback.format_exc()
+
+
+def _peak_label(row):
+    return f"{PHASES[row['phase']]['label']}({row['hkl']})" if row['phase'] else '?'
+
+
+def _plot_pattern(name, angles, intensities, background, peaks, output_file):
+    fig, ax = plt.subplots(figsize=(12, 6), dpi=200)
+    ax.plot(angles, intensities, '-', color='#444444', lw=1.0, label='Measured')
+    ax.plot(angles, background, '--', color='#d62728', lw=0.8, label='Background')
+    ax.set_xlim(angles[0], angles[-1])
+    ax.set_ylim(min(0, intensities.min()), intensities.max() * 1.1)
+    ax.set_xlabel('2θ (degrees)', fontsize=14)
+    ax.set_ylabel('Intensity (counts)', fontsize=14)
+    ax.set_title(name, fontsize=14)
+    ax.xaxis.set_minor_locator(MultipleLocator(2))
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    ax.legend(loc='upper right', fontsize=11, frameon=False)
+    plt.tight_layout()
+
+    if len(peaks):
+        tops = np.interp(peaks['two_theta'], angles, intensities)
+        place_labels(ax, np.column_stack([peaks['two_theta'], tops]),
+                     [_peak_label(r) for _, r in peaks.iterrows()],
+                     curves=[(angles, intensities)], fontsize=9)
+    plt.savefig(output_file, bbox_inches='tight')
+    plt.close(fig)
+
+
+def generate_report(directory, output_dir=None, recursive=False, processes=None,
+                    phases=None, tolerance=0.3, min_snr=5.0, kalpha2=True):
+    """
+    Process every pattern of a directory in a process pool.
+
+    Writes per-pattern peak tables and figures, summary.csv and a stacked
+    figure of all successfully processed patterns into output_dir
+    (default: <directory>/xrd_report). Patterns measured with different
+    anodes are converted to the wavelength of the majority before
+    stacking, and so are their reference reflections. Returns the summary
+    table.
+    """
+    output_dir = output_dir or os.path.join(directory, 'xrd_report')
+    os.makedirs(output_dir, exist_ok=True)
+    files = find_patterns(directory, recursive)
+    if not files:
+        raise FileNotFoundError(f"No XRD patterns in {directory}")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = {pool.submit(analyse_pattern, f, output_dir, phases, tolerance, min_snr,
+                               kalpha2): f
+                   for f in files}
+        for future in as_completed(futures):
+            row, data, detail = future.result()
+            results[futures[future]] = (row, data, detail)
+            print(f"{row['pattern']}: {row['status']}")
+            if data is None:
+                print(detail)
+
+    rows = [results[f][0] for f in files]
+    summary = pd.DataFrame(rows)
+    summary.to_csv(os.path.join(output_dir, 'summary.csv'), index=False)
+
+    done = [f for f in files if results[f][1] is not None]
+    if done:
+        # One 2θ axis: every pattern at the wavelength most of them were measured with
+        wavelengths = pd.Series([results[f][0]['wavelength'] for f in done]).round(5)
+        reference = wavelengths.mode().iloc[0]
+        patterns = []
+        for f, wavelength in zip(done, wavelengths):
+            angles, intensities = results[f][1]
+            angles = convert_wavelength(angles, wavelength, reference)
+            ok = np.isfinite(angles)
+            patterns.append((angles[ok], intensities[ok]))
+        # Label the reflections matched in any pattern on the stacked figure
+        peaks = {}
+        for f, wavelength in zip(done, wavelengths):
+            matched = results[f][2][results[f][2]['phase'] != '']
+            positions = convert_wavelength(matched['ref_two_theta'].to_numpy(), wavelength, reference)
+            for position, (_, r) in zip(positions, matched.iterrows()):
+                if np.isfinite(position):
+                    peaks.setdefault(round(position, 2), _peak_label(r))
+        lo = max(a[0] for a, _ in patterns)
+        hi = min(a[-1] for a, _ in patterns)
+        title = f'2θ at λ = {reference:.5f} Å' if wavelengths.nunique() > 1 else None
+        plot_stacked(patterns, [results[f][0]['pattern'] for f in done],
+                     peaks=peaks, normalize='max', x_range=(lo, hi), title=title,
+                     output_file=os.path.join(output_dir, 'stacked.png'))
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Batch XRD report: peak tables, phase matching and figures '
+                    'for every pattern (.xy/.txt/.raw/.brml) in a directory')
+    parser.add_argument('directory')
+    parser.add_argument('-o', '--output-dir', default=None)
+    parser.add_argument('-r', '--recursive', action='store_true')
+    parser.add_argument('-j', '--processes', type=int, default=None)
+    parser.add_argument('--phases', nargs='+', choices=list(PHASES), default=None)
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='Max. deviation from a reference reflection, degrees')
+    parser.add_argument('--min-snr', type=float, default=5.0)
+    parser.add_argument('--keep-kalpha2', action='store_true',
+                        help='Search peaks without stripping the Kα2 doublet')
+    args = parser.parse_args()
+
+    summary = generate_report(args.directory, args.output_dir, args.recursive,
+                              args.processes, args.phases, args.tolerance, args.min_snr,
+                              not args.keep_kalpha2)
+    print(summary.to_string(index=False, float_format='%.2f'))
@@ -0,0 +1,151 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from xrd_io import read_xrd_data, pattern_wavelength, convert_wavelength
+from xrd_report import find_patterns
+from xrd_stack import resample_patterns
+
+
+class SimilarityIndex:
+    """
+    Archive of patterns on one 2θ grid for fast "most similar" queries.
+
+    Every pattern is resampled onto the grid, its baseline (a low quantile)
+    removed and the vector scaled to unit length; with metric='correlation'
+    the mean is subtracted first, so the dot product is Pearson's r. The
+    vectors are kept as rows of one float32 matrix, and a query is a single
+    matrix product with the query vector.
+
+    Peak-shift tolerance: with max_shift > 0 the query is also compared in a
+    few shifted copies (integer grid steps up to ±max_shift degrees). All
+    copies form the columns of one small matrix, so the cost stays one
+    product; each stored pattern gets its best score over the shifts.
+    """
+
+    def __init__(self, grid=None, x_range=(30, 100), step=0.02, metric='cosine',
+                 max_shift=0.0, n_shifts=5, reference_wavelength=1.54056):
+        if metric not in ('cosine', 'correlation'):
+            raise ValueError(f"Unknown metric: {metric}")
+        self.grid = np.asarray(grid, dtype=float) if grid is not None else \
+            np.arange(x_range[0], x_range[1] + step / 2, step)
+        self.metric = metric
+        self.reference_wavelength = reference_wavelength
+        step = self.grid[1] - self.grid[0]
+        steps = int(round(max_shift / step))
+        self.shifts = np.unique(np.linspace(-steps, steps, n_shifts).round().astype(int)) \
+            if steps else np.array([0])
+        self.vectors = np.empty((0, len(self.grid)), dtype=np.float32)
+        self.names = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def vectorize(self, patterns, wavelengths=None):
+        """Normalised float32 vectors (n_patterns, n_grid) of (angles, intensities) pairs"""
+        if wavelengths is not None:
+            patterns = [(convert_wavelength(a, w, self.reference_wavelength), i)
+                        for (a, i), w in zip(patterns, wavelengths)]
+            patterns = [(a[np.isfinite(a)], i[np.isfinite(a)]) for a, i in patterns]
+        stack = resample_patterns(patterns, self.grid)
+        stack -= np.nanquantile(stack, 0.1, axis=1, keepdims=True)
+        stack = np.nan_to_num(stack)
+        if self.metric == 'correlation':
+            stack -= stack.mean(axis=1, keepdims=True)
+        norm = np.linalg.norm(stack, axis=1, keepdims=True)
+        return (stack / np.where(norm > 0, norm, 1)).astype(np.float32)
+
+    def add(self, patterns, names, wavelengths=None):
+        """Append patterns (list of (angles, intensities)) under the given names"""
+        self.vectors = np.vstack([self.vectors, self.vectorize(patterns, wavelengths)])
+        self.names += list(names)
+
+    def _shifted(self, vector):
+        # Columns are the query rolled by each shift, zero-filled at the ends
+        copies = np.zeros((len(vector), len(self.shifts)), dtype=np.float32)
+        for j, s in enumerate(self.shifts):
+            if s >= 0:
+                copies[s:, j] = vector[:len(vector) - s]
+            else:
+                copies[:s, j] = vector[-s:]
+        norm = np.linalg.norm(copies, axis=0)
+        return copies / np.where(norm > 0, norm, 1)
+
+    def query(self, pattern, k=5, wavelength=None):
+        """
+        The k stored patterns most similar to pattern (angles, intensities).
+
+        Returns a DataFrame with name, score (cosine or r) and the shift in
+        degrees at which the best score was reached.
+        """
+        if not len(self):
+            raise ValueError("The index is empty")
+        vector = self.vectorize([pattern], None if wavelength is None else [wavelength])[0]
+        scores = self.vectors @ self._shifted(vector)
+        best = scores.argmax(axis=1)
+        score = scores[np.arange(len(scores)), best]
+        k = min(k, len(score))
+        top = np.argpartition(-score, k - 1)[:k]
+        top = top[np.argsort(-score[top])]
+        step = self.grid[1] - self.grid[0]
+        return pd.DataFrame({
+            'name': [self.names[i] for i in top],
+            'score': score[top],
+            'shift, °': self.shifts[best[top]] * step,
+        })
+
+    def save(self, path):
+        np.savez_compressed(path, vectors=self.vectors, names=np.array(self.names),
+                            grid=self.grid, shifts=self.shifts, metric=self.metric,
+                            reference_wavelength=self.reference_wavelength)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        index = cls(grid=data['grid'], metric=str(data['metric']),
+                    reference_wavelength=float(data['reference_wavelength']))
+        index.shifts = data['shifts']
+        index.vectors = data['vectors']
+        index.names = [str(n) for n in data['names']]
+        return index
+
+
+def build_index(files, **kwargs):
+    """Index of pattern files, each converted to the reference wavelength"""
+    index = SimilarityIndex(**kwargs)
+    index.add([read_xrd_data(f) for f in files],
+              [os.path.splitext(os.path.basename(f))[0] for f in files],
+              [pattern_wavelength(f) for f in files])
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Find stored XRD patterns most similar to a query')
+    parser.add_argument('query', help='Pattern file (.xy/.txt/.raw/.brml)')
+    parser.add_argument('archive', nargs='?', default='.', help='Directory of patterns (searched recursively)')
+    parser.add_argument('--index', help='Load a saved index (.npz) instead of the archive')
+    parser.add_argument('--save', help='Save the built index to this .npz file')
+    parser.add_argument('-k', type=int, default=5)
+    parser.add_argument('--metric', choices=['cosine', 'correlation'], default='cosine')
+    parser.add_argument('--max-shift', type=float, default=0.0,
+                        help='Peak-shift tolerance, degrees')
+    parser.add_argument('--range', nargs=2, type=float, default=(30, 100), metavar=('MIN', 'MAX'))
+    args = parser.parse_args()
+
+    if args.index:
+        index = SimilarityIndex.load(args.index)
+    else:
+        index = build_index(find_patterns(args.archive, recursive=True), metric=args.metric,
+                            max_shift=args.max_shift, x_range=tuple(args.range))
+        if args.save:
+            index.save(args.save)
+
+    start = time.perf_counter()
+    result = index.query(read_xrd_data(args.query), k=args.k,
+                         wavelength=pattern_wavelength(args.query))
+    elapsed = time.perf_counter() - start
+    print(result.to_string(index=False, float_format='%.4f'))
+    print(f"{len(index)} patterns searched in {elapsed * 1000:.1f} ms")
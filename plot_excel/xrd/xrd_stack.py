@@ -0,0 +1,201 @@
+import argparse
+import os
+import warnings
+
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+from matplotlib.ticker import MultipleLocator
+
+from xrd_io import read_xrd_data
+from xrd_labels import place_labels
+from xrd_lattice import BETA_TI_PEAKS
+
+
+def common_grid(patterns, step=None, x_range=None, overlap=False):
+    """
+    Shared 2θ grid for a list of (angles, intensities) patterns.
+
+    The step defaults to the finest step among the patterns. The range
+    covers the union of all patterns, or only their common part when
+    overlap=True; x_range overrides both.
+    """
+    starts = np.array([p[0][0] for p in patterns])
+    ends = np.array([p[0][-1] for p in patterns])
+    if step is None:
+        step = min(np.median(np.diff(p[0])) for p in patterns)
+    if x_range is None:
+        x_range = (starts.max(), ends.min()) if overlap else (starts.min(), ends.max())
+    n = int(np.floor((x_range[1] - x_range[0]) / step + 1e-9)) + 1
+    return x_range[0] + step * np.arange(n)
+
+
+def resample_patterns(patterns, grid):
+    """
+    Interpolate N patterns onto one grid with a single np.interp call.
+
+    Each pattern is shifted along x by its index times a span larger than
+    any pattern, so all of them form one monotonic sequence; the queries
+    are shifted the same way. Points outside a pattern's own range are NaN.
+    Returns an array of shape (n_patterns, len(grid)).
+    """
+    lengths = np.array([len(p[0]) for p in patterns])
+    x = np.concatenate([p[0] for p in patterns])
+    y = np.concatenate([p[1] for p in patterns])
+    span = max(x.max(), grid.max()) - min(x.min(), grid.min()) + 1.0
+    owner = np.repeat(np.arange(len(patterns)), lengths)
+    queries = grid[None, :] + span * np.arange(len(patterns))[:, None]
+
+    stacked = np.interp(queries.ravel(), x + span * owner, y).reshape(queries.shape)
+    starts = np.array([p[0][0] for p in patterns])
+    ends = np.array([p[0][-1] for p in patterns])
+    outside = (grid[None, :] < starts[:, None]) | (grid[None, :] > ends[:, None])
+    stacked[outside] = np.nan
+    return stacked
+
+
+def normalize_stack(stack, mode='max'):
+    """Scale every pattern to its maximum ('max'), to unit area ('area') or not at all"""
+    if mode == 'max':
+        return stack / np.nanmax(stack, axis=1, keepdims=True) * 100
+    if mode == 'area':
+        return stack / np.nansum(stack, axis=1, keepdims=True) * stack.shape[1]
+    return stack
+
+
+def auto_offsets(stack, gap=0.05, quantile=0.98):
+    """
+    Vertical offsets that separate consecutive patterns.
+
+    Pattern i+1 is lifted above pattern i by the given quantile of the
+    point-wise excess of i over i+1 plus a gap given as a fraction of the
+    overall range. quantile=1 rules out any crossing; the default lets only
+    the strongest peaks reach into the next curve, as in the hand-tuned plots.
+    """
+    excess = np.nanquantile(stack[:-1] - stack[1:], quantile, axis=1)
+    spacing = excess + gap * (np.nanmax(stack) - np.nanmin(stack))
+    return np.concatenate([[0.0], np.cumsum(spacing)])
+
+
+def heights_at(grid, stack, positions, window=0.0):
+    """
+    Curve heights of every pattern at every peak position in one pass.
+
+    With window > 0 the maximum within ±window degrees is returned instead
+    of the nearest point. Returns an array of shape (n_patterns, n_peaks),
+    NaN where a pattern does not cover the peak.
+    """
+    positions = np.asarray(positions, dtype=float)
+    step = grid[1] - grid[0]
+    half = int(round(window / step))
+    centre = np.clip(np.round((positions - grid[0]) / step).astype(int), 0, len(grid) - 1)
+    idx = np.clip(centre[:, None] + np.arange(-half, half + 1)[None, :], 0, len(grid) - 1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)     # all-NaN windows
+        return np.nanmax(stack[:, idx], axis=2)
+
+
+def stack_patterns(patterns, step=None, x_range=None, normalize=None, gap=0.05,
+                   quantile=0.98):
+    """
+    Resample, optionally normalise and offset patterns for a stacked plot.
+
+    Returns (grid, stack with offsets applied, offsets).
+    """
+    grid = common_grid(patterns, step=step, x_range=x_range)
+    stack = normalize_stack(resample_patterns(patterns, grid), normalize)
+    offsets = auto_offsets(stack, gap=gap, quantile=quantile)
+    return grid, stack + offsets[:, None], offsets
+
+
+def plot_stacked(patterns, labels, peaks=None, output_file='xrd_stacked.png',
+                 x_range=(30, 100), normalize=None, gap=0.08, quantile=0.98,
+                 cmap='viridis', title=None, label_each_pattern=False):
+    """
+    Stacked XRD plot of any number of patterns.
+
+    peaks maps 2θ to a label; each peak gets a dotted guide line and a label
+    placed by place_labels above the highest curve at that position, or
+    above every curve with label_each_pattern=True. Curves are drawn as one
+    LineCollection, so dozens of patterns stay cheap to render.
+    """
+    grid, stack, offsets = stack_patterns(patterns, x_range=x_range,
+                                          normalize=normalize, gap=gap,
+                                          quantile=quantile)
+    n = len(patterns)
+    colors = plt.get_cmap(cmap)(np.linspace(0, 0.9, n)) if n > 3 else \
+        ['#1f77b4', '#2ca02c', '#ff7f0e'][:n]
+
+    fig, ax = plt.subplots(figsize=(14, max(8, 0.6 * n)), dpi=300)
+    segments = [np.column_stack([grid, row]) for row in stack]
+    ax.add_collection(LineCollection(segments, colors=colors, linewidths=1.2))
+
+    top = np.nanmax(stack)
+    span = top - np.nanmin(stack)
+    ax.set_xlim(grid[0], grid[-1])
+    ax.set_ylim(np.nanmin(stack) - 0.02 * span, top + 0.1 * span)
+    ax.set_xlabel('2θ (degrees)', fontsize=14, fontweight='bold')
+    ax.set_ylabel('Intensity (a.u.)', fontsize=14, fontweight='bold')
+    ax.yaxis.set_major_formatter(plt.NullFormatter())
+    ax.xaxis.set_minor_locator(MultipleLocator(2))
+    ax.tick_params(axis='both', which='major', labelsize=12)
+    ax.grid(True, linestyle='--', alpha=0.3)
+    ax.spines['top'].set_visible(False)
+    ax.spines['right'].set_visible(False)
+    if title:
+        ax.set_title(title, fontsize=16)
+
+    if n <= 10:
+        handles = [Line2D([], [], color=c, lw=1.2) for c in colors]
+        ax.legend(handles[::-1], labels[::-1], frameon=True, loc='upper right', fontsize=12)
+    else:
+        # Too many entries for a legend: name each curve at its right end
+        ends = np.array([row[np.isfinite(row)][-1] for row in stack])
+        for y, label, c in zip(ends, labels, colors):
+            ax.text(grid[-1], y, f' {label}', color=c, fontsize=9, va='center', ha='left')
+
+    # Labels are placed in display coordinates, so the layout must be final
+    plt.tight_layout()
+    if peaks:
+        positions = np.array(list(peaks))
+        heights = heights_at(grid, stack, positions, window=0.2)
+        for angle in positions:
+            ax.axvline(x=angle, color='gray', linestyle=':', alpha=0.3)
+        if label_each_pattern:
+            anchors = np.column_stack([np.tile(positions, n), heights.ravel()])
+            texts = list(peaks.values()) * n
+        else:
+            # A pattern that does not cover a peak has no height there
+            tops = np.where(np.isfinite(heights), heights, -np.inf).max(axis=0)
+            anchors = np.column_stack([positions, tops])
+            texts = list(peaks.values())
+        # Peaks no pattern covers are left unlabelled
+        covered = np.isfinite(anchors[:, 1])
+        anchors, texts = anchors[covered], [t for t, ok in zip(texts, covered) if ok]
+        place_labels(ax, anchors, texts, curves=[(grid, row) for row in stack],
+                     fontsize=12 if not label_each_pattern else 9)
+
+    if output_file:
+        plt.savefig(output_file, dpi=300, bbox_inches='tight')
+        plt.close(fig)
+    return fig, ax
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Stacked plot of XRD patterns')
+    parser.add_argument('files', nargs='*', default=[
+        'xrd2/TiNbZrCu_9.txt', 'xrd2/TiNbZrCu_11.txt', 'xrd2/TiNbZrCu_12.txt'])
+    parser.add_argument('--labels', nargs='*', help='Curve labels (default: file names)')
+    parser.add_argument('--normalize', choices=['max', 'area'], default=None)
+    parser.add_argument('--range', nargs=2, type=float, default=(30, 100),
+                        metavar=('MIN', 'MAX'))
+    parser.add_argument('--output', default='xrd_stacked.png')
+    args = parser.parse_args()
+
+    patterns = [read_xrd_data(f) for f in args.files]
+    labels = args.labels or [os.path.splitext(os.path.basename(f))[0] for f in args.files]
+    peaks = {pos: f'β-Ti ({"".join(map(str, hkl))})' for hkl, pos in BETA_TI_PEAKS}
+    plot_stacked(patterns, labels, peaks=peaks, output_file=args.output,
+                 x_range=tuple(args.range), normalize=args.normalize)
+    print(f"Stacked plot saved as {args.output}")
@@ -0,0 +1,233 @@
+import argparse
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+from xrd_io import convert_wavelength, kalpha2_wavelength, KALPHA2_RATIO
+from xrd_lattice import batched_lstsq
+from xrd_phases import reflections
+
+SCHERRER_K = 0.9
+
+
+def _hkl_str(hkl):
+    return ''.join(str(int(i)) for i in hkl)
+
+
+def reference_intensities(phase, hkls, wavelength=1.54056):
+    """Powder (random-orientation) intensities I0 of the given reflections"""
+    hkl, _, intensity = reflections(phase, wavelength=wavelength)
+    lookup = {_hkl_str(h): i for h, i in zip(hkl, intensity)}
+    return np.array([lookup.get(h, np.nan) for h in hkls])
+
+
+def pattern_wavelengths(tables, default=1.54056):
+    """Wavelength of each table (its 'wavelength' column), else the default"""
+    return np.array([df['wavelength'].iloc[0] if 'wavelength' in df and len(df) else default
+                     for df in tables.values()])
+
+
+def load_peak_tables(paths):
+    """
+    Read peak tables written by xrd_report (<name>_peaks.csv).
+
+    Returns {pattern name: DataFrame}; hkl is kept as a string so that
+    indices like 002 keep their leading zero.
+    """
+    tables = {}
+    for path in paths:
+        name = os.path.basename(path)
+        name = name[:-len('_peaks.csv')] if name.endswith('_peaks.csv') else os.path.splitext(name)[0]
+        tables[name] = pd.read_csv(path, dtype={'hkl': str}).fillna({'phase': '', 'hkl': ''})
+    return tables
+
+
+def _peak_matrix(tables, phase, hkls, column):
+    """(n_patterns, n_reflections) matrix of a peak-table column, NaN if absent"""
+    out = np.full((len(tables), len(hkls)), np.nan)
+    position = {h: j for j, h in enumerate(hkls)}
+    for i, df in enumerate(tables.values()):
+        sel = df[df['phase'] == phase]
+        # Several detected peaks may match one reflection: keep the strongest
+        sel = sel.sort_values('height').drop_duplicates('hkl', keep='last')
+        for h, v in zip(sel['hkl'], sel[column]):
+            if h in position:
+                out[i, position[h]] = v
+    return out
+
+
+def texture_coefficients(tables, phase='β', hkls=('110', '200', '211'),
+                         intensity='area', wavelength=1.54056):
+    """
+    Harris texture coefficients for every pattern in one array expression.
+
+        TC(hkl) = (I/I0)(hkl) / [ (1/N) Σ (I/I0) ]
+
+    over the N listed reflections. TC = 1 for all hkl means random
+    orientation; TC > 1 marks preferred orientation. Patterns missing one
+    of the reflections get NaN. Returns a DataFrame indexed by pattern.
+    """
+    I = _peak_matrix(tables, phase, hkls, intensity)
+    lam = pattern_wavelengths(tables, wavelength)
+    reference = {l: reference_intensities(phase, hkls, l) for l in np.unique(lam)}
+    I0 = np.array([reference[l] for l in lam]).reshape(I.shape)
+    ratio = I / I0
+    tc = ratio / ratio.mean(axis=1, keepdims=True)
+    table = pd.DataFrame(tc, index=list(tables), columns=[f'TC({h})' for h in hkls])
+    # Degree of preferred orientation: 0 for a random powder
+    table['σ_TC'] = np.sqrt(((tc - 1) ** 2).mean(axis=1))
+    return table
+
+
+def kalpha1_fwhm(fwhm, two_theta, wavelength=1.54056, ratio=KALPHA2_RATIO, iterations=30):
+    """
+    FWHM of the Kα1 line alone from the FWHM of an unresolved Kα1+Kα2 doublet.
+
+    The doublet is modelled as two Gaussians of equal width w, the Kα2 one
+    ratio times weaker and shifted to its own 2θ; w is found by bisection
+    so that the half-maximum width of the sum equals the measured one,
+    for all peaks at once. Resolved doublets (FWHM below the splitting)
+    and unknown anodes keep their width.
+    """
+    fwhm = np.asarray(fwhm, dtype=float)
+    two_theta = np.asarray(two_theta, dtype=float)
+    wavelength = np.broadcast_to(np.asarray(wavelength, dtype=float), fwhm.shape)
+    split = np.zeros_like(fwhm)
+    for lam in np.unique(wavelength[np.isfinite(wavelength)]):
+        ka2 = kalpha2_wavelength(lam)
+        if ka2:
+            sel = wavelength == lam
+            split[sel] = convert_wavelength(two_theta[sel], lam, ka2) - two_theta[sel]
+    split = np.nan_to_num(split)
+    ok = np.isfinite(fwhm) & (fwhm > split) & (split > 0)
+    F, d = fwhm[ok][:, None], split[ok][:, None]
+    x = np.linspace(0, 1, 801)[None, :] * (2 * F + d) - F   # covers the whole doublet
+
+    def apparent(w):
+        w = w[:, None]
+        profile = np.exp(-4 * np.log(2) * (x / w) ** 2) + \
+            ratio * np.exp(-4 * np.log(2) * ((x - d) / w) ** 2)
+        above = profile >= profile.max(axis=1, keepdims=True) / 2
+        first = np.argmax(above, axis=1)
+        last = above.shape[1] - 1 - np.argmax(above[:, ::-1], axis=1)
+        rows = np.arange(len(w))
+        return x[rows, last] - x[rows, first]
+
+    lo, hi = np.zeros(len(F)), F[:, 0].copy()
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        wide = apparent(np.maximum(mid, 1e-9)) > F[:, 0]
+        hi = np.where(wide, mid, hi)
+        lo = np.where(wide, lo, mid)
+    out = fwhm.copy()
+    out[ok] = (lo + hi) / 2
+    return out
+
+
+def williamson_hall(tables, phase='β', wavelength=1.54056, instrumental_fwhm=0.05,
+                    k=SCHERRER_K):
+    """
+    Williamson–Hall size/strain for every pattern with one batched solve.
+
+        β·cosθ = K·λ/D + 4·ε·sinθ
+
+    β is the Kα1 FWHM in radians after subtracting the instrumental width
+    in quadrature; λ is taken per pattern from the table when available.
+    Tables not marked kalpha2_stripped by xrd_report hold the width of the
+    unresolved doublet, which kalpha1_fwhm reduces to the Kα1 line first.
+    When the intercept is not significantly positive the size broadening
+    is below the resolution: D is NaN and only its lower bound D_min
+    (intercept + 2σ, about 95 %) is meaningful.
+    All patterns are padded to the same number of reflections
+    and solved together by batched_lstsq. Returns crystallite size D (nm),
+    microstrain ε, their standard errors and R² per pattern.
+    """
+    hkls = sorted({h for df in tables.values() for h in df.loc[df['phase'] == phase, 'hkl'] if h})
+    two_theta = _peak_matrix(tables, phase, hkls, 'two_theta')
+    fwhm = _peak_matrix(tables, phase, hkls, 'fwhm')
+    lam = pattern_wavelengths(tables, wavelength)
+    doublet = np.array([not ('kalpha2_stripped' in df and df['kalpha2_stripped'].all())
+                        for df in tables.values()])
+    fwhm[doublet] = kalpha1_fwhm(fwhm[doublet], two_theta[doublet],
+                                 np.repeat(lam[doublet, None], len(hkls), axis=1))
+
+    with np.errstate(invalid='ignore'):
+        broadening = np.radians(np.sqrt(fwhm**2 - instrumental_fwhm**2))
+    theta = np.radians(two_theta / 2)
+    y = broadening * np.cos(theta)
+    x = 4 * np.sin(theta)
+    w = np.isfinite(y) & np.isfinite(x)
+    X = np.stack([np.ones_like(x), x], axis=2)
+    X[~w] = 0
+    y = np.where(w, y, 0.0)
+
+    beta, err, n_obs, solvable = batched_lstsq(X, y, w.astype(float))
+    intercept, slope = beta[:, 0], beta[:, 1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        size_nm = k * lam / intercept / 10
+        size_err = size_nm * err[:, 0] / np.abs(intercept)
+        bound = intercept + 2 * np.nan_to_num(err[:, 0])
+        size_min = np.where(bound > 0, k * lam / bound / 10, np.nan)
+        fitted = np.einsum('pnk,pk->pn', X, np.nan_to_num(beta))
+        mean = (y * w).sum(axis=1) / w.sum(axis=1)
+        ss_res = (((y - fitted) * w) ** 2).sum(axis=1)
+        ss_tot = (((y - mean[:, None]) * w) ** 2).sum(axis=1)
+        r2 = np.where(solvable & (ss_tot > 0), 1 - ss_res / ss_tot, np.nan)
+
+    return pd.DataFrame({
+        'n_peaks': n_obs.astype(int),
+        'D, nm': np.where(intercept > 0, size_nm, np.nan),
+        'σD, nm': np.where(intercept > 0, size_err, np.nan),
+        'D_min, nm': size_min,
+        'ε, %': 100 * slope,
+        'σε, %': 100 * err[:, 1],
+        'R²': r2,
+    }, index=list(tables))
+
+
+def regime_table(tables, regimes=None, phase='β', **kwargs):
+    """
+    Texture and W–H results aggregated per regime.
+
+    regimes maps pattern names to regime names (e.g. {'TiNbZrCu_9': 'L1'});
+    patterns without a mapping are their own regime. Returns the mean over
+    the patterns of each regime plus the number of patterns.
+    """
+    wavelength = kwargs.pop('wavelength', 1.54056)
+    tc = texture_coefficients(tables, phase=phase, wavelength=wavelength,
+                              **{k: v for k, v in kwargs.items() if k in ('hkls', 'intensity')})
+    wh = williamson_hall(tables, phase=phase, wavelength=wavelength,
+                         **{k: v for k, v in kwargs.items() if k in ('instrumental_fwhm', 'k')})
+    per_pattern = tc.join(wh)
+    regimes = regimes or {}
+    per_pattern['regime'] = [regimes.get(name, name) for name in per_pattern.index]
+    grouped = per_pattern.groupby('regime', sort=False)
+    table = grouped.mean(numeric_only=True)
+    table.insert(0, 'n_patterns', grouped.size())
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Texture coefficients and Williamson–Hall analysis from '
+                    'xrd_report peak tables')
+    parser.add_argument('tables', nargs='+', help='*_peaks.csv files or a directory')
+    parser.add_argument('--phase', default='β')
+    parser.add_argument('--hkl', nargs='+', default=['110', '200', '211'])
+    parser.add_argument('--regime', nargs='*', default=[], metavar='PATTERN=REGIME',
+                        help='e.g. TiNbZrCu_9=L1 TiNbZrCu_11=L3')
+    parser.add_argument('--instrumental-fwhm', type=float, default=0.05)
+    parser.add_argument('--output', help='Save the regime table to CSV')
+    args = parser.parse_args()
+
+    paths = []
+    for p in args.tables:
+        paths += sorted(glob.glob(os.path.join(p, '*_peaks.csv'))) if os.path.isdir(p) else [p]
+    regimes = dict(item.split('=', 1) for item in args.regime)
+    table = regime_table(load_peak_tables(paths), regimes, phase=args.phase,
+                         hkls=tuple(args.hkl), instrumental_fwhm=args.instrumental_fwhm)
+    print(table.to_string(float_format='%.3f'))
+    if args.output:
+        table.to_csv(args.output)
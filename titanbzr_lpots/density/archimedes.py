@@ -0,0 +1,145 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+RHO_AIR = 0.0012  # g/cm³
+# Theoretical density of Ti-10Ta-2Nb-2Zr, g/cm³
+RHO_THEORETICAL = 4.936
+
+# Titles accepted for the weighing table columns
+COLUMNS = {
+    'Образец': 'sample', 'Sample': 'sample',
+    'Повтор': 'repeat', 'Repeat': 'repeat',
+    'Масса на воздухе, г': 'm_air', 'Dry mass (g)': 'm_air',
+    'Масса в жидкости, г': 'm_fluid', 'Immersed mass (g)': 'm_fluid',
+    'Масса насыщенного, г': 'm_wet', 'Wet mass (g)': 'm_wet',
+    'Температура жидкости, °C': 'T_fluid', 'Fluid temperature (°C)': 'T_fluid',
+    'Плотность жидкости, г/см3': 'rho_fluid', 'Fluid density (g/cm3)': 'rho_fluid',
+}
+
+
+def water_density(T):
+    """Density of air-free water, g/cm³, at T °C (Tanaka et al., 2001; 0–40 °C)"""
+    T = np.asarray(T, dtype=float)
+    return 0.999974950 * (1 - (T - 3.983035) ** 2 * (T + 301.797) / (522528.9 * (T + 69.34881)))
+
+
+def read_weighings(file_path):
+    """
+    Raw weighings, one row per specimen and repeat.
+
+    Columns (Russian or English titles, see COLUMNS): sample, repeat
+    (optional), m_air (dry mass), m_fluid (mass in the immersion fluid),
+    m_wet (optional, mass after soaking for open porosity), and either
+    T_fluid (water temperature) or rho_fluid. Masses in grams.
+    """
+    if file_path.lower().endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(file_path)
+    else:
+        with open(file_path, encoding='utf-8-sig') as fh:
+            sep = ';' if ';' in fh.readline() else ','
+        df = pd.read_csv(file_path, sep=sep, encoding='utf-8-sig', decimal=',' if sep == ';' else '.')
+    df = df.rename(columns={c: COLUMNS.get(str(c).strip(), str(c).strip()) for c in df.columns})
+    missing = {'sample', 'm_air', 'm_fluid'} - set(df.columns)
+    if missing:
+        raise ValueError(f"{os.path.basename(file_path)}: missing columns {sorted(missing)}")
+    if 'rho_fluid' not in df and 'T_fluid' not in df:
+        raise ValueError(f"{os.path.basename(file_path)}: give T_fluid or rho_fluid")
+    return df
+
+
+def archimedes_density(weighings, u_mass=1e-4, u_temperature=0.5, u_rho_fluid=None,
+                       rho_air=RHO_AIR):
+    """
+    Density of every weighing with its standard uncertainty, all rows at once.
+
+    ρ = m_air·(ρ_fl − ρ_air)/D + ρ_air with D = m_air − m_fluid, or
+    D = m_wet − m_fluid when a soaked mass is given (bulk density of a
+    specimen with open pores, whose open porosity (m_wet − m_air)/D is
+    also returned). The fluid density is rho_fluid or water at T_fluid.
+    The uncertainty is propagated to first order from the analytic
+    partial derivatives: u_mass for every mass (balance, g) and either
+    u_temperature (°C, through dρ_water/dT) or u_rho_fluid (g/cm³).
+    Returns weighings with 'rho_fluid', 'density', 'u_density' and
+    'open_porosity' (%, NaN without m_wet) columns.
+    """
+    df = weighings.copy()
+    m_air = df['m_air'].to_numpy(dtype=float)
+    m_fluid = df['m_fluid'].to_numpy(dtype=float)
+    m_wet = df['m_wet'].to_numpy(dtype=float) if 'm_wet' in df else np.full(len(df), np.nan)
+    wet = np.isfinite(m_wet)
+
+    if 'rho_fluid' in df and df['rho_fluid'].notna().all():
+        rho_fl = df['rho_fluid'].to_numpy(dtype=float)
+        u_fl = np.full(len(df), u_rho_fluid or 0.0)
+    else:
+        T = df['T_fluid'].to_numpy(dtype=float)
+        rho_fl = water_density(T)
+        slope = (water_density(T + 0.01) - water_density(T - 0.01)) / 0.02
+        u_fl = np.abs(slope) * u_temperature if u_rho_fluid is None else np.full(len(df), u_rho_fluid)
+
+    D = np.where(wet, m_wet - m_fluid, m_air - m_fluid)
+    c = rho_fl - rho_air
+    density = m_air * c / D + rho_air
+    # ∂ρ/∂m_air, ∂ρ/∂m_fluid, ∂ρ/∂m_wet, ∂ρ/∂ρ_fl
+    d_air = c / D - np.where(wet, 0.0, m_air * c / D ** 2)
+    d_fluid = m_air * c / D ** 2
+    d_wet = np.where(wet, -m_air * c / D ** 2, 0.0)
+    d_rho = m_air / D
+    u = np.sqrt((d_air ** 2 + d_fluid ** 2 + d_wet ** 2) * u_mass ** 2 + (d_rho * u_fl) ** 2)
+
+    df['rho_fluid'] = rho_fl
+    df['density'] = density
+    df['u_density'] = u
+    df['open_porosity'] = np.where(wet, 100 * (m_wet - m_air) / D, np.nan)
+    return df
+
+
+def density_table(weighings, rho_theoretical=RHO_THEORETICAL, u_theoretical=0.0, **kwargs):
+    """
+    Absolute and relative density of every specimen from its repeats.
+
+    Per specimen: the mean of the repeats, their standard deviation, and
+    the standard uncertainty of the mean combining the scatter of the
+    repeats (s/√n) with the propagated uncertainty of the weighings. The
+    relative density is 100·ρ/ρ_th with u_theoretical added. A
+    'rho_theoretical' column in the weighings overrides the argument per
+    specimen. One groupby over all rows.
+    """
+    rows = archimedes_density(weighings, **kwargs)
+    if 'rho_theoretical' not in rows:
+        rows['rho_theoretical'] = rho_theoretical
+    rows['u2'] = rows['u_density'] ** 2
+    table = rows.groupby('sample', sort=False).agg(
+        n=('density', 'size'), density=('density', 'mean'), std=('density', 'std'),
+        u2=('u2', 'mean'), open_porosity=('open_porosity', 'mean'),
+        rho_theoretical=('rho_theoretical', 'first'))
+    table['std'] = table['std'].fillna(0.0)
+    table['u_density'] = np.sqrt((table['std'] ** 2 + table['u2']) / table['n'])
+    rho_th = table['rho_theoretical']
+    table['relative'] = 100 * table['density'] / rho_th
+    table['u_relative'] = 100 * np.sqrt((table['u_density'] / rho_th) ** 2 +
+                                        (table['density'] * u_theoretical / rho_th ** 2) ** 2)
+    table['std_relative'] = 100 * table['std'] / rho_th
+    return table.drop(columns='u2').reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Archimedes density from raw weighings')
+    parser.add_argument('file', help='Weighing table (CSV or Excel)')
+    parser.add_argument('--theoretical', type=float, default=RHO_THEORETICAL,
+                        help='Theoretical density, g/cm³')
+    parser.add_argument('--u-theoretical', type=float, default=0.0)
+    parser.add_argument('--u-mass', type=float, default=1e-4, help='Balance uncertainty, g')
+    parser.add_argument('--u-temperature', type=float, default=0.5, help='Fluid temperature '
+                                                                         'uncertainty, °C')
+    parser.add_argument('--output', help='Save the table to CSV')
+    args = parser.parse_args()
+
+    table = density_table(read_weighings(args.file), args.theoretical, args.u_theoretical,
+                          u_mass=args.u_mass, u_temperature=args.u_temperature)
+    print(table.to_string(index=False, float_format='%.4f'))
+    if args.output:
+        table.to_csv(args.output, index=False)
@@ -1,6 +1,9 @@
 import matplotlib.pyplot as plt
 import pandas as pd
 import numpy as np
+import os
+
+from archimedes import density_table, read_weighings, RHO_THEORETICAL
 
 # Пример данных (замените на свои, если они отличаются)
 data = {
@@ -17,8 +20,16 @@ df = pd.DataFrame(data)
 # Реальные стандартные отклонения для гидростатической плотности (в % от теоретической плотности 4.936 г/см³)
 std_hydro_percent = np.array([0.425, 0.270, 0.157, 0.232, 0.172, 0.241, 0.220, 0.292, 0.271])  # Пересчитанные из г/см³ в %
 
-# Для металлографической плотности предполагаем меньшие отклонения (можно уточнить)
-std_metallo_percent = np.random.uniform(0.03, 0.08, size=len(df))  # Пример, замените реальными данными
+# Если есть исходные взвешивания, плотность и её неопределённость считаются из них (archimedes.py)
+weighings_file = 'weighings.csv'
+if os.path.exists(weighings_file):
+    hydro = density_table(read_weighings(weighings_file), RHO_THEORETICAL).set_index('sample')
+    measured = df['Sample'].isin(hydro.index).to_numpy()
+    df.loc[measured, 'Relative Density Hydrostatic (%)'] = df.loc[measured, 'Sample'].map(hydro['relative'])
+    std_hydro_percent[measured] = df.loc[measured, 'Sample'].map(hydro['u_relative'])
+
+# Для металлографической плотности повторных измерений нет - погрешность не показываем
+std_metallo_percent = np.zeros(len(df))
 
 # Настройка шрифта для профессионального вида
 plt.rcParams['font.family'] = 'Times New Roman'
@@ -1,9 +1,15 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.signal import savgol_filter
-import openpyxl
 import os  # Добавлен импорт модуля os
+import sys
+
+# Общий загрузчик экспортов NETZSCH лежит в plot_excel/dsc_plot
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'plot_excel', 'dsc_plot'))
+from dsc_loader import load_dsc
+from dsc_derivative import smooth_signal
+from dsc_transitions import detect_transitions, annotate_transitions
 
 # Настройка стиля для публикационного качества
 plt.style.use('default')
@@ -22,48 +28,21 @@ plt.rcParams.update({
     'lines.linewidth': 1.5,
 })
 
-def process_dsc_data(workbook):
-    """Обработка данных ДСК из Excel-файла NETZSCH"""
-    sheet = workbook.active
-    
-    # Поиск строки с заголовком данных (содержит "##Temp./°C")
-    header_row = None
-    for row in sheet.iter_rows():
-        if row[0].value == "##Temp./°C":
-            header_row = row[0].row
-            break
-    
-    if header_row is None:
-        raise ValueError("Не удалось найти строку с заголовком данных")
-    
-    # Извлечение данных, начиная со строки после заголовков
-    temperatures = []
-    dsc_signals = []
-    
-    for row in sheet.iter_rows(min_row=header_row + 1):
-        temp = row[0].value  # Температура в первом столбце
-        dsc = row[2].value   # Сигнал ДСК в третьем столбце
-        
-        # Пропускаем нечисловые значения
-        if isinstance(temp, (int, float)) and isinstance(dsc, (int, float)):
-            temperatures.append(temp)
-            dsc_signals.append(dsc)
-    
-    return np.array(temperatures), np.array(dsc_signals)
+def process_dsc_data(file_path):
+    """Обработка данных ДСК из Excel-файла NETZSCH: температура, сигнал ДСК,
+    сглаженный сигнал (окно по скорости и шуму каждого сегмента) и таблица
+    найденных превращений (начало, пик, конец)"""
+    data = load_dsc(file_path)
+    return (data['Temperature'].to_numpy(), data['Heat_Flow'].to_numpy(),
+            smooth_signal(data), detect_transitions(data))
 
 def create_dsc_plot():
     try:
-        # Чтение файлов с использованием openpyxl
-        heating_wb = openpyxl.load_workbook('TiTaNbZr_Heating1.xlsx')
-        cooling_wb = openpyxl.load_workbook('TiTaNbZr_Cooling1.xlsx')
-        
-        # Обработка данных
-        heating_temp, heating_signal = process_dsc_data(heating_wb)
-        cooling_temp, cooling_signal = process_dsc_data(cooling_wb)
-        
-        # Сглаживание данных с помощью фильтра Савитцкого-Голая
-        heating_smooth = savgol_filter(heating_signal, 51, 3)
-        cooling_smooth = savgol_filter(cooling_signal, 51, 3)
+        # Чтение данных (общий потоковый загрузчик)
+        heating_temp, heating_signal, heating_smooth, heating_tr = process_dsc_data('TiTaNbZr_Heating1.xlsx')
+        cooling_temp, cooling_signal, cooling_smooth, cooling_tr = process_dsc_data('TiTaNbZr_Cooling1.xlsx')
+        transitions = pd.concat([heating_tr, cooling_tr], ignore_index=True)
+        print(transitions.to_string(index=False, float_format='%.1f'))
         
         # Создание фигуры
         fig, ax = plt.subplots(figsize=(8, 6), dpi=300)
@@ -80,31 +59,27 @@ def create_dsc_plot():
         ax.annotate('', xy=(700, 0.05), xytext=(750, 0.05),
                     arrowprops=dict(arrowstyle='->', color='#B2182B', lw=1.0))
         
-        # Отметки фазовых превращений для нагрева
-        ax.axvline(x=815, color='gray', linestyle='--', alpha=0.5, linewidth=0.8)
-        ax.text(815, 0.22, 'T$_{s}^{h}$ = 815°C', rotation=90, va='bottom', ha='center', fontsize=8)
-        ax.axvline(x=862, color='gray', linestyle='--', alpha=0.5, linewidth=0.8)
-        ax.text(862, 0.22, 'T$_{f}^{h}$ = 862°C', rotation=90, va='bottom', ha='center', fontsize=8)
-        
-        # Отметки фазовых превращений для охлаждения
-        ax.axvline(x=804, color='gray', linestyle='--', alpha=0.5, linewidth=0.8)
-        ax.text(804, -0.08, 'T$_{s}^{c}$ = 804°C', rotation=90, va='top', ha='center', fontsize=8)
-        ax.axvline(x=743, color='gray', linestyle='--', alpha=0.5, linewidth=0.8)
-        ax.text(743, -0.08, 'T$_{f}^{c}$ = 743°C', rotation=90, va='top', ha='center', fontsize=8)
-        
-        # Подписи фазовых превращений для сплава Ti-10Ta-2Nb-2Zr
-        ax.annotate('α+β → β', xy=(840, 0.05), xytext=(840, 0.15),
-                    arrowprops=dict(arrowstyle='->', color='black', lw=0.8),
-                    ha='center', va='bottom', fontsize=8)
-        ax.annotate('β → α+β', xy=(770, -0.05), xytext=(770, -0.15),
-                    arrowprops=dict(arrowstyle='->', color='black', lw=0.8),
-                    ha='center', va='top', fontsize=8)
+        # Пределы осей задаются до подписей: близкие подписи раздвигаются в координатах экрана
+        ax.set_xlim(600, 1000)
+        ax.set_ylim(-0.1, 0.25)
+
+        # Отметки фазовых превращений (экстраполированные начало и конец)
+        annotate_transitions(ax, heating_tr, color='black', y_text=0.22, show_peak=False)
+        annotate_transitions(ax, cooling_tr, color='black', y_text=-0.08, show_peak=False)
+        
+        # Подписи фазовых превращений для сплава Ti-10Ta-2Nb-2Zr у найденных пиков
+        for t_peak in heating_tr['T_peak']:
+            ax.annotate('α+β → β', xy=(t_peak, 0.05), xytext=(t_peak, 0.15),
+                        arrowprops=dict(arrowstyle='->', color='black', lw=0.8),
+                        ha='center', va='bottom', fontsize=8)
+        for t_peak in cooling_tr['T_peak']:
+            ax.annotate('β → α+β', xy=(t_peak, -0.05), xytext=(t_peak, -0.15),
+                        arrowprops=dict(arrowstyle='->', color='black', lw=0.8),
+                        ha='center', va='top', fontsize=8)
         
         # Настройка осей и пределов
         ax.set_xlabel('Temperature (°C)')
         ax.set_ylabel('Heat Flow (mW/mg)')
-        ax.set_xlim(600, 1000)
-        ax.set_ylim(-0.1, 0.25)
         
         # Добавление легенды
         ax.legend(loc='upper right', frameon=True, edgecolor='black', facecolor='white', framealpha=0.8)
@@ -121,6 +96,7 @@ def create_dsc_plot():
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
         
+        transitions.to_csv(os.path.join(output_dir, 'DSC_Ti-10Ta-2Nb-2Zr_transitions.csv'), index=False)
         output_path_png = os.path.join(output_dir, 'DSC_Ti-10Ta-2Nb-2Zr_Curves.png')
         output_path_pdf = os.path.join(output_dir, 'DSC_Ti-10Ta-2Nb-2Zr_Curves.pdf')
         
@@ -1,9 +1,16 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.signal import savgol_filter
-import openpyxl
 from matplotlib.patches import Rectangle
+import os
+import sys
+
+# The shared NETZSCH export loader lives in plot_excel/dsc_plot
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', '..', 'plot_excel', 'dsc_plot'))
+from dsc_loader import load_dsc
+from dsc_derivative import smooth_signal
+from dsc_transitions import detect_transitions
 
 # Set style for publication-quality figures
 plt.style.use('default')
@@ -22,52 +29,26 @@ plt.rcParams.update({
     'figure.dpi': 300
 })
 
-def process_dsc_data(workbook):
-    """Process NETZSCH DSC data from Excel workbook"""
-    sheet = workbook.active
-    
-    # Find the data header row (contains "##Temp./°C")
-    header_row = None
-    for row in sheet.iter_rows():
-        if row[0].value == "##Temp./°C":
-            header_row = row[0].row
-            break
-    
-    if header_row is None:
-        raise ValueError("Could not find data header row")
-    
-    # Extract data starting from the row after headers
-    temperatures = []
-    dsc_signals = []
-    
-    for row in sheet.iter_rows(min_row=header_row + 1):
-        temp = row[0].value  # Temperature in first column
-        dsc = row[2].value   # DSC signal in third column
-        
-        # Skip any non-numeric values
-        if isinstance(temp, (int, float)) and isinstance(dsc, (int, float)):
-            temperatures.append(temp)
-            dsc_signals.append(dsc)
-    
-    return np.array(temperatures), np.array(dsc_signals)
+def process_dsc_data(file_path):
+    """Process NETZSCH DSC export: returns temperature, DSC signal, the
+    smoothed signal (window adapted to the rate and noise of each segment)
+    and the detected transitions (onset, peak, end)"""
+    data = load_dsc(file_path)
+    return (data['Temperature'].to_numpy(), data['Heat_Flow'].to_numpy(),
+            smooth_signal(data), detect_transitions(data))
 
 def create_dsc_plot():
     try:
-        # Read the files using openpyxl
-        heating_wb = openpyxl.load_workbook('TiTaNbZr_Heating1.xlsx')
-        cooling_wb = openpyxl.load_workbook('TiTaNbZr_Cooling1.xlsx')
-        
-        # Process data
-        heating_temp, heating_signal = process_dsc_data(heating_wb)
-        cooling_temp, cooling_signal = process_dsc_data(cooling_wb)
+        # Read the data with the shared streaming loader
+        heating_temp, heating_signal, heating_smooth, heating_tr = process_dsc_data('TiTaNbZr_Heating1.xlsx')
+        cooling_temp, cooling_signal, cooling_smooth, cooling_tr = process_dsc_data('TiTaNbZr_Cooling1.xlsx')
+        transitions = pd.concat([heating_tr, cooling_tr], ignore_index=True)
+        print(transitions.to_string(index=False, float_format='%.1f'))
+        transitions.to_csv('DSC_TiTaNbZr_transitions.csv', index=False)
         
         # Create figure
         fig, ax = plt.subplots(figsize=(12, 8))
         
-        # Apply Savitzky-Golay filter for smoothing
-        heating_smooth = savgol_filter(heating_signal, 51, 3)
-        cooling_smooth = savgol_filter(cooling_signal, 51, 3)
-        
         # Define colors
         heating_color = '#B2182B'  # Red
         cooling_color = '#2166AC'  # Blue
@@ -79,42 +60,44 @@ def create_dsc_plot():
                              label='Cooling', color=cooling_color, linewidth=2)
         
         # Add phase transformation regions
-        # Heating transformation region (815-862°C)
-        ax.add_patch(Rectangle((815, -0.2), 47, 0.5,
+        # Strongest detected transformation of each curve
+        h = heating_tr.loc[heating_tr['height'].abs().idxmax()]
+        c = cooling_tr.loc[cooling_tr['height'].abs().idxmax()]
+        
+        # Heating transformation region (onset to end)
+        ax.add_patch(Rectangle((h['T_onset'], -0.2), h['T_end'] - h['T_onset'], 0.5,
                              facecolor=heating_color, alpha=0.1))
-        # Cooling transformation region (743-804°C)
-        ax.add_patch(Rectangle((743, -0.2), 61, 0.5,
+        # Cooling transformation region (end to onset)
+        ax.add_patch(Rectangle((c['T_end'], -0.2), c['T_onset'] - c['T_end'], 0.5,
                              facecolor=cooling_color, alpha=0.1))
         
         # Mark phase transformations with vertical lines and temperature labels
         props = dict(boxstyle='round', facecolor='white', alpha=0.9, edgecolor='none', pad=0.3)
         
-        # Temperature labels
+        # Temperature labels (aligned outwards so close pairs do not overlap)
         # Cooling (bottom)
-        ax.text(743, -0.18, "T$_{f}$ = 743°C", ha='center', va='top', size=16, color=cooling_color)
-        ax.text(804, -0.18, "T$_{s}$ = 804°C", ha='center', va='top', size=16, color=cooling_color)
+        ax.text(c['T_end'], -0.18, f"T$_{{f}}$ = {c['T_end']:.0f}°C", ha='right', va='top', size=16, color=cooling_color)
+        ax.text(c['T_onset'], -0.18, f"T$_{{s}}$ = {c['T_onset']:.0f}°C", ha='left', va='top', size=16, color=cooling_color)
         # Heating (top)
-        ax.text(815, 0.28, "T$_{s}$ = 815°C", ha='center', va='bottom', size=16, color=heating_color)
-        ax.text(862, 0.28, "T$_{f}$ = 862°C", ha='center', va='bottom', size=16, color=heating_color)
+        ax.text(h['T_onset'], 0.28, f"T$_{{s}}$ = {h['T_onset']:.0f}°C", ha='right', va='bottom', size=16, color=heating_color)
+        ax.text(h['T_end'], 0.28, f"T$_{{f}}$ = {h['T_end']:.0f}°C", ha='left', va='bottom', size=16, color=heating_color)
         
         # Peak temperatures with white background
-        ax.text(764, -0.173, "T$_{peak}$ = 764°C", ha='center', va='bottom', size=14, 
+        ax.text(c['T_peak'], -0.173, f"T$_{{peak}}$ = {c['T_peak']:.0f}°C", ha='center', va='bottom', size=14, 
                 color=cooling_color, bbox=dict(facecolor='white', alpha=0.9, edgecolor='none', pad=0.5))
-        ax.text(842, 0.12, "T$_{peak}$ = 842°C", ha='center', va='bottom', size=14,
+        ax.text(h['T_peak'], 0.12, f"T$_{{peak}}$ = {h['T_peak']:.0f}°C", ha='center', va='bottom', size=14,
                 color=heating_color, bbox=dict(facecolor='white', alpha=0.9, edgecolor='none', pad=0.5))
         
         # Vertical lines
-        ax.axvline(x=743, color='gray', linestyle='--', alpha=0.5)
-        ax.axvline(x=804, color='gray', linestyle='--', alpha=0.5)
-        ax.axvline(x=815, color='gray', linestyle='--', alpha=0.5)
-        ax.axvline(x=862, color='gray', linestyle='--', alpha=0.5)
+        for t in (c['T_end'], c['T_onset'], h['T_onset'], h['T_end']):
+            ax.axvline(x=t, color='gray', linestyle='--', alpha=0.5)
         
         # Phase transformation labels with background
-        ax.annotate('β → α+β', xy=(775, -0.05), xytext=(775, -0.11),
+        ax.annotate('β → α+β', xy=(c['T_peak'] + 5, -0.05), xytext=(c['T_peak'] + 5, -0.11),
                     arrowprops=dict(arrowstyle='->', color=cooling_color),
                     ha='center', va='top', bbox=props, size=16, color=cooling_color)
         
-        ax.annotate('α+β → β', xy=(840, 0.15), xytext=(840, 0.21),
+        ax.annotate('α+β → β', xy=(h['T_peak'], 0.15), xytext=(h['T_peak'], 0.21),
                     arrowprops=dict(arrowstyle='->', color=heating_color),
                     ha='center', va='bottom', bbox=props, size=16, color=heating_color)
         